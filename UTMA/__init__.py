@@ -8,10 +8,26 @@
 # at the package level, providing a cohesive interface for the framework.
 
 # Import essential functions and classes from submodules
-from .utils import garbage_collection, exponential_backoff, convert_float32_to_float, get_file_size, download_from_url, process_local_file, clear_temp_files, periodic_cleanup
-from .process_futures import process_completed_futures, futures_create_lda_datasets
-from .topic_model_trainer import train_model_v2
+from .utils import garbage_collection, exponential_backoff, convert_float32_to_float, update_run_metadata, get_file_size, download_from_url, process_local_file, clear_temp_files, periodic_cleanup
+from .process_futures import process_completed_futures, futures_create_lda_datasets, futures_create_lda_datasets_streaming, futures_create_encoded_lda_datasets, iter_jsonl_documents, iter_documents, is_jsonl_source, list_jsonl_shards, remove_jsonl_shards, assign_split
+from .topic_model_trainer import train_model_v2, train_models_fused, prepare_task_corpus, fit_lda_model, fit_lda_model_early_stopping, train_lda_model, select_lda_backend, create_lda_model, LDA_BACKENDS, EARLY_STOPPING_DEFAULTS
+from .hyperparameter_search import halving_schedule, search_batch_order, score_search_configs, rank_configs, successive_halving, BayesianOptimizer, bayesian_search, SEARCH_MODES, SEARCH_METRICS, ALPHA_BOUNDS, ETA_BOUNDS
+from .batch_estimation import sample_documents, measure_documents, worker_memory_budget, recommend_batch_sizes, estimate_futures_batches, estimate_futures_batches_large_docs
+from .bow_cache import BowCache, BowCachePlugin, batch_content_hash, cached_dictionary, cached_doc2bow, bow_cache_stats, log_bow_cache_stats
+from .vocabulary_stats import CountMinSketch, VocabularyStats, collect_vocabulary_stats, estimate_lda_model_bytes
+from .corpus_preparation import PreparedDictionary, update_training_dictionary, prepare_training_dictionary
+from .deduplication import MinHasher, NearDuplicateIndex, list_input_blocks, minhash_block, write_deduplicated_block, deduplicate_documents, deduplicate_corpus
+from .phrases import count_phrase_candidates, merge_phrase_counts, learn_phrases, apply_phrases_to_shard, detect_phrases
+from .run_ledger import ledger_signature, RunLedger, LEDGER_FILE
+from .split_manifest import source_signature, corpus_fingerprint, FINGERPRINT_CACHE_FILE, split_directory, load_split_manifest, SplitShardWriter, load_split_shard, submit_split_shards
+from .encoded_corpus import EncodedBatch, EncodedCorpus, write_encoded_corpus, load_encoded_corpus, encoded_corpus_exists, encoded_batch, encoded_doc2bow, materialize_documents
 from .alpha_eta import calculate_numeric_alpha, calculate_numeric_beta, validate_alpha_beta, calculate_alpha_beta
+from .doc_topic_inference import infer_document_topics, document_topic_lists, variational_document_bound, evaluate_corpus
+from .distributed_em import distributed_estep, merge_estep_results, train_distributed_lda
+from .coherence_engine import CoherenceEngine, top_topic_ids, score_model_topics, score_model_topics_gensim, cached_coherence_engine, COHERENCE_TOPN, COHERENCE_MEASURES, COHERENCE_WINDOWS, COHERENCE_BACKENDS
+from .model_serialization import serialize_lda_model, deserialize_lda_model, COMPACT_MODEL_MAGIC
+from .stage_timing import StageTimer
+from .model_consensus import hellinger_distance_matrix, align_topics, merge_lda_models, merge_batch_models
 from .visualization import create_vis_pylda, create_vis_pcoa, process_visualizations, create_vis_pca
 from .write_to_postgres import save_to_zip, create_dynamic_table_class, create_table_if_not_exists, add_model_data_to_database
 from .yaml_loader import join, getenv, get_current_time
@@ -23,6 +39,7 @@ __all__ = [
     'garbage_collection',
     'exponential_backoff',
     'convert_float32_to_float',
+    'update_run_metadata',
     'get_file_size',
     'download_from_url',
     'process_local_file',
@@ -36,6 +53,97 @@ __all__ = [
 
     #topic_model_trainer
     'train_model_v2',
+    'train_models_fused',
+    'prepare_task_corpus',
+    'fit_lda_model',
+    'fit_lda_model_early_stopping',
+    'train_lda_model',
+    'select_lda_backend',
+    'create_lda_model',
+    'LDA_BACKENDS',
+    'EARLY_STOPPING_DEFAULTS',
+
+    # hyperparameter_search
+    'halving_schedule',
+    'search_batch_order',
+    'score_search_configs',
+    'rank_configs',
+    'successive_halving',
+    'BayesianOptimizer',
+    'bayesian_search',
+    'SEARCH_MODES',
+    'SEARCH_METRICS',
+    'ALPHA_BOUNDS',
+    'ETA_BOUNDS',
+
+    # batch_estimation
+    'sample_documents',
+    'measure_documents',
+    'worker_memory_budget',
+    'recommend_batch_sizes',
+    'estimate_futures_batches',
+    'estimate_futures_batches_large_docs',
+
+    # bow_cache
+    'BowCache',
+    'BowCachePlugin',
+    'batch_content_hash',
+    'cached_dictionary',
+    'cached_doc2bow',
+    'bow_cache_stats',
+    'log_bow_cache_stats',
+
+    # vocabulary_stats
+    'CountMinSketch',
+    'VocabularyStats',
+    'collect_vocabulary_stats',
+    'estimate_lda_model_bytes',
+
+    # corpus_preparation
+    'PreparedDictionary',
+    'update_training_dictionary',
+    'prepare_training_dictionary',
+
+    # deduplication
+    'MinHasher',
+    'NearDuplicateIndex',
+    'list_input_blocks',
+    'minhash_block',
+    'write_deduplicated_block',
+    'deduplicate_documents',
+    'deduplicate_corpus',
+
+    # phrases
+    'count_phrase_candidates',
+    'merge_phrase_counts',
+    'learn_phrases',
+    'apply_phrases_to_shard',
+    'detect_phrases',
+
+    # run_ledger
+    'ledger_signature',
+    'RunLedger',
+    'LEDGER_FILE',
+
+    # split_manifest
+    'source_signature',
+    'corpus_fingerprint',
+    'FINGERPRINT_CACHE_FILE',
+    'split_directory',
+    'load_split_manifest',
+    'SplitShardWriter',
+    'load_split_shard',
+    'submit_split_shards',
+
+    # encoded_corpus
+    'EncodedBatch',
+    'EncodedCorpus',
+    'write_encoded_corpus',
+    'load_encoded_corpus',
+    'encoded_corpus_exists',
+    'encoded_batch',
+    'encoded_doc2bow',
+    'materialize_documents',
 
     # alpha_eta
     'calculate_numeric_alpha',
@@ -43,6 +151,42 @@ __all__ = [
     'validate_alpha_beta',
     'calculate_alpha_beta',
 
+    # doc_topic_inference
+    'infer_document_topics',
+    'document_topic_lists',
+    'variational_document_bound',
+    'evaluate_corpus',
+
+    # distributed_em
+    'distributed_estep',
+    'merge_estep_results',
+    'train_distributed_lda',
+
+    # coherence_engine
+    'CoherenceEngine',
+    'top_topic_ids',
+    'score_model_topics',
+    'score_model_topics_gensim',
+    'cached_coherence_engine',
+    'COHERENCE_TOPN',
+    'COHERENCE_MEASURES',
+    'COHERENCE_WINDOWS',
+    'COHERENCE_BACKENDS',
+
+    # model_serialization
+    'serialize_lda_model',
+    'deserialize_lda_model',
+    'COMPACT_MODEL_MAGIC',
+
+    # stage_timing
+    'StageTimer',
+
+    # model_consensus
+    'hellinger_distance_matrix',
+    'align_topics',
+    'merge_lda_models',
+    'merge_batch_models',
+
     # visualization
     'create_vis_pylda',
     'create_vis_pcoa',
@@ -52,6 +196,14 @@ __all__ = [
     # process_futures
     'process_completed_futures',
     'futures_create_lda_datasets',
+    'futures_create_lda_datasets_streaming',
+    'futures_create_encoded_lda_datasets',
+    'iter_jsonl_documents',
+    'iter_documents',
+    'is_jsonl_source',
+    'list_jsonl_shards',
+    'remove_jsonl_shards',
+    'assign_split',
 
     # writeToPostgres
     'save_to_zip', 
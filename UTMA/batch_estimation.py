@@ -4,57 +4,256 @@
 #
 # Description:
 # This script provides functions to estimate optimal batch sizes for the Unified Topic Modeling and Analysis (UTMA)
-# framework. It dynamically calculates `futures_batches` based on document structure and available system resources.
-# The functions consider document complexity, memory, and CPU constraints to provide efficient and balanced batch counts.
+# framework. Instead of loading the whole input, it samples documents from the data source (random seeks into
+# JSONL files, or the head of a JSON list), measures the actual pickled and in-memory size of the sample, and
+# combines that with the per-worker memory budget from `--max_memory` and psutil to recommend `futures_batches`,
+# `base_batch_size` and `max_batch_size`.
 #
 # Functions:
+# - sample_documents: Draws a document sample and estimates the number of documents without a full read.
+# - measure_documents: Measures pickled, in-memory and bag-of-words bytes per document of a sample.
+# - recommend_batch_sizes: Recommends batch sizes from the measured sample and the worker memory budget.
 # - estimate_futures_batches: Estimates a reasonable `futures_batches` count for standard documents.
 # - estimate_futures_batches_large_docs: Adjusted batch estimation for processing very large documents.
 #
 # Dependencies:
-# - Python libraries: psutil, math
+# - Python libraries: os, sys, json, math, random, pickle, psutil
 #
 # Developed with AI assistance.
 
-import psutil
+import os
+import sys
 import math
 import json
+import random
+import pickle
+import logging
+
+import psutil
+
+from .bow_cache import BOW_ENTRY_BYTES
+from .process_futures import is_jsonl_source, list_jsonl_shards
+
+# Files below this size are read completely instead of sampled
+FULL_READ_BYTES = 8 * 1024 ** 2
+# Prefix of a JSON list that is parsed for the sample
+JSON_PREFIX_BYTES = 16 * 1024 ** 2
+# Pointer slot held by a list for each of its items
+POINTER_BYTES = 8
+
+
+def _sample_jsonl(filename, sample_size, seed):
+    """Sample JSONL lines at random byte offsets; returns (documents, sampled bytes, total bytes, exact count or None)."""
+    shards = list_jsonl_shards(filename)
+    sizes = [os.path.getsize(shard) for shard in shards]
+    total_bytes = sum(sizes)
+
+    documents = []
+    sampled_bytes = 0
+    if total_bytes <= FULL_READ_BYTES:
+        for shard in shards:
+            with open(shard, 'rb') as infile:
+                for line in infile:
+                    if line.strip():
+                        documents.append(json.loads(line))
+                        sampled_bytes += len(line)
+        return documents, sampled_bytes, total_bytes, len(documents)
+
+    # Lines are picked by the line preceding a random offset, which is close enough to uniform for size estimates
+    rng = random.Random(seed)
+    handles = {}
+    try:
+        for _ in range(sample_size):
+            shard_index = rng.choices(range(len(shards)), weights=sizes)[0]
+            infile = handles.get(shard_index)
+            if infile is None:
+                infile = handles[shard_index] = open(shards[shard_index], 'rb')
+            offset = rng.randrange(max(1, sizes[shard_index]))
+            infile.seek(offset)
+            if offset:
+                infile.readline()
+            line = infile.readline()
+            if not line:
+                infile.seek(0)
+                line = infile.readline()
+            if line.strip():
+                documents.append(json.loads(line))
+                sampled_bytes += len(line)
+    finally:
+        for infile in handles.values():
+            infile.close()
+    return documents, sampled_bytes, total_bytes, None
+
+
+def _sample_json_list(filename, sample_size):
+    """Parse the first elements of a JSON list from a bounded prefix; returns the same tuple as `_sample_jsonl`."""
+    total_bytes = os.path.getsize(filename)
+    with open(filename, 'r', encoding='utf-8') as infile:
+        text = infile.read(JSON_PREFIX_BYTES)
+    complete = len(text.encode('utf-8')) >= total_bytes
+
+    decoder = json.JSONDecoder()
+    position = text.index('[') + 1
+    documents = []
+    while len(documents) < sample_size:
+        while position < len(text) and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(text) or text[position] == ']':
+            break
+        try:
+            document, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            # The prefix ends inside this element
+            break
+        documents.append(document)
+        position = end
+
+    sampled_bytes = len(text[:position].encode('utf-8'))
+    exact = len(documents) if complete and len(documents) < sample_size else None
+    return documents, sampled_bytes, total_bytes, exact
+
+
+def sample_documents(filename, sample_size=1000, seed=0):
+    """
+    Draws a sample of documents and estimates the number of documents in the data source.
+
+    JSONL files and shard directories are sampled at random byte offsets; a JSON list is sampled
+    from its head. Neither requires reading the whole input.
+
+    Args:
+        filename (str): JSON file, JSONL file or directory of JSONL shards.
+        sample_size (int): Number of documents to sample.
+        seed (int): Seed for the random offsets.
+
+    Returns:
+        tuple: (list of sampled documents, estimated number of documents in the source).
+    """
+    if is_jsonl_source(filename):
+        documents, sampled_bytes, total_bytes, exact = _sample_jsonl(filename, sample_size, seed)
+    else:
+        documents, sampled_bytes, total_bytes, exact = _sample_json_list(filename, sample_size)
+
+    if exact is not None:
+        return documents, exact
+    if not documents:
+        return documents, 0
+    return documents, int(round(total_bytes / (sampled_bytes / len(documents))))
+
+
+def measure_documents(documents):
+    """
+    Measures the size of a document sample as it is held and shipped by the workers.
+
+    Args:
+        documents (list of list of str): Sampled documents.
+
+    Returns:
+        dict: Mean bytes per document when pickled (`pickled`), as Python objects (`in_memory`),
+        and as a bag-of-words list (`bow`), plus the mean number of tokens (`tokens`).
+    """
+    count = max(1, len(documents))
+    pickled = len(pickle.dumps(documents, protocol=pickle.HIGHEST_PROTOCOL))
+    in_memory = sum(
+        POINTER_BYTES + sys.getsizeof(document) + sum(sys.getsizeof(token) for token in document)
+        for document in documents
+    )
+    bow = sum(56 + len(set(document)) * BOW_ENTRY_BYTES for document in documents)
+    tokens = sum(len(document) for document in documents)
+    return {
+        'pickled': pickled / count,
+        'in_memory': in_memory / count,
+        'bow': bow / count,
+        'tokens': tokens / count,
+    }
+
+
+def worker_memory_budget(max_memory_gb=None, n_workers=1):
+    """
+    Returns the memory available to one Dask worker in bytes.
+
+    The budget is the configured `--max_memory` per worker, capped by the memory psutil reports as
+    available divided among the workers.
+    """
+    available = psutil.virtual_memory().available / max(1, n_workers)
+    if max_memory_gb is None:
+        return int(available)
+    return int(min(max_memory_gb * 1024 ** 3, available))
+
+
+def recommend_batch_sizes(filename, max_memory_gb=None, n_workers=1, threads_per_worker=1, sample_size=1000,
+                          memory_fraction=0.6, max_memory_fraction=0.75, min_batch_size=10, seed=0):
+    """
+    Recommends `futures_batches`, `base_batch_size` and `max_batch_size` from a measured sample.
+
+    A training task keeps its scattered batch, a materialized copy of it and its bag-of-words corpus
+    in memory, so one document costs twice its in-memory size plus its BoW size. Batches are sized
+    so that `threads_per_worker` concurrent tasks stay within `memory_fraction` of the worker budget
+    (Dask starts spilling at 60% by default); `max_batch_size` uses `max_memory_fraction`.
+
+    Args:
+        filename (str): Data source passed to `utma.py`.
+        max_memory_gb (float or None): Memory limit per worker (`--max_memory`).
+        n_workers (int): Number of Dask workers.
+        threads_per_worker (int): Concurrent tasks per worker.
+        sample_size (int): Number of documents to sample.
+        memory_fraction (float): Fraction of the worker budget used by `base_batch_size` tasks.
+        max_memory_fraction (float): Fraction of the worker budget used by `max_batch_size` tasks.
+        min_batch_size (int): Lower bound on every recommendation.
+        seed (int): Seed for sampling.
+
+    Returns:
+        dict: The recommendations together with the measurements they are based on.
+    """
+    documents, estimated_documents = sample_documents(filename, sample_size=sample_size, seed=seed)
+    if not documents:
+        raise ValueError(f"No documents could be sampled from {filename}.")
+
+    sizes = measure_documents(documents)
+    task_bytes_per_document = 2 * sizes['in_memory'] + sizes['bow']
+    budget = worker_memory_budget(max_memory_gb, n_workers)
+    concurrent_tasks = max(1, math.ceil(threads_per_worker))
+
+    upper = max(min_batch_size, estimated_documents)
+    base_batch_size = int(budget * memory_fraction / concurrent_tasks / task_bytes_per_document)
+    base_batch_size = min(max(base_batch_size, min_batch_size), upper)
+    max_batch_size = int(budget * max_memory_fraction / concurrent_tasks / task_bytes_per_document)
+    max_batch_size = min(max(max_batch_size, base_batch_size), upper)
+
+    corpus_bytes = estimated_documents * sizes['in_memory']
+    if corpus_bytes > budget * n_workers * memory_fraction:
+        logging.warning(f"The scattered corpus (~{corpus_bytes / 1024 ** 3:.2f} GB) exceeds {memory_fraction:.0%} of the "
+                        f"cluster memory budget; workers will spill to disk.")
+
+    recommendation = {
+        'futures_batches': base_batch_size,
+        'base_batch_size': base_batch_size,
+        'max_batch_size': max_batch_size,
+        'estimated_documents': estimated_documents,
+        'sampled_documents': len(documents),
+        'bytes_per_document': sizes,
+        'worker_memory_budget': budget,
+    }
+    logging.info(f"Batch size recommendation for {filename}: {recommendation}")
+    return recommendation
+
 
 def estimate_futures_batches(document, min_batch_size=10, max_batch_size=100, memory_limit_ratio=0.5, cpu_factor=2):
     """
-    Estimates a reasonable `futures_batch` size based on document structure and system resources.
+    Estimates a reasonable `futures_batch` size based on a measured document sample and system resources.
 
     Args:
-        document (list of lists): The document containing lists of tokenized sentences/paragraphs.
-        min_batch_size (int): Minimum allowable batch count.
-        max_batch_size (int): Maximum allowable batch count.
+        document (str): Path of the JSON/JSONL data source.
+        min_batch_size (int): Minimum allowable batch size.
+        max_batch_size (int): Maximum allowable batch size.
         memory_limit_ratio (float): Fraction of available memory to use.
-        cpu_factor (int): Factor for scaling batch count based on CPU.
+        cpu_factor (int): Number of tasks expected to run concurrently per worker.
 
     Returns:
         int: Estimated futures_batch size.
     """
-
-    # Load document data
-    with open(document, "r") as file:
-        document = json.load(file)
-        
-    # Step 1: Document Analysis
-    num_elements = len(document)
-    avg_tokens_per_element = sum(len(element) for element in document) / max(1, num_elements)
-    print(f"Document has {num_elements} elements, with an average of {avg_tokens_per_element:.2f} tokens per element.")
-
-    # Step 2: Memory Constraints
-    available_memory = psutil.virtual_memory().available * memory_limit_ratio
-    estimated_doc_size = num_elements * avg_tokens_per_element * 4  # ~4 bytes per token assumption
-
-    # Step 3: Estimate Batch Count
-    if estimated_doc_size < available_memory:
-        # Calculate batch count based on available system resources
-        batch_count = max(min(int(num_elements / avg_tokens_per_element) // cpu_factor, max_batch_size), min_batch_size)
-    else:
-        # Constrain if memory-limited
-        batch_count = min(max(int(available_memory / (avg_tokens_per_element * 4)) // cpu_factor, min_batch_size), max_batch_size)
+    recommendation = recommend_batch_sizes(document, threads_per_worker=cpu_factor, memory_fraction=memory_limit_ratio,
+                                           max_memory_fraction=memory_limit_ratio, min_batch_size=min_batch_size)
+    batch_count = min(max(recommendation['futures_batches'], min_batch_size), max_batch_size)
 
     print(f"Optimized futures_batches size: {batch_count}")
     return batch_count
@@ -64,36 +263,22 @@ def estimate_futures_batches_large_docs(document, min_batch_size=5, max_batch_si
     """
     Estimates `futures_batch` size with additional adjustments for very large documents.
 
+    Uses a smaller sample, since each sampled document is large, and a more conservative memory share.
+
     Args:
-        document (list of lists): Document with tokenized text.
-        min_batch_size (int): Minimum batch count.
-        max_batch_size (int): Maximum batch count.
+        document (str): Path of the JSON/JSONL data source.
+        min_batch_size (int): Minimum batch size.
+        max_batch_size (int): Maximum batch size.
         memory_limit_ratio (float): Fraction of memory to use.
-        cpu_factor (int): Factor for CPU-based scaling.
+        cpu_factor (int): Number of tasks expected to run concurrently per worker.
 
     Returns:
         int: Estimated futures_batch size.
     """
-
-    # Load document data
-    with open(document, "r") as file:
-        document = json.load(file)
-        
-    # Step 1: Document Analysis
-    num_elements = len(document)
-    total_tokens = sum(len(element) for element in document)
-    avg_tokens_per_element = total_tokens / max(1, num_elements)
-    print(f"Total tokens: {total_tokens}, Average tokens per element: {avg_tokens_per_element:.2f}")
-
-    # Step 2: System Constraints
-    available_memory = psutil.virtual_memory().available * memory_limit_ratio
-    estimated_doc_size = total_tokens * 4  # ~4 bytes per token
-
-    # Step 3: Batch Size Estimation
-    if estimated_doc_size < available_memory:
-        batch_count = max(min(int(num_elements / avg_tokens_per_element) // cpu_factor, max_batch_size), min_batch_size)
-    else:
-        batch_count = min(max(int(available_memory / (avg_tokens_per_element * 4)) // cpu_factor, min_batch_size), max_batch_size)
+    recommendation = recommend_batch_sizes(document, threads_per_worker=cpu_factor, sample_size=200,
+                                           memory_fraction=memory_limit_ratio, max_memory_fraction=memory_limit_ratio,
+                                           min_batch_size=min_batch_size)
+    batch_count = min(max(recommendation['futures_batches'], min_batch_size), max_batch_size)
 
     print(f"Optimized futures_batches size for large document: {batch_count}")
     return batch_count
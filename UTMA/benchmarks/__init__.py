@@ -0,0 +1,25 @@
+# __init__.py - Initialization for the UTMA Benchmarks
+# Author: Alan Hamm
+# Date: November 2024
+
+# Description:
+# This __init__.py file exposes the synthetic corpus generator and the hot-path benchmarks of the Unified
+# Topic Modeling and Analysis (UTMA). Run them with `python -m UTMA.benchmarks`.
+
+from .synthetic_corpus import generate_lda_corpus, corpus_statistics, split_batches
+from .benchmark import time_stage, benchmark_hot_paths, benchmark_cluster_scenario, run_benchmarks, write_results, BENCHMARK_FILE
+
+__all__ = [
+    # synthetic_corpus
+    'generate_lda_corpus',
+    'corpus_statistics',
+    'split_batches',
+
+    # benchmark
+    'time_stage',
+    'benchmark_hot_paths',
+    'benchmark_cluster_scenario',
+    'run_benchmarks',
+    'write_results',
+    'BENCHMARK_FILE',
+]
@@ -0,0 +1,343 @@
+# benchmark.py - Hot-Path Benchmarks for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script times the hot paths of the Unified Topic Modeling and Analysis (UTMA) on a synthetic corpus (see
+# synthetic_corpus.py), so the effect of a change on speed can be measured and compared across commits. Each
+# stage runs in isolation in the current process: training and held-out scoring with `train_model_v2`,
+# coherence scoring with a cold coherence engine, the document-topic matrix behind the plots
+# (`fill_distribution_matrix`) and the PCA plot itself (`create_vis_pca`), the zip archive (`save_to_zip`) and
+# the database insert (`add_model_data_to_database`). The insert runs against a local SQLite file instead of
+# PostgreSQL; JSONB columns are compiled as JSON for SQLite, and list values (such as `alpha_str`) are stored as
+# array literals, as PostgreSQL casts them into text columns. An end-to-end scenario then starts a
+# `LocalCluster`, trains a small grid on scattered batches, scores the models on the validation batches and
+# writes every result to SQLite, timing each step. Stages are repeated and report their fastest and mean
+# wall time. The results, with the settings, corpus statistics, git commit and library versions, are
+# written to a JSON file.
+#
+# Usage:
+#   python -m UTMA.benchmarks [--num_documents 2000] [--vocabulary_size 5000] [--output benchmark_results.json]
+#
+# Functions:
+# - time_stage: Repeats a call and reports its fastest and mean wall time.
+# - benchmark_hot_paths: Times the training, scoring, plotting and persistence stages in isolation.
+# - benchmark_cluster_scenario: Times a train, validation and insert round on a LocalCluster.
+# - run_benchmarks: Generates the corpus, runs all benchmarks and collects the results.
+# - write_results: Writes the results to JSON.
+#
+# Dependencies:
+# - Python libraries: os, sys, json, time, pickle, shutil, sqlite3, argparse, logging, platform, tempfile, subprocess
+# - numpy, gensim, dask, distributed, sqlalchemy
+#
+# Developed with AI assistance.
+
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import sqlite3
+import argparse
+import logging
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+import numpy as np
+import gensim
+import dask
+from dask.distributed import Client, LocalCluster, wait
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+from ..topic_model_trainer import train_model_v2
+from ..coherence_engine import CoherenceEngine, score_model_topics
+from ..model_serialization import deserialize_lda_model
+from ..visualization import fill_distribution_matrix, create_vis_pca
+from ..write_to_postgres import save_to_zip, create_dynamic_table_class, create_table_if_not_exists, add_model_data_to_database
+from .synthetic_corpus import generate_lda_corpus, corpus_statistics, split_batches
+
+BENCHMARK_FILE = "benchmark_results.json"
+BENCHMARK_TABLE = "benchmark_results"
+
+
+@compiles(JSONB, 'sqlite')
+def _compile_jsonb_sqlite(type_, compiler, **kwargs):
+    """Store JSONB columns as JSON when the results table lives in SQLite."""
+    return "JSON"
+
+
+# PostgreSQL stores the one-element lists of `alpha_str` and `beta_str` as '{symmetric}' in text columns
+sqlite3.register_adapter(list, lambda values: "{" + ",".join(str(value) for value in values) + "}")
+
+
+def time_stage(function, *args, repeats=1, **kwargs):
+    """
+    Calls a function `repeats` times and measures each call with a monotonic clock.
+
+    Returns:
+        tuple: (result of the last call, dict with the fastest and mean seconds and the repeats).
+    """
+    timings = []
+    result = None
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return result, {'seconds': min(timings), 'mean_seconds': float(np.mean(timings)), 'repeats': len(timings)}
+
+
+def _git_commit():
+    """Return the commit of the working tree, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _insert_result(model_data, database_uri, work_dir, num_documents, workers, batch_size):
+    """Insert one result under a fresh time_key, so repeated inserts do not collide."""
+    model_data = dict(model_data, time_key=f"{model_data['time_key']}-{time.perf_counter_ns()}")
+    add_model_data_to_database(model_data, model_data['type'], BENCHMARK_TABLE, database_uri,
+                               num_documents, workers, batch_size, work_dir)
+
+
+def benchmark_hot_paths(train_documents, validation_documents, num_topics, passes, iterations, repeats, work_dir,
+                        database_uri, random_state=42):
+    """
+    Times the stages of one model in isolation.
+
+    Args:
+        train_documents (list): Tokenized training batch.
+        validation_documents (list): Tokenized validation batch.
+        num_topics (int): Topics of the trained model.
+        passes, iterations (int): Training settings of `train_model_v2`.
+        repeats (int): Calls per stage.
+        work_dir (str): Directory for plots and zip archives.
+        database_uri (str): SQLAlchemy URI of the results database.
+        random_state (int): Seed of the model.
+
+    Returns:
+        dict: Timings per stage.
+    """
+    stages = {}
+    train_args = (num_topics, 'symmetric', 'symmetric', train_documents)
+    settings = (random_state, passes, iterations, 1, 0, 1, True)
+
+    result, stages['train_model_v2_train'] = time_stage(
+        train_model_v2, *train_args, 'N/A', 'train', *settings, repeats=repeats)
+    ldamodel = deserialize_lda_model(result['lda_model'])
+    _, stages['train_model_v2_validation'] = time_stage(
+        train_model_v2, *train_args, validation_documents, 'validation', *settings, ldamodel=ldamodel, repeats=repeats)
+
+    # A new engine per call measures the cold path: counting co-occurrences plus scoring
+    dictionary = pickle.loads(result['dictionary'])
+    _, stages['coherence_c_v'] = time_stage(
+        lambda: score_model_topics(ldamodel, CoherenceEngine(train_documents, dictionary), 'c_v'), repeats=repeats)
+
+    corpus = pickle.loads(result['corpus'])
+    _, stages['fill_distribution_matrix'] = time_stage(
+        fill_distribution_matrix, ldamodel, corpus, num_topics, repeats=repeats)
+    _, stages['create_vis_pca'] = time_stage(
+        create_vis_pca, result['lda_model'], result['corpus'], num_topics, 'train', 'benchmark_pca',
+        result['time_key'], os.path.join(work_dir, "pca"), repeats=repeats)
+
+    zip_dir = os.path.join(work_dir, "zip")
+    os.makedirs(zip_dir, exist_ok=True)
+    text = pickle.dumps(" ".join(" ".join(document) for document in train_documents))
+    _, stages['save_to_zip'] = time_stage(
+        save_to_zip, result['time_key'], zip_dir, text, result['text_json'], result['lda_model'], result['corpus'],
+        result['dictionary'], work_dir, repeats=repeats)
+
+    create_table_if_not_exists(create_dynamic_table_class(BENCHMARK_TABLE), database_uri)
+    _, stages['add_model_data_to_database'] = time_stage(
+        _insert_result, result, database_uri, work_dir, len(train_documents), 1, len(train_documents), repeats=repeats)
+
+    stages['model_size_bytes'] = result['model_size_bytes']
+    # Breakdown of the last training call by stage, as recorded by train_model_v2 itself
+    stages['train_model_v2_stages'] = json.loads(result['stage_timings'])
+    return stages
+
+
+def benchmark_cluster_scenario(train_batches, validation_batches, topic_grid, passes, iterations, n_workers,
+                               work_dir, database_uri, random_state=42):
+    """
+    Times an end-to-end round on a LocalCluster: startup, scattering, training every configuration on every
+    training batch, scoring the first batch's models on the validation batches and inserting all results.
+
+    Returns:
+        dict: Seconds per step, the task counts and the total.
+    """
+    timings = {}
+    settings = (random_state, passes, iterations, 1, 0, n_workers, True)
+    configs = [(n_topics, 'symmetric', 'symmetric') for n_topics in topic_grid]
+    total_start = time.perf_counter()
+
+    start = time.perf_counter()
+    cluster = LocalCluster(n_workers=n_workers, threads_per_worker=1, processes=True, dashboard_address=None,
+                           local_directory=os.path.join(work_dir, "dask"))
+    client = Client(cluster)
+    timings['startup_seconds'] = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        train_futures = [client.scatter([batch], hash=False)[0] for batch in train_batches]
+        validation_futures = [client.scatter([batch], hash=False)[0] for batch in validation_batches]
+        none_future = client.scatter("N/A")
+        timings['scatter_seconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        train_tasks = [
+            client.submit(train_model_v2, *config, batch, none_future, "train", *settings, pure=False)
+            for config in configs for batch in train_futures
+        ]
+        wait(train_tasks)
+        train_results = client.gather(train_tasks)
+        timings['train_seconds'] = time.perf_counter() - start
+
+        # The models of the first training batch are scored on every validation batch
+        start = time.perf_counter()
+        models = {config: deserialize_lda_model(result['lda_model'])
+                  for config, result in zip(configs, train_results[::len(train_futures)])}
+        validation_tasks = [
+            client.submit(train_model_v2, *config, train_futures[0], batch, "validation", *settings,
+                          ldamodel=models[config], pure=False)
+            for config in configs for batch in validation_futures
+        ]
+        wait(validation_tasks)
+        validation_results = client.gather(validation_tasks)
+        timings['validation_seconds'] = time.perf_counter() - start
+    finally:
+        client.close()
+        cluster.close()
+
+    start = time.perf_counter()
+    create_table_if_not_exists(create_dynamic_table_class(BENCHMARK_TABLE), database_uri)
+    for result in train_results + validation_results:
+        _insert_result(result, database_uri, work_dir, len(train_batches[0]), n_workers, len(train_batches[0]))
+    timings['database_seconds'] = time.perf_counter() - start
+
+    timings['total_seconds'] = time.perf_counter() - total_start
+    timings['train_tasks'] = len(train_tasks)
+    timings['validation_tasks'] = len(validation_tasks)
+    return timings
+
+
+def run_benchmarks(num_documents=2000, vocabulary_size=5000, num_topics=20, document_length=80, model_topics=None,
+                   passes=5, iterations=50, repeats=3, batch_size=500, validation_ratio=0.2, n_workers=2,
+                   topic_grid=None, cluster=True, work_dir=None, seed=42):
+    """
+    Generates a synthetic corpus and runs the isolated and end-to-end benchmarks on it.
+
+    The corpus is split into a validation share and training batches of `batch_size` documents; the
+    isolated stages use the first training batch and the first `batch_size` validation documents.
+
+    Returns:
+        dict: Settings, corpus statistics, environment, stage timings and (optionally) cluster timings.
+    """
+    model_topics = model_topics or num_topics
+    topic_grid = topic_grid or [model_topics]
+    settings = {key: value for key, value in locals().items() if key != 'work_dir'}
+    own_work_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="utma-benchmark-")
+    os.makedirs(work_dir, exist_ok=True)
+    database_uri = f"sqlite:///{os.path.join(work_dir, 'benchmark.sqlite')}"
+
+    try:
+        start = time.perf_counter()
+        documents = generate_lda_corpus(num_documents, vocabulary_size, num_topics, document_length, seed=seed)
+        generation_seconds = time.perf_counter() - start
+
+        validation_count = int(len(documents) * validation_ratio)
+        validation_documents, train_documents = documents[:validation_count], documents[validation_count:]
+        train_batches = split_batches(train_documents, batch_size)
+        validation_batches = split_batches(validation_documents, batch_size)
+
+        results = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'numpy': np.__version__,
+                'gensim': gensim.__version__,
+                'dask': dask.__version__,
+            },
+            'settings': settings,
+            'corpus': dict(corpus_statistics(documents), generation_seconds=generation_seconds,
+                           train_batches=len(train_batches), validation_batches=len(validation_batches)),
+        }
+        logging.info(f"Benchmarking hot paths on {len(train_batches[0])} training documents.")
+        results['stages'] = benchmark_hot_paths(train_batches[0], validation_documents[:batch_size], model_topics,
+                                                passes, iterations, repeats, work_dir, database_uri, seed)
+        if cluster:
+            logging.info(f"Benchmarking a LocalCluster round with {n_workers} workers.")
+            results['cluster'] = benchmark_cluster_scenario(train_batches, validation_batches, topic_grid, passes,
+                                                            iterations, n_workers, work_dir, database_uri, seed)
+        with sqlite3.connect(os.path.join(work_dir, 'benchmark.sqlite')) as connection:
+            results['database_rows'] = connection.execute(f"SELECT COUNT(*) FROM {BENCHMARK_TABLE}").fetchone()[0]
+        return results
+    finally:
+        if own_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def write_results(results, path=BENCHMARK_FILE):
+    """Write benchmark results to a JSON file and return its path."""
+    with open(path, 'w', encoding='utf-8') as results_file:
+        json.dump(results, results_file, indent=2, default=str)
+    return path
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments for the benchmarks."""
+    parser = argparse.ArgumentParser(description="Benchmark the UTMA hot paths on a synthetic LDA corpus.")
+    parser.add_argument("--num_documents", type=int, help="Documents in the synthetic corpus (default 2000).")
+    parser.add_argument("--vocabulary_size", type=int, help="Distinct terms in the synthetic corpus (default 5000).")
+    parser.add_argument("--num_topics", type=int, help="Topics of the generating model (default 20).")
+    parser.add_argument("--document_length", type=int, help="Mean tokens per document (default 80).")
+    parser.add_argument("--model_topics", type=int, help="Topics of the benchmarked models (default --num_topics).")
+    parser.add_argument("--topic_grid", type=int, nargs="+", help="Topic counts trained in the cluster scenario (default --model_topics).")
+    parser.add_argument("--passes", type=int, help="Training passes (default 5).")
+    parser.add_argument("--iterations", type=int, help="Inference iterations (default 50).")
+    parser.add_argument("--repeats", type=int, help="Calls per isolated stage (default 3).")
+    parser.add_argument("--batch_size", type=int, help="Documents per batch (default 500).")
+    parser.add_argument("--n_workers", type=int, help="Dask workers of the cluster scenario (default 2).")
+    parser.add_argument("--skip_cluster", action="store_true", help="Skip the LocalCluster scenario.")
+    parser.add_argument("--work_dir", type=str, help="Directory for plots, archives and the SQLite file (default: a temporary directory).")
+    parser.add_argument("--seed", type=int, help="Seed of the corpus and models (default 42).")
+    parser.add_argument("--output", type=str, help=f"JSON file for the results (default {BENCHMARK_FILE}).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    results = run_benchmarks(
+        num_documents=args.num_documents if args.num_documents is not None else 2000,
+        vocabulary_size=args.vocabulary_size if args.vocabulary_size is not None else 5000,
+        num_topics=args.num_topics if args.num_topics is not None else 20,
+        document_length=args.document_length if args.document_length is not None else 80,
+        model_topics=args.model_topics,
+        passes=args.passes if args.passes is not None else 5,
+        iterations=args.iterations if args.iterations is not None else 50,
+        repeats=args.repeats if args.repeats is not None else 3,
+        batch_size=args.batch_size if args.batch_size is not None else 500,
+        n_workers=args.n_workers if args.n_workers is not None else 2,
+        topic_grid=args.topic_grid,
+        cluster=not args.skip_cluster,
+        work_dir=args.work_dir,
+        seed=args.seed if args.seed is not None else 42,
+    )
+    path = write_results(results, args.output or BENCHMARK_FILE)
+    for stage, timing in results['stages'].items():
+        if isinstance(timing, dict) and 'mean_seconds' in timing:
+            print(f"{stage:<28} {timing['seconds']:.3f}s (mean {timing['mean_seconds']:.3f}s)")
+    if 'cluster' in results:
+        print(f"{'cluster_total':<28} {results['cluster']['total_seconds']:.3f}s")
+    print(f"Results written to {path}", file=sys.stderr)
@@ -0,0 +1,74 @@
+# synthetic_corpus.py - Synthetic LDA Corpora for UTMA Benchmarks
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script generates tokenized corpora from the LDA generative process, so the benchmarks of the Unified
+# Topic Modeling and Analysis (UTMA) can run at any size without real documents. Topic-word distributions
+# are drawn from a symmetric Dirichlet(beta) over the vocabulary, every document draws its topic mixture
+# from a Dirichlet(alpha) and a Poisson length, and its words are sampled topic by topic. Sampling is grouped
+# by topic over the whole corpus, so generation costs one `choice` call per topic rather than per word. The
+# same seed always yields the same corpus, which keeps benchmark runs comparable across commits.
+#
+# Functions:
+# - generate_lda_corpus: Tokenized documents drawn from an LDA model with known topics.
+# - corpus_statistics: Document, token and vocabulary counts of a corpus.
+# - split_batches: Splits documents into batches of a fixed size.
+#
+# Dependencies:
+# - Python libraries: numpy
+#
+# Developed with AI assistance.
+
+import numpy as np
+
+
+def generate_lda_corpus(num_documents=2000, vocabulary_size=5000, num_topics=20, document_length=80,
+                        alpha=0.1, beta=0.01, seed=42):
+    """
+    Generates a synthetic corpus from the LDA generative process.
+
+    Args:
+        num_documents (int): Documents to generate.
+        vocabulary_size (int): Distinct terms; tokens are named `term00000`, `term00001`, ...
+        num_topics (int): Topics of the generating model.
+        document_length (int): Mean document length in tokens (Poisson, at least one token).
+        alpha (float): Symmetric Dirichlet prior of the document-topic mixtures.
+        beta (float): Symmetric Dirichlet prior of the topic-word distributions.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        list of list of str: The tokenized documents.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"term{term_id:05d}" for term_id in range(vocabulary_size)])
+    topic_word = rng.dirichlet(np.full(vocabulary_size, beta), size=num_topics)
+    doc_topic = rng.dirichlet(np.full(num_topics, alpha), size=num_documents)
+    lengths = np.maximum(1, rng.poisson(document_length, size=num_documents))
+
+    # Topic of every token, document by document, then the words of each topic in one draw
+    token_topics = np.concatenate([
+        np.repeat(np.arange(num_topics), rng.multinomial(length, mixture))
+        for length, mixture in zip(lengths, doc_topic)
+    ])
+    token_words = np.empty(len(token_topics), dtype=np.int64)
+    for topic_id in range(num_topics):
+        positions = np.flatnonzero(token_topics == topic_id)
+        token_words[positions] = rng.choice(vocabulary_size, size=len(positions), p=topic_word[topic_id])
+
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return [vocabulary[token_words[start:end]].tolist() for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def corpus_statistics(documents):
+    """Return the number of documents, tokens and distinct terms of a tokenized corpus."""
+    return {
+        'documents': len(documents),
+        'tokens': int(sum(len(document) for document in documents)),
+        'vocabulary': len({token for document in documents for token in document}),
+    }
+
+
+def split_batches(documents, batch_size):
+    """Split documents into consecutive batches of at most `batch_size` documents."""
+    return [documents[start:start + batch_size] for start in range(0, len(documents), batch_size)]
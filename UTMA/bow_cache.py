@@ -0,0 +1,239 @@
+# bow_cache.py - Worker-Side Bag-of-Words Cache for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script provides a content-addressed cache of bag-of-words corpora for the Unified Topic Modeling and
+# Analysis (UTMA). Every grid task on the same batch converts the same documents with the same Dictionary;
+# the cache lets tasks for different hyperparameters reuse that conversion. It is installed on each Dask
+# worker through a WorkerPlugin so it survives across tasks, is bounded by bytes with LRU eviction, and keeps
+# hit/miss counters that can be collected with `client.run(bow_cache_stats)`.
+#
+# Functions:
+# - BowCache: Thread-safe LRU cache bounded by an approximate byte budget.
+# - BowCachePlugin: Dask WorkerPlugin that attaches a BowCache to every worker.
+# - batch_content_hash: Content hash of a batch of tokenized documents.
+# - cached_dictionary / cached_doc2bow: Cache-aware Dictionary construction and BoW conversion of token lists
+#   or integer-encoded batches.
+# - bow_cache_stats: Reports the cache counters of a worker.
+#
+# Dependencies:
+# - Python libraries: hashlib, threading, collections, logging
+# - Dask libraries: distributed
+# - Gensim library for the Dictionary
+#
+# Developed with AI assistance.
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from dask.distributed import WorkerPlugin, get_worker
+from gensim.corpora import Dictionary
+
+from .encoded_corpus import EncodedBatch, encoded_doc2bow
+
+# Approximate CPython cost of one (token_id, count) tuple in a BoW list: list slot, tuple and two ints
+BOW_ENTRY_BYTES = 120
+# Approximate CPython cost of one Dictionary entry across token2id, dfs and cfs
+DICTIONARY_ENTRY_BYTES = 250
+
+# Attribute under which the cache is attached to a worker
+WORKER_ATTRIBUTE = "utma_bow_cache"
+
+
+class BowCache:
+    """
+    A thread-safe LRU cache bounded by an approximate number of bytes.
+
+    Entries are evicted least-recently-used first once `max_bytes` is exceeded. An entry larger
+    than the whole budget is not stored, and putting a key again with such a size drops it.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class BowCachePlugin(WorkerPlugin):
+    """
+    Dask WorkerPlugin that attaches a `BowCache` to each worker.
+
+    Register once per client with `client.register_plugin(BowCachePlugin(max_bytes))`; workers
+    added later by adaptive scaling receive the plugin as well.
+    """
+
+    name = "utma-bow-cache"
+
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+
+    def setup(self, worker):
+        setattr(worker, WORKER_ATTRIBUTE, BowCache(self.max_bytes))
+
+    def teardown(self, worker):
+        if hasattr(worker, WORKER_ATTRIBUTE):
+            delattr(worker, WORKER_ATTRIBUTE)
+
+
+def get_worker_cache():
+    """Return the BowCache of the current Dask worker, or None outside a worker or without the plugin."""
+    try:
+        worker = get_worker()
+    except ValueError:
+        return None
+    return getattr(worker, WORKER_ATTRIBUTE, None)
+
+
+def batch_content_hash(documents):
+    """
+    Computes a content hash of a batch of tokenized documents.
+
+    Document boundaries are part of the hash, so batches with the same tokens split differently
+    do not collide.
+
+    Args:
+        documents (iterable of list of str): The tokenized documents.
+
+    Returns:
+        str: Hex MD5 digest of the batch content.
+    """
+    content_hash = hashlib.md5()
+    for doc_tokens in documents:
+        content_hash.update(' '.join(doc_tokens).encode())
+        content_hash.update(b'\n')
+    return content_hash.hexdigest()
+
+
+def cached_dictionary(documents, content_hash=None):
+    """
+    Returns the per-batch Dictionary for `documents`, reusing a cached one on this worker if available.
+
+    Args:
+        documents (iterable of list of str): The tokenized training documents.
+        content_hash (str or None): Precomputed `batch_content_hash(documents)`.
+
+    Returns:
+        Dictionary: The Dictionary built from `documents`.
+    """
+    cache = get_worker_cache()
+    if cache is None:
+        return Dictionary(list(documents))
+
+    key = ('dictionary', content_hash or batch_content_hash(documents))
+    dictionary = cache.get(key)
+    if dictionary is None:
+        dictionary = Dictionary(list(documents))
+        cache.put(key, dictionary, len(dictionary) * DICTIONARY_ENTRY_BYTES)
+    return dictionary
+
+
+def cached_doc2bow(documents, dictionary, dictionary_key, content_hash=None, vocabulary=None):
+    """
+    Converts documents to bag-of-words with `dictionary`, reusing a cached conversion on this worker if available.
+
+    Args:
+        documents (iterable of list of str or EncodedBatch): The documents to convert. Integer-encoded
+            batches are converted from their token ids (see `encoded_doc2bow`) without being decoded.
+        dictionary (Dictionary): The Dictionary used for the conversion.
+        dictionary_key (str): Identifies the Dictionary's content, e.g. `PreparedDictionary.dictionary_hash`
+            or the content hash of the batch the Dictionary was built from.
+        content_hash (str or None): Precomputed `batch_content_hash(documents)`, or
+            `EncodedBatch.content_hash()` for an encoded batch.
+        vocabulary (list of str): Vocabulary of the encoded corpus; required for encoded batches.
+
+    Returns:
+        list: The BoW corpus, one list of (token_id, count) tuples per document. Cached corpora are
+        shared between tasks and must not be modified.
+    """
+    encoded = isinstance(documents, EncodedBatch)
+
+    def convert():
+        if encoded:
+            return encoded_doc2bow(documents, vocabulary, dictionary)
+        return [dictionary.doc2bow(doc_tokens) for doc_tokens in documents]
+
+    cache = get_worker_cache()
+    if cache is None:
+        return convert()
+
+    if content_hash is None:
+        content_hash = documents.content_hash() if encoded else batch_content_hash(documents)
+    key = ('bow', content_hash, dictionary_key)
+    bow_corpus = cache.get(key)
+    if bow_corpus is None:
+        bow_corpus = convert()
+        nbytes = sum(56 + len(bow_doc) * BOW_ENTRY_BYTES for bow_doc in bow_corpus)
+        cache.put(key, bow_corpus, nbytes)
+    return bow_corpus
+
+
+def bow_cache_stats(dask_worker=None):
+    """
+    Reports the BoW cache counters of a worker.
+
+    Intended for `client.run(bow_cache_stats)`, which passes the worker as `dask_worker` and
+    returns one result per worker address.
+
+    Returns:
+        dict or None: Counters from `BowCache.stats`, or None if the plugin is not installed.
+    """
+    worker = dask_worker if dask_worker is not None else get_worker()
+    cache = getattr(worker, WORKER_ATTRIBUTE, None)
+    return cache.stats() if cache is not None else None
+
+
+def log_bow_cache_stats(client, label=""):
+    """Collect the cache counters from all workers and log a per-worker and total summary."""
+    try:
+        worker_stats = client.run(bow_cache_stats)
+    except Exception as e:
+        logging.error(f"Could not collect BoW cache statistics: {e}")
+        return {}
+
+    hits = sum(stats['hits'] for stats in worker_stats.values() if stats)
+    misses = sum(stats['misses'] for stats in worker_stats.values() if stats)
+    for address, stats in worker_stats.items():
+        logging.info(f"BoW cache {label} {address}: {stats}")
+    logging.info(f"BoW cache {label} total: {hits} hits, {misses} misses.")
+    return worker_stats
@@ -0,0 +1,367 @@
+# coherence_engine.py - Precomputed Co-occurrence Statistics for Topic Coherence in UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script computes the co-occurrence statistics behind topic coherence once per text collection for the
+# Unified Topic Modeling and Analysis (UTMA), instead of letting a new gensim CoherenceModel rescan the texts
+# for every model. The texts are encoded to Dictionary ids once. Document frequencies and document
+# co-occurrences come from a boolean document-term matrix; windowed occurrence and co-occurrence counts (110-word
+# windows for c_v, 10-word windows for c_npmi and c_uci) are accumulated chunk by chunk as a sparse word-word
+# matrix over the words that have been asked for. New top words extend that matrix with one more pass that only
+# computes their rows, so later models on the same texts mostly become lookups. c_v, c_npmi, u_mass and c_uci
+# then follow from vectorized numpy math over the n x n statistics of each topic's top words. The engine is
+# cached on the Dask worker next to the bag-of-words corpora (see bow_cache.py), so every hyperparameter
+# configuration scored on the same batch reuses it.
+#
+# The measures follow gensim's pipelines (segmentation, probability estimation, confirmation measure and
+# arithmetic-mean aggregation) and reproduce its window accounting exactly, so scores stay comparable with runs
+# scored by CoherenceModel. gensim slides each window by one token and clears the flag of the word that leaves
+# the left edge even when the word still occurs inside the window; the flag is set again only when another
+# occurrence enters at the right edge. A word is therefore counted in a window only from the entry of one of
+# its occurrences until the first of its occurrences leaves, which is what `_window_matrix` counts.
+# gensim's CoherenceModel stays available as a fallback backend (`score_model_topics_gensim`).
+#
+# Functions:
+# - top_topic_ids: Dictionary ids of the top words of every topic of a model.
+# - CoherenceEngine: Cached co-occurrence statistics and the c_v, c_npmi, u_mass and c_uci measures.
+# - score_model_topics: Model coherence, per-topic coherence and coherence-sorted top words in one pass.
+# - score_model_topics_gensim: The same scores from gensim's CoherenceModel, kept as a fallback backend.
+# - cached_coherence_engine: Returns the engine for a batch of texts from the worker cache, building it once.
+#
+# Dependencies:
+# - Python libraries: threading, logging, numpy, scipy
+# - Gensim library for the CoherenceModel fallback
+#
+# Developed with AI assistance.
+
+import threading
+import logging
+
+import numpy as np
+from scipy import sparse
+from gensim.models import CoherenceModel
+
+from .bow_cache import get_worker_cache, batch_content_hash
+
+# Number of top words per topic used for coherence (the CoherenceModel default)
+COHERENCE_TOPN = 20
+
+# Supported measures and the sliding-window size of the windowed ones (gensim defaults)
+COHERENCE_MEASURES = ('c_v', 'c_npmi', 'u_mass', 'c_uci')
+COHERENCE_WINDOWS = {'c_v': 110, 'c_npmi': 10, 'c_uci': 10}
+
+# Coherence backends: the cached engine of this module, or gensim's CoherenceModel as a fallback
+COHERENCE_BACKENDS = ('engine', 'gensim')
+
+# Smoothing constant of gensim's confirmation measures
+COHERENCE_EPSILON = 1e-12
+
+# Windows processed per chunk when counting windowed co-occurrences
+CHUNK_WINDOWS = 20000
+
+
+def top_topic_ids(ldamodel, topn=COHERENCE_TOPN):
+    """
+    Returns the Dictionary ids of the `topn` most probable words of every topic.
+
+    Returns:
+        numpy.ndarray: (num_topics, topn) ids, most probable first.
+    """
+    topics = ldamodel.get_topics()
+    topn = min(topn, topics.shape[1])
+    candidates = np.argpartition(-topics, topn - 1, axis=1)[:, :topn]
+    order = np.argsort(-np.take_along_axis(topics, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class CoherenceEngine:
+    """
+    Co-occurrence statistics of one text collection, computed once and reused for every model.
+
+    The Dictionary must be the one the scored models were trained with. Methods are thread-safe,
+    so one cached engine can serve concurrent tasks on a worker.
+    """
+
+    def __init__(self, texts, dictionary):
+        self.dictionary = dictionary
+        self.num_terms = max(dictionary.token2id.values(), default=-1) + 1
+        token2id = dictionary.token2id
+        self.lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        self.token_ids = np.fromiter(
+            (token2id.get(token, -1) for text in texts for token in text), dtype=np.int32, count=int(self.lengths.sum())
+        )
+        self.doc_offsets = np.concatenate([[0], np.cumsum(self.lengths)])
+        self.num_docs = len(texts)
+
+        self._doc_term = None
+        self._windows = {}
+        self._lock = threading.Lock()
+        # (BowCache, key) of a worker-cached engine, set by `cached_coherence_engine`
+        self._cache_entry = None
+        self._cached_bytes = 0
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the engine."""
+        total = self.token_ids.nbytes + self.lengths.nbytes + self.doc_offsets.nbytes
+        if self._doc_term is not None:
+            total += self._doc_term.data.nbytes + self._doc_term.indices.nbytes + self._doc_term.indptr.nbytes
+        for state in self._windows.values():
+            counts = state['counts']
+            total += state['columns'].nbytes + counts.data.nbytes + counts.indices.nbytes + counts.indptr.nbytes
+        return total
+
+    def _doc_term_matrix(self):
+        """Boolean (num_docs x num_terms) CSC matrix of the words each document contains."""
+        if self._doc_term is None:
+            valid = self.token_ids >= 0
+            rows = np.repeat(np.arange(self.num_docs), self.lengths)[valid]
+            matrix = sparse.csr_matrix(
+                (np.ones(int(valid.sum()), dtype=np.int32), (rows, self.token_ids[valid])),
+                shape=(self.num_docs, self.num_terms)
+            )
+            matrix.data[:] = 1
+            self._doc_term = matrix.tocsc()
+        return self._doc_term
+
+    def _window_state(self, window_size):
+        state = self._windows.get(window_size)
+        if state is None:
+            windows_per_doc = np.maximum(1, self.lengths - window_size + 1)
+            state = {
+                'columns': np.full(self.num_terms, -1, dtype=np.int64),
+                'counts': sparse.csr_matrix((0, 0), dtype=np.int64),
+                'windows_per_doc': windows_per_doc,
+                'window_offsets': np.concatenate([[0], np.cumsum(windows_per_doc)]),
+            }
+            self._windows[window_size] = state
+        return state
+
+    def _window_matrix(self, state, window_size, first_doc, last_doc):
+        """Boolean (windows x columns) matrix of the counted words in every window of documents [first_doc, last_doc)."""
+        start, end = self.doc_offsets[first_doc], self.doc_offsets[last_doc]
+        token_ids = self.token_ids[start:end]
+        columns = np.full(len(token_ids), -1, dtype=np.int64)
+        valid = token_ids >= 0
+        columns[valid] = state['columns'][token_ids[valid]]
+        positions = np.nonzero(columns >= 0)[0]
+
+        doc_ids = np.repeat(np.arange(first_doc, last_doc), self.lengths[first_doc:last_doc])[positions]
+        offsets = positions + start - self.doc_offsets[doc_ids]
+        # An occurrence at offset p enters the window of its document at max(0, p - size + 1) and stays
+        # counted until the first occurrence q of the same word at or after that window leaves, which
+        # happens after window q (gensim's `_slide_window`); for a single occurrence q = p.
+        first_window = np.maximum(0, offsets - window_size + 1)
+        order = np.lexsort((offsets, columns[positions], doc_ids))
+        group_starts = np.ones(len(order), dtype=bool)
+        group_starts[1:] = (doc_ids[order][1:] != doc_ids[order][:-1]) | \
+                           (columns[positions][order][1:] != columns[positions][order][:-1])
+        groups = np.empty(len(order), dtype=np.int64)
+        groups[order] = np.cumsum(group_starts) - 1
+        stride = int(offsets.max()) + 1 if len(offsets) else 1
+        sorted_keys = groups[order] * stride + offsets[order]
+        first_leaving = offsets[order][np.searchsorted(sorted_keys, groups * stride + first_window)]
+        last_window = np.minimum(first_leaving, state['windows_per_doc'][doc_ids] - 1)
+        spans = last_window - first_window + 1
+        rows = np.repeat(state['window_offsets'][doc_ids] + first_window - state['window_offsets'][first_doc], spans)
+        rows += np.arange(int(spans.sum())) - np.repeat(np.cumsum(spans) - spans, spans)
+
+        num_windows = int(state['window_offsets'][last_doc] - state['window_offsets'][first_doc])
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, np.repeat(columns[positions], spans))),
+            shape=(num_windows, state['counts'].shape[0])
+        )
+        matrix.data[:] = 1
+        return matrix
+
+    def _extend_windows(self, window_size, token_ids):
+        """Adds the windowed counts of the words in `token_ids` that are not counted yet."""
+        state = self._window_state(window_size)
+        token_ids = np.unique(np.asarray(token_ids, dtype=np.int64))
+        new_ids = token_ids[state['columns'][token_ids] < 0]
+        if not len(new_ids):
+            return state
+
+        old_size = state['counts'].shape[0]
+        size = old_size + len(new_ids)
+        state['columns'][new_ids] = np.arange(old_size, size)
+        state['counts'].resize((size, size))
+
+        # Co-occurrences of the new words with every counted word, one chunk of documents at a time
+        block = sparse.csr_matrix((size, len(new_ids)), dtype=np.int64)
+        window_offsets = state['window_offsets']
+        first_doc = 0
+        while first_doc < self.num_docs:
+            last_doc = int(np.searchsorted(window_offsets, window_offsets[first_doc] + CHUNK_WINDOWS, side='right')) - 1
+            last_doc = min(self.num_docs, max(first_doc + 1, last_doc))
+            windows = self._window_matrix(state, window_size, first_doc, last_doc)
+            block = block + (windows.T @ windows[:, old_size:]).astype(np.int64)
+            first_doc = last_doc
+
+        block = block.tocsr()
+        state['counts'] = sparse.bmat([
+            [state['counts'][:old_size, :old_size], block[:old_size]],
+            [block[:old_size].T, block[old_size:]],
+        ], format='csr', dtype=np.int64)
+        logging.debug(f"Coherence engine counts {size} words in {window_size}-word windows.")
+        return state
+
+    def precompute(self, topics, measures=('c_v',)):
+        """Counts the statistics the measures need for the top words of `topics` (arrays of Dictionary ids) in one pass."""
+        token_ids = np.concatenate([np.ravel(topic) for topic in topics]) if len(topics) else np.zeros(0, dtype=np.int64)
+        with self._lock:
+            for window_size in {COHERENCE_WINDOWS[measure] for measure in measures if measure in COHERENCE_WINDOWS}:
+                self._extend_windows(window_size, token_ids)
+            if 'u_mass' in measures:
+                self._doc_term_matrix()
+            nbytes = self.nbytes
+        self._update_cache_entry(nbytes)
+
+    def _update_cache_entry(self, nbytes):
+        """Re-puts a worker-cached engine that has grown, so its current size counts against the cache budget."""
+        if self._cache_entry is None or nbytes == self._cached_bytes:
+            return
+        cache, key = self._cache_entry
+        self._cached_bytes = nbytes
+        cache.put(key, self, nbytes)
+
+    def _statistics(self, measure, topic):
+        """Co-occurrence counts (n x n, occurrences on the diagonal) of a topic's words and the number of (virtual) documents."""
+        if measure == 'u_mass':
+            columns = self._doc_term_matrix()[:, topic]
+            return (columns.T @ columns).toarray().astype(np.float64), self.num_docs
+        state = self._windows[COHERENCE_WINDOWS[measure]]
+        indices = state['columns'][topic]
+        return state['counts'][indices][:, indices].toarray().astype(np.float64), int(state['window_offsets'][-1])
+
+    def topic_coherences(self, topics, measure='c_v'):
+        """
+        Computes the coherence of every topic.
+
+        Args:
+            topics (array-like): Dictionary ids of the top words of each topic, e.g. from `top_topic_ids`.
+            measure (str): One of `COHERENCE_MEASURES`.
+
+        Returns:
+            numpy.ndarray: Coherence per topic.
+        """
+        if measure not in COHERENCE_MEASURES:
+            raise ValueError(f"Unsupported coherence measure '{measure}'; expected one of {COHERENCE_MEASURES}.")
+        topics = [np.asarray(topic, dtype=np.int64) for topic in topics]
+        self.precompute(topics, (measure,))
+
+        scores = np.zeros(len(topics))
+        with self._lock, np.errstate(divide='ignore', invalid='ignore'):
+            for topic_index, topic in enumerate(topics):
+                counts, num_docs = self._statistics(measure, topic)
+                occurrences = np.diag(counts)
+                joint = counts / num_docs + COHERENCE_EPSILON
+
+                if measure == 'u_mass':
+                    # One-preceding segmentation: each word conditioned on every word ranked above it
+                    log_conditional = np.log(joint / (occurrences / num_docs)[None, :])
+                    scores[topic_index] = np.mean(log_conditional[np.tril_indices(len(topic), -1)])
+                    continue
+
+                probabilities = occurrences / num_docs
+                log_ratio = np.log(joint / np.outer(probabilities, probabilities))
+                npmi = log_ratio / -np.log(counts / num_docs + COHERENCE_EPSILON)
+                if measure == 'c_v':
+                    # One-set segmentation with indirect cosine similarity of NPMI context vectors
+                    topic_vector = npmi.sum(axis=0)
+                    cosines = npmi @ topic_vector / (np.linalg.norm(npmi, axis=1) * np.linalg.norm(topic_vector))
+                    scores[topic_index] = np.mean(cosines)
+                else:
+                    # One-one segmentation over all ordered pairs of distinct words
+                    measure_matrix = npmi if measure == 'c_npmi' else log_ratio
+                    scores[topic_index] = np.mean(measure_matrix[~np.eye(len(topic), dtype=bool)])
+        return scores
+
+    def coherence(self, topics, measure='c_v'):
+        """Mean coherence over topics, as returned by `CoherenceModel.get_coherence`."""
+        return float(np.mean(self.topic_coherences(topics, measure)))
+
+
+def score_model_topics(ldamodel, engine, measure='c_v', topn=COHERENCE_TOPN):
+    """
+    Scores a model from one pass over the engine's statistics.
+
+    Replaces a `CoherenceModel.get_coherence` call followed by `LdaModel.top_topics`, which computed
+    coherence a second time: the per-topic scores give the model coherence (their mean) and the
+    order of the top words, most coherent topic first.
+
+    Args:
+        ldamodel (LdaModel): Model trained with the engine's Dictionary.
+        engine (CoherenceEngine): Statistics of the texts the model is scored on.
+        measure (str): One of `COHERENCE_MEASURES`.
+        topn (int): Top words per topic.
+
+    Returns:
+        dict: `coherence` (float), `topic_coherence` (list of float, by topic id) and `top_words`
+        (list of word lists, sorted by descending topic coherence).
+    """
+    topics = top_topic_ids(ldamodel, topn)
+    return _model_topic_scores(ldamodel, topics, engine.topic_coherences(topics, measure))
+
+
+def score_model_topics_gensim(ldamodel, texts, dictionary, measure='c_v', topn=COHERENCE_TOPN):
+    """
+    Scores a model with gensim's CoherenceModel, as a fallback to the coherence engine.
+
+    The same top words are passed to `CoherenceModel.get_coherence_per_topic`, so both backends
+    return the same scores; this one rescans the texts for every model.
+
+    Args:
+        ldamodel (LdaModel): Model trained with `dictionary`.
+        texts (list of list of str): Tokenized documents coherence is measured on.
+        dictionary (Dictionary): Dictionary of the model.
+        measure (str): One of `COHERENCE_MEASURES`.
+        topn (int): Top words per topic.
+
+    Returns:
+        dict: As for `score_model_topics`.
+    """
+    topics = top_topic_ids(ldamodel, topn)
+    coherence_model = CoherenceModel(topics=[[dictionary[int(token_id)] for token_id in topic] for topic in topics],
+                                     texts=texts, dictionary=dictionary, coherence=measure, topn=topics.shape[1],
+                                     processes=1)
+    return _model_topic_scores(ldamodel, topics, np.asarray(coherence_model.get_coherence_per_topic(), dtype=float))
+
+
+def _model_topic_scores(ldamodel, topics, topic_coherence):
+    """Model coherence, per-topic coherence and coherence-sorted top words of `score_model_topics`."""
+    # NaN scores (words absent from the texts) sort last, as in `top_topics`
+    order = np.argsort(-np.nan_to_num(topic_coherence, nan=-np.inf), kind='stable')
+    return {
+        'coherence': float(np.mean(topic_coherence)),
+        'topic_coherence': [float(score) for score in topic_coherence],
+        'top_words': [[ldamodel.id2word[int(token_id)] for token_id in topics[topic_id]] for topic_id in order],
+    }
+
+
+def cached_coherence_engine(texts, dictionary, dictionary_key, content_hash=None):
+    """
+    Returns the CoherenceEngine of `texts`, reusing the one cached on this Dask worker if available.
+
+    Args:
+        texts (list of list of str): Tokenized documents coherence is measured on.
+        dictionary (Dictionary): Dictionary of the scored models.
+        dictionary_key (str): Identifies the Dictionary's content (see `cached_doc2bow`).
+        content_hash (str or None): Precomputed `batch_content_hash(texts)`.
+
+    Returns:
+        CoherenceEngine: The engine; a cached engine is re-put with its new size whenever counting new
+        top words grows it, and is dropped from the cache once it outgrows the whole budget.
+    """
+    cache = get_worker_cache()
+    if cache is None:
+        return CoherenceEngine(texts, dictionary)
+
+    key = ('coherence', content_hash or batch_content_hash(texts), dictionary_key)
+    engine = cache.get(key)
+    if engine is None:
+        engine = CoherenceEngine(texts, dictionary)
+        engine._cache_entry = (cache, key)
+        engine._update_cache_entry(engine.nbytes)
+    return engine
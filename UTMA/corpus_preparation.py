@@ -0,0 +1,90 @@
+# corpus_preparation.py - Corpus Preparation Stage for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script provides the corpus-preparation stage of the Unified Topic Modeling and Analysis (UTMA).
+# A single Gensim Dictionary is built from the training split, pruned with `filter_extremes`, pickled once,
+# and shared with the Dask workers by reference. Every (n_topics, alpha, beta, phase) task then reuses the
+# same vocabulary instead of rebuilding one per task.
+#
+# Functions:
+# - PreparedDictionary: The training Dictionary together with its pickled bytes and content hash.
+# - update_training_dictionary: Adds a batch of training documents to the Dictionary being built.
+# - prepare_training_dictionary: Prunes the Dictionary and wraps it for sharing with workers.
+#
+# Dependencies:
+# - Python libraries: pickle, hashlib, logging
+# - Gensim library for the Dictionary
+#
+# Developed with AI assistance.
+
+import pickle
+import hashlib
+import logging
+
+from gensim.corpora import Dictionary
+
+from .encoded_corpus import EncodedBatch
+
+
+class PreparedDictionary:
+    """
+    A training Dictionary prepared once per corpus and shared with workers by reference.
+
+    Attributes:
+        dictionary (Dictionary): The pruned, compacted training Dictionary.
+        dictionary_bytes (bytes): The Dictionary pickled once, reused in every result dict.
+        dictionary_hash (str): MD5 of `dictionary_bytes`, identifying this vocabulary.
+    """
+
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self.dictionary_bytes = pickle.dumps(dictionary)
+        self.dictionary_hash = hashlib.md5(self.dictionary_bytes).hexdigest()
+
+    def __len__(self):
+        return len(self.dictionary)
+
+
+def update_training_dictionary(dictionary, documents, vocabulary=None):
+    """
+    Adds a batch of training documents to a Dictionary under construction.
+
+    Args:
+        dictionary (Dictionary or None): The Dictionary being built, updated in place; a new one is created if None.
+        documents (list of list of str or EncodedBatch): A training batch as yielded by the dataset generators.
+        vocabulary (list of str): Vocabulary of the encoded corpus, required for `EncodedBatch` input.
+
+    Returns:
+        Dictionary: The updated Dictionary.
+    """
+    if dictionary is None:
+        dictionary = Dictionary()
+    if isinstance(documents, EncodedBatch):
+        documents = documents.decode(vocabulary)
+    dictionary.add_documents(documents)
+    return dictionary
+
+
+def prepare_training_dictionary(dictionary, no_below=5, no_above=0.5, keep_n=100000, keep_tokens=None):
+    """
+    Prunes the training Dictionary and wraps it for sharing with the Dask workers.
+
+    Args:
+        dictionary (Dictionary): Dictionary built from the full training split.
+        no_below (int): Keep tokens appearing in at least this many documents.
+        no_above (float): Keep tokens appearing in at most this fraction of documents.
+        keep_n (int or None): Keep only the `keep_n` most frequent tokens after the above filters.
+        keep_tokens (iterable of str or None): Tokens to keep regardless of the filters.
+
+    Returns:
+        PreparedDictionary: The pruned Dictionary with its pickled bytes and hash.
+    """
+    vocabulary_size = len(dictionary)
+    dictionary.filter_extremes(no_below=no_below, no_above=no_above, keep_n=keep_n, keep_tokens=keep_tokens)
+    dictionary.compactify()
+
+    logging.info(f"Training dictionary pruned from {vocabulary_size} to {len(dictionary)} tokens "
+                 f"(no_below={no_below}, no_above={no_above}, keep_n={keep_n}).")
+    return PreparedDictionary(dictionary)
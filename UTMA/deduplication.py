@@ -0,0 +1,293 @@
+# deduplication.py - MinHash Near-Duplicate Elimination for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script removes exact and near-duplicate documents before the Unified Topic Modeling and Analysis (UTMA)
+# splits a corpus. Boilerplate and repeated paragraphs are common in report-style corpora; they inflate
+# training time and pull topics toward the repeated text. Each document is reduced to a MinHash signature of
+# its token shingles, and signatures are bucketed with LSH banding so candidate duplicates are found without
+# pairwise comparison. Signatures are computed in parallel on the Dask workers over byte ranges of the JSONL
+# input; the driver then makes a single ordered pass over them, keeping the first occurrence of every group of
+# near-duplicates, and the workers write the surviving documents to new JSONL shards.
+#
+# Functions:
+# - MinHasher: Computes MinHash signatures, LSH band keys and content hashes of tokenized documents.
+# - NearDuplicateIndex: Streaming LSH index that classifies documents as unique, exact or near duplicates.
+# - minhash_block / write_deduplicated_block: Worker-side signature and output passes over one input block.
+# - deduplicate_documents: Single-process streaming deduplication of an iterable of documents.
+# - deduplicate_corpus: Parallel deduplication of a JSON/JSONL data source on the Dask cluster.
+#
+# Dependencies:
+# - Python libraries: os, json, zlib, hashlib, logging, numpy
+# - Dask libraries: distributed
+#
+# Developed with AI assistance.
+
+import os
+import json
+import zlib
+import hashlib
+import logging
+
+import numpy as np
+
+from .process_futures import iter_documents, is_jsonl_source, list_jsonl_shards, remove_jsonl_shards
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_BLOCK_BYTES = 64 * 1024 ** 2
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of token shingles and the LSH band keys derived from them.
+
+    Two documents whose shingle sets have Jaccard similarity `s` agree on each signature position
+    with probability `s`; with `bands` bands of `num_perm / bands` rows they share at least one band
+    key with probability `1 - (1 - s ** rows) ** bands`. All parameters are derived from `seed`, so
+    workers constructing or receiving the same hasher produce identical signatures.
+    """
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, shingle_size=DEFAULT_SHINGLE_SIZE, seed=0):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands}).")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.row_multipliers = rng.randint(1, 2 ** 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self.band_salts = rng.randint(0, 2 ** 63, size=bands, dtype=np.uint64)
+
+    def shingle_hashes(self, tokens):
+        """Return the unique 32-bit hashes of the token shingles of a document."""
+        size = min(self.shingle_size, len(tokens))
+        shingles = {'\x1f'.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)} if size else set()
+        return np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+    def signature(self, tokens):
+        """Return the MinHash signature of a document as a uint32 array of length `num_perm`."""
+        hashes = self.shingle_hashes(tokens)
+        if not len(hashes):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signatures):
+        """Return an (n, bands) uint64 array with one LSH bucket key per band of each signature."""
+        banded = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (banded * self.row_multipliers).sum(axis=2, dtype=np.uint64) ^ self.band_salts
+
+    @staticmethod
+    def content_hash(tokens):
+        """Return a 64-bit hash of the exact token sequence."""
+        return int.from_bytes(hashlib.blake2b('\x1f'.join(tokens).encode(), digest_size=8).digest(), 'little')
+
+    def sketch(self, documents):
+        """
+        Compute content hashes, band keys and signatures of a sequence of documents.
+
+        Returns:
+            dict: `content_hashes` (n,) uint64, `band_keys` (n, bands) uint64 and `signatures` (n, num_perm) uint32.
+        """
+        signatures = np.zeros((len(documents), self.num_perm), dtype=np.uint32)
+        for row, document in enumerate(documents):
+            signatures[row] = self.signature(document)
+        return {
+            'content_hashes': np.fromiter((self.content_hash(document) for document in documents), dtype=np.uint64,
+                                          count=len(documents)),
+            'band_keys': self.band_keys(signatures),
+            'signatures': signatures,
+        }
+
+
+class NearDuplicateIndex:
+    """
+    Streaming LSH index over the documents kept so far.
+
+    Documents are classified in arrival order: an exact duplicate repeats the content hash of a kept
+    document; a near duplicate shares an LSH bucket with a kept document whose signatures agree on at
+    least `threshold` of their positions. Everything else is kept and indexed.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.content_hashes = set()
+        self.buckets = {}
+        self.signatures = []
+        self.counts = {'documents_in': 0, 'documents_out': 0, 'exact_duplicates': 0, 'near_duplicates': 0}
+
+    def add(self, content_hash, band_keys, signature):
+        """
+        Classifies one document and indexes it if it is kept.
+
+        Returns:
+            str: 'unique', 'exact' or 'near'.
+        """
+        self.counts['documents_in'] += 1
+        if content_hash in self.content_hashes:
+            self.counts['exact_duplicates'] += 1
+            return 'exact'
+
+        candidates = {self.buckets[key] for key in band_keys if key in self.buckets}
+        for candidate in candidates:
+            if np.mean(self.signatures[candidate] == signature) >= self.threshold:
+                self.counts['near_duplicates'] += 1
+                return 'near'
+
+        kept_id = len(self.signatures)
+        self.signatures.append(signature)
+        self.content_hashes.add(content_hash)
+        for key in band_keys:
+            self.buckets.setdefault(key, kept_id)
+        self.counts['documents_out'] += 1
+        return 'unique'
+
+    def add_sketch(self, sketch):
+        """Classify every document of a `MinHasher.sketch` result; returns a boolean keep mask."""
+        keep = np.zeros(len(sketch['signatures']), dtype=bool)
+        band_keys = sketch['band_keys'].tolist()
+        for row, content_hash in enumerate(sketch['content_hashes'].tolist()):
+            keep[row] = self.add(content_hash, band_keys[row], sketch['signatures'][row]) == 'unique'
+        return keep
+
+
+def _iter_block(path, start, end):
+    """Yield the documents of a JSONL file whose lines start in the byte range [start, end), or of a whole JSON list."""
+    if start is None:
+        yield from iter_documents(path)
+        return
+    with open(path, 'rb') as infile:
+        if start:
+            # Step back one byte so a line beginning exactly at `start` is not skipped
+            infile.seek(start - 1)
+            infile.readline()
+        position = infile.tell()
+        while position < end:
+            line = infile.readline()
+            if not line:
+                break
+            position += len(line)
+            if line.strip():
+                yield json.loads(line)
+
+
+def list_input_blocks(data_source, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Splits a data source into blocks that can be processed independently.
+
+    JSONL files are cut into byte ranges of about `block_bytes`; a JSON list forms a single block.
+
+    Returns:
+        list: (path, start, end) tuples in document order; start and end are None for a JSON list.
+    """
+    if not is_jsonl_source(data_source):
+        return [(data_source, None, None)]
+    blocks = []
+    for shard in list_jsonl_shards(data_source):
+        size = os.path.getsize(shard)
+        blocks.extend((shard, start, min(start + block_bytes, size)) for start in range(0, max(size, 1), block_bytes))
+    return blocks
+
+
+def minhash_block(block, hasher):
+    """Worker task: sketch every document of one input block."""
+    return hasher.sketch(list(_iter_block(*block)))
+
+
+def write_deduplicated_block(block, keep, output_path):
+    """Worker task: write the documents of one input block selected by `keep` to a JSONL shard."""
+    written = 0
+    with open(output_path, 'w', encoding='utf-8') as outfile:
+        for document, kept in zip(_iter_block(*block), keep):
+            if kept:
+                outfile.write(json.dumps(document, ensure_ascii=False) + '\n')
+                written += 1
+    return written
+
+
+def deduplicate_documents(documents, hasher=None, index=None, chunk_size=1000):
+    """
+    Removes exact and near duplicates from an iterable of documents in one streaming pass, in process.
+
+    Args:
+        documents (iterable of list of str): Tokenized documents.
+        hasher (MinHasher or None): Signature parameters; a default `MinHasher` if None.
+        index (NearDuplicateIndex or None): Index to classify against; pass one to read its `counts`
+            afterwards. A new index with the default threshold is used if None.
+        chunk_size (int): Number of documents sketched together.
+
+    Yields:
+        list of str: The first occurrence of every group of duplicates, in input order.
+    """
+    hasher = hasher or MinHasher()
+    index = index if index is not None else NearDuplicateIndex()
+    chunk = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) >= chunk_size:
+            yield from (doc for doc, kept in zip(chunk, index.add_sketch(hasher.sketch(chunk))) if kept)
+            chunk = []
+    if chunk:
+        yield from (doc for doc, kept in zip(chunk, index.add_sketch(hasher.sketch(chunk))) if kept)
+
+
+def deduplicate_corpus(client, data_source, output_dir, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM,
+                       bands=DEFAULT_BANDS, shingle_size=DEFAULT_SHINGLE_SIZE, block_bytes=DEFAULT_BLOCK_BYTES, seed=0):
+    """
+    Removes exact and near-duplicate documents from a data source using the Dask cluster.
+
+    Workers sketch the input blocks in parallel; the driver consumes the sketches in document order,
+    so the kept document of every duplicate group is its first occurrence, exactly as in a sequential
+    pass. The workers then write the kept documents of each block to `dedup-{block:05d}.jsonl`.
+
+    Args:
+        client (Client): Dask client.
+        data_source (str): JSON file, JSONL file or directory of JSONL shards.
+        output_dir (str): Directory receiving the deduplicated shards and `dedup-summary.json`; shards of a
+            previous run in it are removed first.
+        threshold (float): Minimum estimated Jaccard similarity for a near duplicate.
+        num_perm (int): Length of the MinHash signatures.
+        bands (int): Number of LSH bands; `num_perm` must be a multiple of it.
+        shingle_size (int): Number of consecutive tokens per shingle.
+        block_bytes (int): Approximate size of the JSONL byte ranges processed per task.
+        seed (int): Seed of the hash functions.
+
+    Returns:
+        tuple: (`output_dir`, usable as the new data source, and the dict of dedup counts).
+    """
+    if os.path.abspath(output_dir) == os.path.abspath(data_source):
+        raise ValueError(f"Deduplication cannot write its output into its data source {data_source}.")
+    # Shards of an earlier run with more blocks would otherwise be read as part of this output
+    os.makedirs(output_dir, exist_ok=True)
+    remove_jsonl_shards(output_dir, "dedup-")
+    hasher = MinHasher(num_perm=num_perm, bands=bands, shingle_size=shingle_size, seed=seed)
+    hasher_future = client.scatter([hasher], broadcast=True)[0]
+    blocks = list_input_blocks(data_source, block_bytes)
+
+    index = NearDuplicateIndex(threshold)
+    sketch_futures = client.map(minhash_block, blocks, hasher=hasher_future, pure=False)
+    write_futures = []
+    for block_number, (block, sketch_future) in enumerate(zip(blocks, sketch_futures)):
+        keep = index.add_sketch(sketch_future.result())
+        sketch_future.release()
+        output_path = os.path.join(output_dir, f"dedup-{block_number:05d}.jsonl")
+        write_futures.append(client.submit(write_deduplicated_block, block, keep, output_path, pure=False))
+    client.gather(write_futures)
+
+    summary = dict(index.counts, threshold=threshold, num_perm=num_perm, bands=bands, shingle_size=shingle_size)
+    with open(os.path.join(output_dir, "dedup-summary.json"), 'w', encoding='utf-8') as summary_file:
+        json.dump(summary, summary_file, indent=2)
+
+    logging.info(f"Deduplication kept {summary['documents_out']} of {summary['documents_in']} documents "
+                 f"({summary['exact_duplicates']} exact and {summary['near_duplicates']} near duplicates removed).")
+    return output_dir, summary
@@ -0,0 +1,164 @@
+# distributed_em.py - Data-Parallel LDA Training for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script trains one LDA model over the whole training split of the Unified Topic Modeling and Analysis
+# (UTMA) with data-parallel variational EM on the existing Dask cluster, instead of one independent model per
+# batch. Every pass, the current model is broadcast to the workers; each worker runs the E-step on its resident
+# training batches and returns the sufficient statistics (the K x V sstats array) together with the document
+# part of the variational bound. The statistics are summed by a tree of reducer tasks, and the driver performs
+# the batch M-step (lambda = eta + sstats), so the model sees every training document in every pass and the
+# E-step scales with the number of workers. All batches must be encoded with the same shared Dictionary.
+#
+# Functions:
+# - distributed_estep: Worker task running the E-step on one training batch.
+# - merge_estep_results: Reducer task summing E-step results.
+# - train_distributed_lda: Runs data-parallel EM for one configuration and returns the full-corpus model.
+#
+# Dependencies:
+# - Python libraries: math, logging, numpy
+# - Dask libraries: distributed
+# - Gensim library for LDA modeling
+#
+# Developed with AI assistance.
+
+import math
+import logging
+
+import numpy as np
+from gensim.models import LdaModel
+
+from .alpha_eta import calculate_numeric_alpha, calculate_numeric_beta
+from .topic_model_trainer import prepare_task_corpus, EARLY_STOPPING_DEFAULTS
+from .doc_topic_inference import INFERENCE_CHUNKSIZE, variational_document_bound
+
+# Number of E-step results summed by one reducer task
+REDUCE_FAN_IN = 8
+
+
+def distributed_estep(ldamodel, train_data, vocabulary=None, prepared_dictionary=None, chunksize=INFERENCE_CHUNKSIZE):
+    """
+    Worker task: runs the E-step of `ldamodel` on one training batch.
+
+    Args:
+        ldamodel (LdaModel): The model broadcast for the current pass.
+        train_data: Training batch, as passed to `train_model_v2`.
+        vocabulary (list of str): Vocabulary of the encoded corpus, for encoded batches.
+        prepared_dictionary (PreparedDictionary): The shared training Dictionary.
+        chunksize (int): Documents per `inference` call.
+
+    Returns:
+        dict: `sstats` (num_topics x num_terms), `num_docs`, `num_words` and `bound`, the document part
+        of the variational bound under `ldamodel`.
+    """
+    corpus = prepare_task_corpus(train_data, "N/A", "train", vocabulary, prepared_dictionary)['corpus']
+    sstats = np.zeros_like(ldamodel.expElogbeta)
+    bound = 0.0
+    for start in range(0, len(corpus), chunksize):
+        chunk = corpus[start:start + chunksize]
+        gamma, chunk_sstats = ldamodel.inference(chunk, collect_sstats=True)
+        sstats += chunk_sstats
+        bound += variational_document_bound(ldamodel, chunk, gamma)
+
+    return {
+        'sstats': sstats,
+        'num_docs': len(corpus),
+        'num_words': sum(count for document in corpus for _, count in document),
+        'bound': bound,
+    }
+
+
+def merge_estep_results(*results):
+    """Reducer task: sums E-step results of several batches."""
+    merged = dict(results[0], sstats=results[0]['sstats'].copy())
+    for result in results[1:]:
+        merged['sstats'] += result['sstats']
+        merged['num_docs'] += result['num_docs']
+        merged['num_words'] += result['num_words']
+        merged['bound'] += result['bound']
+    return merged
+
+
+def train_distributed_lda(client, train_futures, prepared_dictionary, n_topics, alpha_str, beta_str, random_state,
+                          passes, iterations, vocabulary=None, prepared_dictionary_future=None, early_stopping=None,
+                          reduce_fan_in=REDUCE_FAN_IN):
+    """
+    Trains one LDA model over all training batches with data-parallel variational EM.
+
+    The per-word variational bound of the training split under the model of each pass is recorded as
+    the convergence curve. With `early_stopping`, training stops once its relative improvement stays
+    below `tolerance` for `patience` passes (the hold-out setting does not apply, as every document
+    contributes to the statistics).
+
+    Args:
+        client (Client): Dask client.
+        train_futures (list): Scattered training batches, encoded with `prepared_dictionary`.
+        prepared_dictionary (PreparedDictionary): The shared training Dictionary.
+        n_topics (int): Number of topics.
+        alpha_str, beta_str: Alpha and eta as in the grid ('symmetric', 'asymmetric' or a number).
+        random_state (int): Seed of the initial topics.
+        passes (int): Maximum number of EM passes.
+        iterations (int): Maximum E-step iterations per document.
+        vocabulary (list of str): Vocabulary future of the encoded corpus, for encoded batches.
+        prepared_dictionary_future (Future or None): `prepared_dictionary` already scattered to the workers.
+        early_stopping (dict or None): Settings with keys of `EARLY_STOPPING_DEFAULTS`.
+        reduce_fan_in (int): Number of E-step results summed per reducer task.
+
+    Returns:
+        tuple: (model, trace) where trace holds `passes_used` and `convergence_curve`.
+    """
+    if not train_futures:
+        raise ValueError("Data-parallel training requires at least one training batch.")
+    if prepared_dictionary_future is None:
+        prepared_dictionary_future = client.scatter([prepared_dictionary], broadcast=True)[0]
+
+    ldamodel = LdaModel(
+        id2word=prepared_dictionary.dictionary,
+        num_topics=n_topics,
+        alpha=float(calculate_numeric_alpha(alpha_str, n_topics)),
+        eta=float(calculate_numeric_beta(beta_str, n_topics)),
+        random_state=random_state,
+        iterations=iterations,
+        dtype=np.float32,
+    )
+    settings = dict(EARLY_STOPPING_DEFAULTS, **early_stopping) if early_stopping else None
+
+    curve = []
+    stale_passes = 0
+    for _ in range(passes):
+        model_future = client.scatter([ldamodel], broadcast=True, hash=False)[0]
+        results = [
+            client.submit(distributed_estep, model_future, train_future, vocabulary=vocabulary,
+                          prepared_dictionary=prepared_dictionary_future, pure=False)
+            for train_future in train_futures
+        ]
+        while len(results) > 1:
+            results = [
+                client.submit(merge_estep_results, *results[start:start + reduce_fan_in], pure=False)
+                for start in range(0, len(results), reduce_fan_in)
+            ]
+        estep = results[0].result()
+        del model_future
+
+        # Bound of the model that produced the statistics: document parts plus the topic part once
+        with np.errstate(divide='ignore', invalid='ignore'):
+            total_bound = estep['bound'] + ldamodel.bound([])
+        curve.append(float(total_bound / max(1, estep['num_words'])))
+
+        # Batch M-step: the statistics cover the whole training split, so they replace the previous topics
+        ldamodel.state.sstats = estep['sstats'].astype(ldamodel.dtype, copy=False)
+        ldamodel.state.numdocs = estep['num_docs']
+        ldamodel.sync_state()
+        ldamodel.num_updates += estep['num_docs']
+        logging.info(f"Data-parallel EM pass {len(curve)}/{passes} for {n_topics} topics: per-word bound {curve[-1]:.4f} "
+                     f"over {estep['num_docs']} documents.")
+
+        if settings and len(curve) > 1:
+            previous, current = curve[-2], curve[-1]
+            improvement = (current - previous) / abs(previous) if math.isfinite(previous) and previous else 0.0
+            stale_passes = stale_passes + 1 if improvement < settings['tolerance'] else 0
+            if stale_passes >= settings['patience']:
+                break
+
+    return ldamodel, {'passes_used': len(curve), 'convergence_curve': curve}
@@ -0,0 +1,176 @@
+# doc_topic_inference.py - Batched Document-Topic Inference for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script computes document-topic distributions for the Unified Topic Modeling and Analysis (UTMA) in
+# batches. Instead of calling `get_document_topics` once per document, the corpus is passed to
+# `LdaModel.inference` in chunks, which runs the variational E-step over a whole chunk with vectorized numpy
+# operations, and the normalized gamma rows are written into one document-topic matrix. The matrix is shared
+# by the validation/test results, the PCA/PCoA plots and pyLDAvis. Held-out evaluation runs the same E-step once
+# per chunk and derives the variational bound, the per-word perplexity bound and the document-topic matrix from
+# one gamma, instead of one full E-step each for `LdaModel.bound`, `LdaModel.log_perplexity` and the validation
+# results. Evaluation is single-threaded: gensim's E-step loops over documents in Python and holds the GIL, so
+# threads within a task gave no speedup. Parallelism comes from Dask running many evaluation tasks at once.
+# The bound's (document, word) x topics temporaries are computed in blocks of bounded size.
+#
+# Functions:
+# - infer_document_topics: Dense or sparse (num_documents x num_topics) matrix of topic probabilities.
+# - document_topic_lists: Converts the matrix into JSON-ready [topic, probability] lists per document.
+# - variational_document_bound: Vectorized document part of the variational bound for a chunk and its gamma.
+# - evaluate_corpus: Bound, per-word bound and document-topic matrix of a corpus from one inference pass.
+#
+# Dependencies:
+# - Python libraries: numpy, scipy
+# - Gensim library for the Dirichlet expectation
+#
+# Developed with AI assistance.
+
+import numpy as np
+from scipy import sparse
+from scipy.special import gammaln, logsumexp
+from gensim.matutils import dirichlet_expectation
+
+# Documents passed to `LdaModel.inference` at once
+INFERENCE_CHUNKSIZE = 2000
+
+# Elements of the (document, word) x topics temporaries of `variational_document_bound` computed at once (16 MB of float64)
+BOUND_BLOCK_ELEMENTS = 2 ** 21
+
+
+def infer_document_topics(ldamodel, corpus, chunksize=INFERENCE_CHUNKSIZE, minimum_probability=0.0,
+                          return_sparse=False):
+    """
+    Infers the topic distribution of every document with batched `LdaModel.inference` calls.
+
+    Rows are the normalized variational gamma, as returned by `get_document_topics`; probabilities
+    below `minimum_probability` are set to zero (rows are not renormalized).
+
+    Args:
+        ldamodel (LdaModel): Trained model.
+        corpus (list): BoW corpus.
+        chunksize (int): Documents per inference call.
+        minimum_probability (float): Probabilities below this value are dropped.
+        return_sparse (bool): Return a CSR matrix, built chunk by chunk, instead of a dense array.
+
+    Returns:
+        numpy.ndarray or scipy.sparse.csr_matrix: (num_documents, num_topics) matrix in the model's dtype.
+    """
+    corpus = corpus if isinstance(corpus, (list, tuple)) else list(corpus)
+    num_topics = ldamodel.num_topics
+    dtype = getattr(ldamodel, 'dtype', np.float32)
+
+    dense_matrix = None if return_sparse else np.zeros((len(corpus), num_topics), dtype=dtype)
+    sparse_chunks = []
+    for start in range(0, len(corpus), chunksize):
+        chunk = corpus[start:start + chunksize]
+        gamma, _ = ldamodel.inference(chunk)
+        distributions = (gamma / gamma.sum(axis=1, keepdims=True)).astype(dtype, copy=False)
+        if minimum_probability > 0:
+            distributions[distributions < minimum_probability] = 0
+        if return_sparse:
+            sparse_chunks.append(sparse.csr_matrix(distributions))
+        else:
+            dense_matrix[start:start + len(chunk)] = distributions
+
+    if not return_sparse:
+        return dense_matrix
+    if not sparse_chunks:
+        return sparse.csr_matrix((0, num_topics), dtype=dtype)
+    return sparse.vstack(sparse_chunks, format='csr')
+
+
+def document_topic_lists(doc_topic_matrix):
+    """
+    Converts a document-topic matrix into [[topic_id, probability], ...] per document, keeping nonzero
+    entries only; values are Python floats, so the result is JSON-serializable.
+    """
+    doc_topic_matrix = sparse.csr_matrix(doc_topic_matrix)
+    return [
+        [[int(topic_id), float(probability)]
+         for topic_id, probability in zip(doc_topic_matrix.indices[start:end], doc_topic_matrix.data[start:end])]
+        for start, end in zip(doc_topic_matrix.indptr[:-1], doc_topic_matrix.indptr[1:])
+    ]
+
+
+def variational_document_bound(ldamodel, chunk, gamma):
+    """
+    Computes the document part of the variational bound of `LdaModel.bound` for one chunk.
+
+    Uses the gamma already produced by `inference` and evaluates the (document, word) pairs of the
+    chunk in vectorized blocks of at most `BOUND_BLOCK_ELEMENTS` pair-topic values instead of one
+    `logsumexp` per word, so memory stays bounded for long documents and many topics. The topic-word part of the bound, which does
+    not depend on the documents, is left out so chunk and batch bounds can simply be summed; add it
+    once with `ldamodel.bound([])`.
+
+    Args:
+        ldamodel (LdaModel): Model whose state produced `gamma`.
+        chunk (list): BoW documents.
+        gamma (numpy.ndarray): (len(chunk), num_topics) variational parameters of the chunk.
+
+    Returns:
+        float: E[log p(docs | theta, beta)] + E[log p(theta | alpha) - log q(theta | gamma)].
+    """
+    if not len(chunk):
+        return 0.0
+    Elogtheta = dirichlet_expectation(gamma)
+    Elogbeta = ldamodel.state.get_Elogbeta()
+
+    doc_ids = np.repeat(np.arange(len(chunk)), [len(doc) for doc in chunk])
+    pairs = np.array([pair for doc in chunk for pair in doc], dtype=np.int64).reshape(-1, 2)
+    score = 0.0
+    block_pairs = max(1, BOUND_BLOCK_ELEMENTS // max(1, gamma.shape[1]))
+    for start in range(0, len(pairs), block_pairs):
+        block, block_doc_ids = pairs[start:start + block_pairs], doc_ids[start:start + block_pairs]
+        word_terms = logsumexp(Elogtheta[block_doc_ids] + Elogbeta[:, block[:, 0]].T, axis=1)
+        score += float(np.dot(block[:, 1], word_terms))
+
+    alpha = ldamodel.alpha
+    score += float(np.sum((alpha - gamma) * Elogtheta))
+    score += float(np.sum(gammaln(gamma) - gammaln(alpha)))
+    score += float(np.sum(gammaln(np.sum(alpha)) - gammaln(gamma.sum(axis=1))))
+    return score
+
+
+def _evaluate_chunk(ldamodel, chunk, minimum_probability):
+    """Run inference on one chunk; return its document bound, word count and topic distributions."""
+    gamma, _ = ldamodel.inference(chunk)
+    distributions = (gamma / gamma.sum(axis=1, keepdims=True)).astype(getattr(ldamodel, 'dtype', np.float32), copy=False)
+    if minimum_probability > 0:
+        distributions[distributions < minimum_probability] = 0
+    words = sum(count for doc in chunk for _, count in doc)
+    return variational_document_bound(ldamodel, chunk, gamma), words, sparse.csr_matrix(distributions)
+
+
+def evaluate_corpus(ldamodel, corpus, chunksize=INFERENCE_CHUNKSIZE, minimum_probability=0.0):
+    """
+    Computes the variational bound, the per-word bound and the document-topic matrix of a corpus with one
+    `LdaModel.inference` call per chunk.
+
+    The bound equals `ldamodel.bound(corpus)` and the per-word bound `ldamodel.log_perplexity(corpus)`,
+    up to the random initialization of gamma, but both come from the same gamma as the document-topic
+    matrix. Chunks are evaluated one after another in the calling thread.
+
+    Args:
+        ldamodel (LdaModel): Trained model.
+        corpus (list): BoW corpus.
+        chunksize (int): Documents per inference call.
+        minimum_probability (float): Probabilities below this value are dropped from the matrix.
+
+    Returns:
+        tuple: (bound, per-word bound, CSR (num_documents, num_topics) document-topic matrix).
+    """
+    corpus = corpus if isinstance(corpus, (list, tuple)) else list(corpus)
+    results = [_evaluate_chunk(ldamodel, corpus[start:start + chunksize], minimum_probability)
+               for start in range(0, len(corpus), chunksize)]
+
+    # The topic-word part of the bound is added once for the whole corpus
+    bound = float(ldamodel.bound([])) + sum(doc_bound for doc_bound, _, _ in results)
+    num_words = sum(words for _, words, _ in results)
+    per_word_bound = bound / num_words if num_words else float('-inf')
+
+    if results:
+        doc_topic_matrix = sparse.vstack([matrix for _, _, matrix in results], format='csr')
+    else:
+        doc_topic_matrix = sparse.csr_matrix((0, ldamodel.num_topics), dtype=getattr(ldamodel, 'dtype', np.float32))
+    return bound, per_word_bound, doc_topic_matrix
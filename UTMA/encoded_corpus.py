@@ -0,0 +1,313 @@
+# encoded_corpus.py - Array-Backed Integer-Encoded Corpus for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script provides a compact, integer-encoded corpus format for the Unified Topic Modeling and Analysis (UTMA).
+# A corpus is stored as a vocabulary file plus a flat uint32 token-id array and an int64 offsets array, saved as
+# `.npy` files so they can be memory-mapped. Batches cut from the corpus are plain numpy arrays, which are far
+# cheaper to scatter, pickle and hold on Dask workers than lists of Python strings. Bag-of-words corpora are
+# built straight from the token ids (`encoded_doc2bow`); tasks decode batches to strings only where the text
+# itself is needed, such as coherence scoring and the stored batch text.
+#
+# The source fingerprint is stored next to the arrays, and a corpus whose fingerprint no longer matches its data
+# source is re-encoded. The files are written to a temporary directory that replaces the output directory only
+# once complete, so an interrupted run never leaves a partial corpus behind.
+#
+# Functions:
+# - EncodedBatch: A batch of documents as token-id and offset arrays.
+# - EncodedCorpus: The full encoded corpus with its vocabulary.
+# - write_encoded_corpus / load_encoded_corpus: Build the on-disk format once and memory-map it afterwards.
+# - encoded_corpus_exists: Checks for a complete encoded corpus of the current data source.
+# - encoded_batch: Joins encoded batch data into one EncodedBatch.
+# - encoded_doc2bow: BoW corpus of an EncodedBatch, without decoding its tokens.
+# - materialize_documents: Resolves scattered batch data into tokenized documents inside a task.
+#
+# Dependencies:
+# - Python libraries: os, json, array, shutil, hashlib, tempfile, numpy
+# - Dask libraries: dask
+#
+# Developed with AI assistance.
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+from array import array
+
+import numpy as np
+import dask
+
+VOCABULARY_FILE = "vocabulary.json"
+TOKEN_IDS_FILE = "token_ids.npy"
+OFFSETS_FILE = "offsets.npy"
+SOURCE_FILE = "source.json"
+
+
+class EncodedBatch:
+    """
+    A batch of documents stored as a flat uint32 token-id array and an int64 offsets array.
+
+    Document `i` consists of `token_ids[offsets[i]:offsets[i + 1]]`. Token ids refer to the
+    vocabulary of the `EncodedCorpus` the batch was cut from; the vocabulary is shared with the
+    workers once rather than shipped with every batch.
+    """
+
+    def __init__(self, token_ids, offsets):
+        self.token_ids = np.asarray(token_ids, dtype=np.uint32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.token_ids.nbytes + self.offsets.nbytes
+
+    def document_ids(self, index):
+        """Return the token ids of the document at `index`."""
+        return self.token_ids[self.offsets[index]:self.offsets[index + 1]]
+
+    def iter_document_ids(self):
+        for index in range(len(self)):
+            yield self.document_ids(index)
+
+    def content_hash(self):
+        """Return a hex MD5 digest of the token ids and document boundaries."""
+        content_hash = hashlib.md5(np.ascontiguousarray(self.offsets).tobytes())
+        content_hash.update(np.ascontiguousarray(self.token_ids).tobytes())
+        return content_hash.hexdigest()
+
+    def decode(self, vocabulary):
+        """Convert the batch back into a list of token lists using `vocabulary`."""
+        return [[vocabulary[token_id] for token_id in doc_ids.tolist()] for doc_ids in self.iter_document_ids()]
+
+
+class EncodedCorpus:
+    """
+    An integer-encoded corpus: a vocabulary plus flat token-id and offsets arrays.
+
+    The arrays may be memory-mapped (see `load_encoded_corpus`), in which case only the
+    documents selected with `take` are read into memory.
+    """
+
+    def __init__(self, vocabulary, token_ids, offsets):
+        self.vocabulary = vocabulary
+        self.token_ids = token_ids
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def take(self, doc_indices):
+        """
+        Gather the documents at `doc_indices` into a contiguous `EncodedBatch`.
+
+        Args:
+            doc_indices (list of int): Positions of the documents in the corpus.
+
+        Returns:
+            EncodedBatch: The selected documents, copied out of the (possibly memory-mapped) arrays.
+        """
+        doc_indices = np.asarray(doc_indices, dtype=np.int64)
+        starts = self.offsets[doc_indices]
+        lengths = self.offsets[doc_indices + 1] - starts
+
+        batch_offsets = np.zeros(len(doc_indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=batch_offsets[1:])
+
+        if batch_offsets[-1] == 0:
+            return EncodedBatch(np.zeros(0, dtype=np.uint32), batch_offsets)
+
+        # Positions of every selected token in the flat array, built without a Python loop over tokens
+        token_positions = np.repeat(starts - batch_offsets[:-1], lengths) + np.arange(batch_offsets[-1])
+        return EncodedBatch(self.token_ids[token_positions], batch_offsets)
+
+
+def encoded_corpus_exists(output_dir, fingerprint=None):
+    """
+    Return True if `output_dir` already holds a complete encoded corpus.
+
+    With `fingerprint`, the corpus must also have been written from a data source with that fingerprint.
+    """
+    if not all(os.path.exists(os.path.join(output_dir, name)) for name in (VOCABULARY_FILE, TOKEN_IDS_FILE, OFFSETS_FILE)):
+        return False
+    if fingerprint is None:
+        return True
+    try:
+        with open(os.path.join(output_dir, SOURCE_FILE), 'r', encoding='utf-8') as sourcefile:
+            stored = json.load(sourcefile).get('fingerprint')
+    except (OSError, ValueError):
+        stored = None
+    if stored != fingerprint:
+        logging.info(f"Encoded corpus at {output_dir} was written from another version of the data source; it will be rewritten.")
+        return False
+    return True
+
+
+def write_encoded_corpus(documents, output_dir, fingerprint=None):
+    """
+    Encodes an iterable of tokenized documents and writes the compact corpus format to disk.
+
+    The documents are consumed in a single streaming pass; only the growing vocabulary and the
+    4-byte token ids are kept in memory. The files are written to a temporary directory next to
+    `output_dir`, which then replaces `output_dir`.
+
+    Args:
+        documents (iterable of list of str): Tokenized documents, e.g. from `iter_documents`.
+        output_dir (str): Directory that receives vocabulary.json, token_ids.npy, offsets.npy and source.json.
+        fingerprint (str or None): Fingerprint of the data source, checked by `encoded_corpus_exists`.
+
+    Returns:
+        EncodedCorpus: The encoded corpus (in memory).
+    """
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+
+    token2id = {}
+    vocabulary = []
+    token_ids = array('I')
+    offsets = array('q', [0])
+
+    for document in documents:
+        for token in document:
+            token_id = token2id.get(token)
+            if token_id is None:
+                token_id = len(vocabulary)
+                token2id[token] = token_id
+                vocabulary.append(token)
+            token_ids.append(token_id)
+        offsets.append(len(token_ids))
+
+    token_ids = np.frombuffer(token_ids, dtype=np.uint32) if len(token_ids) else np.zeros(0, dtype=np.uint32)
+    offsets = np.frombuffer(offsets, dtype=np.int64)
+
+    staging_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(output_dir)}-", dir=os.path.dirname(output_dir))
+    try:
+        with open(os.path.join(staging_dir, VOCABULARY_FILE), 'w', encoding='utf-8') as vocabfile:
+            json.dump(vocabulary, vocabfile, ensure_ascii=False)
+        np.save(os.path.join(staging_dir, TOKEN_IDS_FILE), token_ids)
+        np.save(os.path.join(staging_dir, OFFSETS_FILE), offsets)
+        with open(os.path.join(staging_dir, SOURCE_FILE), 'w', encoding='utf-8') as sourcefile:
+            json.dump({'fingerprint': fingerprint}, sourcefile)
+
+        # A directory cannot replace a non-empty one, so an existing corpus is moved aside first
+        if os.path.exists(output_dir):
+            retired_dir = staging_dir + ".old"
+            os.replace(output_dir, retired_dir)
+            os.replace(staging_dir, output_dir)
+            shutil.rmtree(retired_dir, ignore_errors=True)
+        else:
+            os.replace(staging_dir, output_dir)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    logging.info(f"Encoded corpus written to {output_dir}: {len(offsets) - 1} documents, "
+                 f"{len(token_ids)} tokens, {len(vocabulary)} vocabulary entries.")
+    return EncodedCorpus(vocabulary, token_ids, offsets)
+
+
+def load_encoded_corpus(output_dir, mmap_mode='r'):
+    """
+    Loads an encoded corpus written by `write_encoded_corpus`.
+
+    Args:
+        output_dir (str): Directory holding the encoded corpus files.
+        mmap_mode (str or None): Passed to `numpy.load`; 'r' memory-maps the arrays read-only.
+
+    Returns:
+        EncodedCorpus: The loaded corpus.
+    """
+    with open(os.path.join(output_dir, VOCABULARY_FILE), 'r', encoding='utf-8') as vocabfile:
+        vocabulary = json.load(vocabfile)
+    token_ids = np.load(os.path.join(output_dir, TOKEN_IDS_FILE), mmap_mode=mmap_mode)
+    offsets = np.load(os.path.join(output_dir, OFFSETS_FILE), mmap_mode=mmap_mode)
+    return EncodedCorpus(vocabulary, token_ids, offsets)
+
+
+def encoded_batch(data):
+    """
+    Returns batch data as passed to a task as one `EncodedBatch`.
+
+    Args:
+        data: An `EncodedBatch` or a list of them; anything else is not encoded.
+
+    Returns:
+        EncodedBatch or None: The batch, with list items joined in order, or None for batch data
+        that is not (entirely) integer-encoded.
+    """
+    if isinstance(data, EncodedBatch):
+        return data
+    if not isinstance(data, (list, tuple)) or not data or not all(isinstance(item, EncodedBatch) for item in data):
+        return None
+    if len(data) == 1:
+        return data[0]
+    offsets = [np.zeros(1, dtype=np.int64)]
+    for item, start in zip(data, np.cumsum([0] + [len(item.token_ids) for item in data[:-1]])):
+        offsets.append(item.offsets[1:] + start)
+    return EncodedBatch(np.concatenate([item.token_ids for item in data]), np.concatenate(offsets))
+
+
+def encoded_doc2bow(batch, vocabulary, dictionary):
+    """
+    Converts an `EncodedBatch` to bag-of-words with a Dictionary, without decoding its tokens.
+
+    Only the distinct tokens of the batch are looked up in the Dictionary; the token ids are then
+    mapped to Dictionary ids and counted per document in one vectorized pass. The result equals
+    `[dictionary.doc2bow(document) for document in batch.decode(vocabulary)]`.
+
+    Args:
+        batch (EncodedBatch): The documents to convert.
+        vocabulary (list of str): Vocabulary of the encoded corpus.
+        dictionary (Dictionary): The Dictionary used for the conversion.
+
+    Returns:
+        list: The BoW corpus, one list of (token_id, count) tuples per document, sorted by token id.
+    """
+    num_documents = len(batch)
+    unique_ids, inverse = np.unique(batch.token_ids, return_inverse=True)
+    token2id = dictionary.token2id
+    id_map = np.fromiter((token2id.get(vocabulary[token_id], -1) for token_id in unique_ids.tolist()),
+                         dtype=np.int64, count=len(unique_ids))
+    dictionary_ids = id_map[inverse.reshape(-1)]
+
+    # One key per (document, Dictionary id); tokens missing from the Dictionary are dropped
+    document_index = np.repeat(np.arange(num_documents, dtype=np.int64), np.diff(batch.offsets))
+    known = dictionary_ids >= 0
+    stride = int(id_map.max()) + 1 if len(id_map) and id_map.max() >= 0 else 1
+    keys, counts = np.unique(document_index[known] * stride + dictionary_ids[known], return_counts=True)
+
+    bounds = np.searchsorted(keys, np.arange(num_documents + 1, dtype=np.int64) * stride)
+    term_ids = (keys % stride).tolist()
+    counts = counts.tolist()
+    return [list(zip(term_ids[start:end], counts[start:end])) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def materialize_documents(data, vocabulary=None):
+    """
+    Resolves the batch data received by a task into a tuple of tokenized documents.
+
+    Accepts either an `EncodedBatch`, a list of `EncodedBatch` objects, or the legacy list of
+    scattered token lists (resolved with `dask.compute`).
+
+    Args:
+        data: Batch data as passed to `train_model_v2`.
+        vocabulary (list of str): Vocabulary of the encoded corpus; required for encoded batches.
+
+    Returns:
+        tuple: The tokenized documents.
+    """
+    if isinstance(data, EncodedBatch):
+        return tuple(data.decode(vocabulary))
+    if isinstance(data, (list, tuple)) and any(isinstance(item, EncodedBatch) for item in data):
+        documents = []
+        for item in data:
+            if isinstance(item, EncodedBatch):
+                documents.extend(item.decode(vocabulary))
+            else:
+                documents.extend(dask.compute(*item))
+        return tuple(documents)
+    return dask.compute(*data)
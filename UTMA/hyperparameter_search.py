@@ -0,0 +1,418 @@
+# hyperparameter_search.py - Successive-Halving Hyperparameter Search for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script narrows the (topics, alpha, beta) grid of the Unified Topic Modeling and Analysis (UTMA) before
+# full training. Every configuration is first trained for a few passes on a subsample of the training batches
+# and scored by c_v coherence or held-out log perplexity; only the best 1/eta continue to the next rung, which
+# trains them with eta times the passes on eta times the data. The survivors of the last rung are handed to the
+# regular train/validation/test loop, which is the final, full-budget rung.
+#
+# Alternatively, a Bayesian optimizer fits a Gaussian-process surrogate to the completed scores and proposes the
+# next (topics, alpha, eta) point by expected improvement, treating alpha and eta as continuous (log-scaled)
+# dimensions instead of a fixed grid. Several proposals are kept in flight on the cluster; each finished trial
+# immediately refits the surrogate and submits the next proposal.
+#
+# Functions:
+# - halving_schedule: Number of configurations, passes and batches of every reduced rung.
+# - search_batch_order: Seeded random order in which the search draws training batches.
+# - score_search_configs: Worker task that trains configurations on one batch and scores them.
+# - rank_configs: Aggregates scores over batches and keeps the best configurations.
+# - successive_halving: Runs all reduced rungs on the cluster and returns the surviving configurations.
+# - BayesianOptimizer: Gaussian-process surrogate with ask/tell proposals over topics, alpha and eta.
+# - bayesian_search: Runs the optimizer asynchronously with a fixed number of trials in flight.
+#
+# Dependencies:
+# - Python libraries: math, logging, numpy, scipy, scikit-learn
+# - Dask libraries: distributed
+# - Gensim library for LDA modeling
+#
+# Developed with AI assistance.
+
+import math
+import logging
+
+import numpy as np
+from scipy.stats import norm
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import ConstantKernel, Matern, WhiteKernel
+from dask.distributed import wait, as_completed
+
+from .topic_model_trainer import prepare_task_corpus, fit_lda_model
+from .coherence_engine import COHERENCE_TOPN, top_topic_ids, cached_coherence_engine
+
+# Search modes of utma.py: the random grid sample, successive halving over the full grid, or Bayesian optimization
+SEARCH_MODES = ('grid', 'successive_halving', 'bayesian')
+
+# Metrics a rung can rank by; both are "higher is better" as returned by Gensim
+SEARCH_METRICS = ('coherence', 'perplexity')
+
+# Continuous ranges of alpha and eta explored by the Bayesian optimizer (log-uniform)
+ALPHA_BOUNDS = (0.001, 1.0)
+ETA_BOUNDS = (0.001, 1.0)
+
+
+def halving_schedule(num_configs, max_passes, num_batches, eta=3, min_passes=1):
+    """
+    Plans the reduced rungs of successive halving.
+
+    With s = floor(log_eta(num_configs)) reduced rungs, rung r trains ceil(num_configs / eta^r)
+    configurations for max_passes * eta^(r - s) passes on the same fraction of the training batches.
+    Both budgets shrink, so rung r costs about num_configs * eta^(r - 2s) full trainings: each rung
+    costs eta times the one before it, and the first rungs are far cheaper than the final one
+    (until `min_passes` and the one-batch minimum take over).
+
+    Args:
+        num_configs (int): Number of configurations in the grid.
+        max_passes (int): Passes of the final, full-budget rung (`--passes`).
+        num_batches (int): Number of training batches.
+        eta (int): Reduction factor between rungs.
+        min_passes (int): Lower bound on the passes of any rung.
+
+    Returns:
+        list of dict: One dict per reduced rung with `rung`, `num_configs`, `keep`, `passes` and
+        `num_batches`. Empty if the grid is too small to reduce.
+    """
+    if eta < 2:
+        raise ValueError(f"eta must be at least 2, got {eta}.")
+    rungs = int(math.floor(math.log(num_configs, eta) + 1e-9)) if num_configs > 1 else 0
+
+    schedule = []
+    for rung in range(rungs):
+        budget = float(eta) ** (rung - rungs)
+        schedule.append({
+            'rung': rung,
+            'num_configs': math.ceil(num_configs / eta ** rung),
+            'keep': math.ceil(num_configs / eta ** (rung + 1)),
+            'passes': max(min_passes, int(round(max_passes * budget))),
+            'num_batches': max(1, int(round(num_batches * budget))),
+        })
+    return schedule
+
+
+def search_batch_order(num_batches, random_state=None):
+    """
+    Returns the positions of the training batches in a random order seeded by `random_state`.
+
+    Streaming, split-shard and encoded ingestion fill batches in file order, so the first batches are
+    a contiguous slice of the corpus rather than a random sample. Searches take a prefix of this order
+    instead, so every prefix is a random sample and longer prefixes contain the shorter ones.
+
+    Returns:
+        list of int: A permutation of range(num_batches).
+    """
+    return np.random.RandomState(random_state).permutation(num_batches).tolist()
+
+
+def score_search_configs(configs, train_data, validation_data, metric, random_state, passes, iterations,
+                         update_every, eval_every, cores, vocabulary=None, prepared_dictionary=None,
+                         backend='single', lda_workers=None):
+    """
+    Worker task: trains every configuration on one training batch and scores it.
+
+    The batch is prepared once for all configurations. Coherence is c_v over the training texts,
+    computed from the batch's cached coherence engine; perplexity is the per-word log perplexity bound of the
+    validation batch.
+
+    Args:
+        configs (list of tuple): (n_topics, alpha_str, beta_str) per configuration.
+        train_data: Training batch, as passed to `train_model_v2`.
+        validation_data: Validation batch, used when `metric` is 'perplexity'.
+        metric (str): One of `SEARCH_METRICS`.
+        random_state, passes, iterations, update_every, eval_every, cores, vocabulary,
+        prepared_dictionary, backend, lda_workers: As for `train_model_v2`.
+
+    Returns:
+        list of dict: `config` and `score` per configuration; failed scores are -inf.
+    """
+    prepared_corpus = prepare_task_corpus(train_data, "N/A", "train", vocabulary, prepared_dictionary)
+    ldamodels = [
+        fit_lda_model(prepared_corpus, n_topics, alpha_str, beta_str, random_state, passes, iterations,
+                      update_every, eval_every, backend, lda_workers)
+        for n_topics, alpha_str, beta_str in configs
+    ]
+
+    scores = []
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metric == 'perplexity':
+            validation_corpus = prepare_task_corpus(train_data, validation_data, "validation", vocabulary,
+                                                    prepared_dictionary)['corpus']
+            for ldamodel in ldamodels:
+                try:
+                    scores.append(ldamodel.log_perplexity(validation_corpus))
+                except Exception as e:
+                    logging.error(f"Issue calculating held-out perplexity during search: {e}")
+                    scores.append(float('-inf'))
+        else:
+            coherence_engine = cached_coherence_engine(prepared_corpus['train_documents'], prepared_corpus['dictionary'],
+                                                       prepared_corpus['dictionary_key'], prepared_corpus['content_hash'])
+            model_topics = [top_topic_ids(ldamodel, COHERENCE_TOPN) for ldamodel in ldamodels]
+            coherence_engine.precompute(model_topics, ('c_v',))
+            for topics in model_topics:
+                try:
+                    scores.append(coherence_engine.coherence(topics, 'c_v'))
+                except Exception as e:
+                    logging.error(f"Issue calculating coherence during search: {e}")
+                    scores.append(float('-inf'))
+
+    return [{'config': tuple(config), 'score': float(score)} for config, score in zip(configs, scores)]
+
+
+def rank_configs(results, keep):
+    """
+    Ranks configurations by their mean score over batches and keeps the best.
+
+    Non-finite batch scores count as -inf, so a configuration that fails on any batch ranks last.
+    Ties keep the order in which configurations were first seen.
+
+    Args:
+        results (list of dict): `score_search_configs` results of all batches of a rung.
+        keep (int): Number of configurations to keep.
+
+    Returns:
+        tuple: (kept configurations, list of (config, mean score) for every configuration, best first).
+    """
+    scores = {}
+    for result in results:
+        score = result['score']
+        scores.setdefault(result['config'], []).append(score if math.isfinite(score) else float('-inf'))
+
+    ranking = sorted(
+        ((config, float(np.mean(values))) for config, values in scores.items()),
+        key=lambda item: item[1], reverse=True
+    )
+    return [config for config, _ in ranking[:keep]], ranking
+
+
+def successive_halving(client, configs, train_futures, validation_futures, max_passes, metric='coherence', eta=3,
+                       min_passes=1, fuse_width=1, random_state=None, iterations=50, update_every=1, eval_every=5,
+                       cores=1, vocabulary=None, prepared_dictionary=None, backend='single', lda_workers=None):
+    """
+    Runs the reduced rungs of successive halving over the scattered batches.
+
+    Rung r trains its configurations on the first `num_batches` training batches of a permutation
+    seeded by `random_state` (see `search_batch_order`), in tasks of up to `fuse_width` configurations
+    per batch. Each rung's batches include those of the rungs before it.
+
+    Args:
+        client (Client): Dask client.
+        configs (list of tuple): (n_topics, alpha_str, beta_str) per configuration.
+        train_futures (list): Scattered training batches.
+        validation_futures (list): Scattered validation batches; batch i is scored on validation batch
+            i modulo their number.
+        max_passes (int): Passes of the final rung.
+        metric (str): One of `SEARCH_METRICS`; 'perplexity' falls back to 'coherence' without validation data.
+        eta (int): Reduction factor between rungs.
+        min_passes (int): Lower bound on the passes of any rung.
+        fuse_width (int): Configurations trained together per task.
+        Remaining arguments: As for `train_model_v2`.
+
+    Returns:
+        tuple: (surviving configurations, list of per-rung summaries for the run metadata).
+    """
+    if metric == 'perplexity' and not validation_futures:
+        logging.warning("No validation batches to compute held-out perplexity; ranking by coherence instead.")
+        metric = 'coherence'
+
+    survivors = list(configs)
+    history = []
+    batch_order = search_batch_order(len(train_futures), random_state)
+    for rung in halving_schedule(len(survivors), max_passes, len(train_futures), eta, min_passes):
+        futures = []
+        batch_ids = batch_order[:rung['num_batches']]
+        for batch_index in batch_ids:
+            train_future = train_futures[batch_index]
+            validation_future = validation_futures[batch_index % len(validation_futures)] if validation_futures else None
+            for start in range(0, len(survivors), max(1, fuse_width)):
+                futures.append(client.submit(
+                    score_search_configs, survivors[start:start + max(1, fuse_width)], train_future,
+                    validation_future, metric, random_state, rung['passes'], iterations, update_every, eval_every,
+                    cores, vocabulary=vocabulary, prepared_dictionary=prepared_dictionary, backend=backend,
+                    lda_workers=lda_workers, pure=False
+                ))
+        wait(futures)
+        results = []
+        for future in futures:
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                logging.error(f"A successive-halving task failed: {e}")
+
+        survivors, ranking = rank_configs(results, rung['keep'])
+        history.append({
+            **rung,
+            'batch_ids': batch_ids,
+            'metric': metric,
+            'ranking': [{'config': list(config), 'score': score} for config, score in ranking],
+        })
+        logging.info(f"Successive halving rung {rung['rung']}: {rung['num_configs']} configurations, "
+                     f"{rung['passes']} passes on {rung['num_batches']} batches; kept {len(survivors)}. "
+                     f"Best: {ranking[0] if ranking else None}")
+
+    return survivors, history
+
+
+class BayesianOptimizer:
+    """
+    Proposes (n_topics, alpha, eta) configurations from a Gaussian-process surrogate of the scores.
+
+    Configurations are encoded on the unit cube: the topic count linearly over `topic_values`, alpha and
+    eta on a log scale within their bounds. The first `n_initial` proposals are random; after that each
+    proposal maximizes expected improvement over `n_candidates` random points. Proposals still in flight
+    are added to the surrogate with the worst observed score (a pessimistic "constant liar"), so
+    concurrent proposals spread out instead of piling onto the same optimum.
+
+    Attributes:
+        observations (list): (config, score) of every completed trial, in completion order.
+        pending (list): Configurations proposed but not yet scored.
+    """
+
+    def __init__(self, topic_values, alpha_bounds=ALPHA_BOUNDS, eta_bounds=ETA_BOUNDS, n_initial=8,
+                 n_candidates=2000, xi=0.01, seed=None):
+        self.topic_values = np.array(sorted(set(topic_values)))
+        self.log_alpha = np.log10(alpha_bounds)
+        self.log_eta = np.log10(eta_bounds)
+        self.n_initial = n_initial
+        self.n_candidates = n_candidates
+        self.xi = xi
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.observations = []
+        self.pending = []
+
+    def _encode(self, configs):
+        """Map configurations to points on the unit cube."""
+        configs = np.array([[n_topics, alpha, eta] for n_topics, alpha, eta in configs], dtype=float)
+        topic_span = max(1, self.topic_values[-1] - self.topic_values[0])
+        return np.column_stack([
+            (configs[:, 0] - self.topic_values[0]) / topic_span,
+            (np.log10(configs[:, 1]) - self.log_alpha[0]) / (self.log_alpha[1] - self.log_alpha[0]),
+            (np.log10(configs[:, 2]) - self.log_eta[0]) / (self.log_eta[1] - self.log_eta[0]),
+        ])
+
+    def _random_configs(self, count):
+        """Draw configurations uniformly over topic values and log-uniformly over alpha and eta."""
+        topics = self.rng.choice(self.topic_values, count)
+        alphas = 10 ** self.rng.uniform(*self.log_alpha, count)
+        etas = 10 ** self.rng.uniform(*self.log_eta, count)
+        # Four significant digits keep the stored alpha/eta strings readable and the model keys stable
+        return [(int(k), float(f"{a:.4g}"), float(f"{e:.4g}")) for k, a, e in zip(topics, alphas, etas)]
+
+    def ask(self):
+        """Return the next configuration to evaluate and mark it as pending."""
+        scores = [score for _, score in self.observations if math.isfinite(score)]
+        if len(scores) < self.n_initial:
+            config = self._random_configs(1)[0]
+        else:
+            worst = min(scores)
+            configs = [config for config, _ in self.observations] + self.pending
+            targets = [score if math.isfinite(score) else worst for _, score in self.observations]
+            targets += [worst] * len(self.pending)
+
+            kernel = ConstantKernel(1.0) * Matern(length_scale=[0.3, 0.3, 0.3], nu=2.5) + WhiteKernel(1e-3)
+            surrogate = GaussianProcessRegressor(kernel=kernel, normalize_y=True, n_restarts_optimizer=2,
+                                                 random_state=self.seed)
+            surrogate.fit(self._encode(configs), np.asarray(targets))
+
+            candidates = self._random_configs(self.n_candidates)
+            mean, std = surrogate.predict(self._encode(candidates), return_std=True)
+            improvement = mean - max(scores) - self.xi
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z = np.where(std > 0, improvement / std, 0.0)
+                expected_improvement = np.where(std > 0, improvement * norm.cdf(z) + std * norm.pdf(z), 0.0)
+            config = candidates[int(np.argmax(expected_improvement))]
+
+        self.pending.append(config)
+        return config
+
+    def tell(self, config, score):
+        """Record the score of a pending configuration."""
+        if config in self.pending:
+            self.pending.remove(config)
+        self.observations.append((config, float(score)))
+
+    def best(self, count=1):
+        """Return the `count` best scored configurations, best first."""
+        ranked = sorted(
+            (observation for observation in self.observations if math.isfinite(observation[1])),
+            key=lambda observation: observation[1], reverse=True
+        )
+        return [config for config, _ in ranked[:count]]
+
+
+def bayesian_search(client, optimizer, n_trials, in_flight, train_futures, validation_futures, passes,
+                    metric='coherence', num_batches=1, random_state=None, iterations=50, update_every=1,
+                    eval_every=5, cores=1, vocabulary=None, prepared_dictionary=None, backend='single',
+                    lda_workers=None):
+    """
+    Runs Bayesian optimization with up to `in_flight` trials on the cluster at any time.
+
+    A trial trains one proposed configuration on `num_batches` training batches drawn with
+    `search_batch_order` (seeded by `random_state`, the same for every trial) and scores it with
+    `score_search_configs`; its score is the mean over those batches. As soon as a trial completes,
+    its score is told to the optimizer and the next proposal is submitted.
+
+    Args:
+        client (Client): Dask client.
+        optimizer (BayesianOptimizer): The optimizer; its observations hold the results afterwards.
+        n_trials (int): Total number of configurations to evaluate.
+        in_flight (int): Number of trials evaluated concurrently.
+        train_futures (list): Scattered training batches.
+        validation_futures (list): Scattered validation batches, for 'perplexity'.
+        passes (int): Training passes per trial.
+        metric (str): One of `SEARCH_METRICS`; 'perplexity' falls back to 'coherence' without validation data.
+        num_batches (int): Training batches per trial.
+        Remaining arguments: As for `train_model_v2`.
+
+    Returns:
+        list of dict: `config`, `score` and `trial` of every completed trial, in completion order.
+    """
+    if metric == 'perplexity' and not validation_futures:
+        logging.warning("No validation batches to compute held-out perplexity; ranking by coherence instead.")
+        metric = 'coherence'
+    batch_ids = search_batch_order(len(train_futures), random_state)[:max(1, num_batches)]
+
+    tasks = as_completed()
+    task_configs = {}
+    trial_scores = {}
+    history = []
+    submitted = 0
+
+    def submit_trial():
+        config = optimizer.ask()
+        trial_scores[config] = []
+        for batch_index in batch_ids:
+            train_future = train_futures[batch_index]
+            validation_future = validation_futures[batch_index % len(validation_futures)] if validation_futures else None
+            future = client.submit(
+                score_search_configs, [config], train_future, validation_future, metric, random_state, passes,
+                iterations, update_every, eval_every, cores, vocabulary=vocabulary,
+                prepared_dictionary=prepared_dictionary, backend=backend, lda_workers=lda_workers, pure=False
+            )
+            task_configs[future.key] = config
+            tasks.add(future)
+
+    while submitted < min(in_flight, n_trials):
+        submit_trial()
+        submitted += 1
+
+    for future in tasks:
+        config = task_configs.pop(future.key)
+        try:
+            score = future.result()[0]['score']
+        except Exception as e:
+            logging.error(f"A Bayesian search trial failed for {config}: {e}")
+            score = float('-inf')
+        trial_scores[config].append(score if math.isfinite(score) else float('-inf'))
+
+        if len(trial_scores[config]) == len(batch_ids):
+            score = float(np.mean(trial_scores.pop(config)))
+            optimizer.tell(config, score)
+            history.append({'trial': len(history), 'config': list(config), 'score': score})
+            logging.info(f"Bayesian search trial {len(history)}/{n_trials}: {config} scored {score:.4f} ({metric}).")
+            if submitted < n_trials:
+                submit_trial()
+                submitted += 1
+
+    return history
@@ -0,0 +1,178 @@
+# model_consensus.py - Consensus Merging of Per-Batch LDA Models for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script combines the per-batch models that the Unified Topic Modeling and Analysis (UTMA) trains for one
+# (n_topics, alpha, beta) configuration into a single consensus model. Topic order is arbitrary in every model,
+# so the topics of each model are first aligned to a reference: Hellinger distances between all topic pairs
+# are computed as one matrix product over square-root topic-word distributions, and the Hungarian algorithm
+# (scipy's linear_sum_assignment) finds the matching with the smallest total distance. The aligned
+# distributions are averaged, weighted by the documents each model saw, and the average becomes the
+# reference of the next round. The result is a regular LdaModel that can be scored and visualized. Merging
+# runs as a Dask task over the result futures, so the model artifacts never have to be gathered on the driver.
+#
+# Functions:
+# - hellinger_distance_matrix: Vectorized Hellinger distances between two sets of topics.
+# - align_topics: Hungarian matching of a model's topics to reference topics.
+# - merge_lda_models: Aligns and averages LDA models into a consensus LdaModel.
+# - merge_batch_models: Dask task merging the per-batch models of one configuration from train results.
+#
+# Dependencies:
+# - Python libraries: logging, numpy, scipy
+# - Gensim library for LDA modeling and the Dictionary
+#
+# Developed with AI assistance.
+
+import logging
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from gensim.corpora import Dictionary
+from gensim.models import LdaModel
+
+from .model_serialization import deserialize_lda_model
+
+# Alignment rounds: the first aligns to the reference model, later rounds to the previous consensus
+CONSENSUS_ROUNDS = 2
+
+
+def hellinger_distance_matrix(reference, topics):
+    """
+    Computes Hellinger distances between every pair of topics.
+
+    Args:
+        reference (numpy.ndarray): (K1, V) topic-word distributions.
+        topics (numpy.ndarray): (K2, V) topic-word distributions over the same vocabulary.
+
+    Returns:
+        numpy.ndarray: (K1, K2) distances in [0, 1].
+    """
+    bhattacharyya = np.sqrt(reference) @ np.sqrt(topics).T
+    return np.sqrt(np.clip(1.0 - bhattacharyya, 0.0, 1.0))
+
+
+def align_topics(reference, topics):
+    """
+    Matches topics to reference topics with the Hungarian algorithm.
+
+    Returns:
+        tuple: (permutation, distances) where `topics[permutation]` is aligned row by row with
+        `reference` and `distances` holds the Hellinger distance of every matched pair.
+    """
+    cost = hellinger_distance_matrix(reference, topics)
+    rows, columns = linear_sum_assignment(cost)
+    permutation = columns[np.argsort(rows)]
+    return permutation, cost[np.arange(len(permutation)), permutation]
+
+
+def _union_vocabulary(ldamodels):
+    """Return the Dictionary shared by the models, or a union Dictionary, with each model's column mapping."""
+    first = ldamodels[0].id2word
+    if all(model.id2word.token2id == first.token2id for model in ldamodels[1:]):
+        identity = np.arange(len(first))
+        return first, [identity] * len(ldamodels)
+
+    dictionary = Dictionary()
+    for model in ldamodels:
+        for token in model.id2word.token2id:
+            if token not in dictionary.token2id:
+                dictionary.token2id[token] = len(dictionary.token2id)
+    dictionary.id2token = {}
+    columns = [
+        np.array([dictionary.token2id[model.id2word[token_id]] for token_id in range(len(model.id2word))])
+        for model in ldamodels
+    ]
+    return dictionary, columns
+
+
+def merge_lda_models(ldamodels, weights=None, rounds=CONSENSUS_ROUNDS):
+    """
+    Aligns the topics of several LDA models and averages them into a consensus model.
+
+    Models with different vocabularies are mapped onto the union of their tokens; words missing from
+    a model have zero probability in it. The consensus lambda is the averaged distribution scaled to
+    the average topic mass of the models, so its topics are as concentrated as the inputs.
+
+    Args:
+        ldamodels (list of LdaModel): Models with the same number of topics.
+        weights (list of float or None): Weight per model; defaults to the documents each model saw.
+        rounds (int): Alignment rounds.
+
+    Returns:
+        tuple: (consensus LdaModel, summary dict with the mean matched Hellinger distance per model).
+    """
+    num_topics = ldamodels[0].num_topics
+    if any(model.num_topics != num_topics for model in ldamodels):
+        raise ValueError("All models must have the same number of topics to be merged.")
+
+    dictionary, columns = _union_vocabulary(ldamodels)
+    if weights is None:
+        weights = [max(1, model.state.numdocs) for model in ldamodels]
+    weights = np.asarray(weights, dtype=np.float64) / np.sum(weights)
+
+    distributions, masses = [], []
+    for model, model_columns in zip(ldamodels, columns):
+        lambdas = model.state.get_lambda()
+        topics = np.zeros((num_topics, len(dictionary)), dtype=np.float64)
+        topics[:, model_columns] = lambdas / lambdas.sum(axis=1, keepdims=True)
+        distributions.append(topics)
+        masses.append(lambdas.sum(axis=1))
+
+    reference = distributions[0]
+    for _ in range(max(1, rounds)):
+        consensus = np.zeros_like(reference)
+        consensus_mass = np.zeros(num_topics)
+        consensus_alpha = np.zeros(num_topics)
+        distances = []
+        for model, topics, mass, weight in zip(ldamodels, distributions, masses, weights):
+            permutation, matched = align_topics(reference, topics)
+            consensus += weight * topics[permutation]
+            consensus_mass += weight * mass[permutation]
+            consensus_alpha += weight * np.asarray(model.alpha, dtype=np.float64)[permutation]
+            distances.append(float(matched.mean()))
+        reference = consensus / consensus.sum(axis=1, keepdims=True)
+
+    eta = float(np.average([np.mean(model.eta) for model in ldamodels], weights=weights))
+    merged = LdaModel(id2word=dictionary, num_topics=num_topics, alpha=consensus_alpha, eta=eta,
+                      dtype=ldamodels[0].dtype)
+    sstats = np.maximum(reference * consensus_mass[:, None] - eta, 0.0)
+    merged.state.sstats = sstats.astype(merged.dtype)
+    merged.state.numdocs = int(sum(model.state.numdocs for model in ldamodels))
+    merged.sync_state()
+
+    summary = {
+        'num_models': len(ldamodels),
+        'num_terms': len(dictionary),
+        'mean_hellinger_distance': float(np.mean(distances)),
+        'model_hellinger_distances': distances,
+    }
+    return merged, summary
+
+
+def merge_batch_models(config, *train_results):
+    """
+    Dask task: merges the per-batch models of one configuration.
+
+    Args:
+        config (tuple): (n_topics, alpha, beta) of the configuration.
+        *train_results: Train results of `train_model_v2` (dicts) or `train_models_fused` (lists of dicts),
+            passed as futures so they are resolved on the worker.
+
+    Returns:
+        tuple: (consensus LdaModel, summary dict including the configuration).
+    """
+    key = (config[0], str(config[1]), str(config[2]))
+    ldamodels = []
+    for result in train_results:
+        for model_data in (result if isinstance(result, list) else [result]):
+            if (model_data['topics'], str(model_data['alpha_str'][0]), str(model_data['beta_str'][0])) == key:
+                ldamodels.append(deserialize_lda_model(model_data['lda_model']))
+    if not ldamodels:
+        raise ValueError(f"No trained models found for configuration {config}.")
+
+    merged, summary = merge_lda_models(ldamodels)
+    summary['config'] = list(config)
+    logging.info(f"Merged {summary['num_models']} batch models of {config} into a consensus model "
+                 f"(mean Hellinger distance {summary['mean_hellinger_distance']:.4f}).")
+    return merged, summary
@@ -0,0 +1,113 @@
+# model_serialization.py - Compact LDA Model Serialization for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script serializes the trained LDA models of the Unified Topic Modeling and Analysis (UTMA), which travel
+# in every result dict through Dask, the driver, the run ledger and the zip archives. A pickled LdaModel carries
+# the full training state (sufficient statistics and the cached exp(E[log beta]), both K x V) plus the pickled
+# Dictionary with its document and collection frequencies. The compact format keeps only what inference and
+# scoring need: the float32 topic-word lambda, the alpha and eta priors, the vocabulary as UTF-8 bytes with
+# offsets, and a few scalar settings, written as an uncompressed numpy .npz archive. Loading rebuilds a regular
+# LdaModel from lambda, so validation, test, consensus merging and visualizations work unchanged. Pickled
+# models are still read, so results and ledgers written without the compact mode remain loadable.
+#
+# Functions:
+# - serialize_lda_model: Pickled or compact bytes of a model.
+# - deserialize_lda_model: Rebuilds an LdaModel from either format.
+#
+# Dependencies:
+# - Python libraries: io, json, pickle, logging, numpy
+# - Gensim library for LDA modeling and the Dictionary
+#
+# Developed with AI assistance.
+
+import io
+import json
+import pickle
+import logging
+
+import numpy as np
+from gensim.corpora import Dictionary
+from gensim.models import LdaModel
+
+# Prefix of compact models; pickled models start with the pickle protocol byte instead
+COMPACT_MODEL_MAGIC = b"UTMALDA1"
+
+# Scalar LdaModel attributes restored on load
+COMPACT_MODEL_SETTINGS = ('iterations', 'gamma_threshold', 'minimum_probability', 'minimum_phi_value',
+                          'per_word_topics', 'decay', 'offset', 'chunksize', 'passes', 'update_every',
+                          'eval_every', 'num_updates')
+
+
+def serialize_lda_model(ldamodel, compact=False):
+    """
+    Serializes an LDA model.
+
+    Args:
+        ldamodel (LdaModel): Trained model (LdaMulticore models are stored as LdaModel when compact).
+        compact (bool): Write the compact numpy format instead of a pickle.
+
+    Returns:
+        bytes: The serialized model.
+    """
+    if not compact:
+        return pickle.dumps(ldamodel)
+
+    id2word = ldamodel.id2word
+    if sorted(id2word.keys()) != list(range(len(id2word))):
+        logging.warning("Dictionary ids are not contiguous; the model is pickled instead of stored compactly.")
+        return pickle.dumps(ldamodel)
+
+    tokens = [id2word[token_id].encode('utf-8') for token_id in range(len(id2word))]
+    settings = {name: getattr(ldamodel, name) for name in COMPACT_MODEL_SETTINGS}
+    settings['numdocs'] = ldamodel.state.numdocs
+
+    buffer = io.BytesIO()
+    buffer.write(COMPACT_MODEL_MAGIC)
+    np.savez(
+        buffer,
+        topic_word=ldamodel.state.get_lambda().astype(np.float32, copy=False),
+        alpha=np.asarray(ldamodel.alpha, dtype=np.float32),
+        eta=np.asarray(ldamodel.eta, dtype=np.float32),
+        token_bytes=np.frombuffer(b''.join(tokens), dtype=np.uint8),
+        token_offsets=np.cumsum([0] + [len(token) for token in tokens], dtype=np.int64),
+        settings=np.frombuffer(json.dumps(settings).encode('utf-8'), dtype=np.uint8),
+    )
+    return buffer.getvalue()
+
+
+def deserialize_lda_model(model_bytes):
+    """
+    Loads a model written by `serialize_lda_model` in either format.
+
+    Returns:
+        LdaModel: The model; compact models are rebuilt from their topic-word lambda in float32.
+    """
+    if not model_bytes.startswith(COMPACT_MODEL_MAGIC):
+        return pickle.loads(model_bytes)
+
+    with np.load(io.BytesIO(model_bytes[len(COMPACT_MODEL_MAGIC):])) as arrays:
+        topic_word = arrays['topic_word']
+        alpha = arrays['alpha']
+        eta = arrays['eta']
+        token_bytes = arrays['token_bytes'].tobytes()
+        token_offsets = arrays['token_offsets']
+        settings = json.loads(arrays['settings'].tobytes().decode('utf-8'))
+
+    dictionary = Dictionary()
+    dictionary.token2id = {
+        token_bytes[start:end].decode('utf-8'): token_id
+        for token_id, (start, end) in enumerate(zip(token_offsets[:-1], token_offsets[1:]))
+    }
+
+    numdocs = settings.pop('numdocs')
+    num_updates = settings.pop('num_updates')
+    ldamodel = LdaModel(id2word=dictionary, num_topics=topic_word.shape[0], alpha=alpha, eta=eta,
+                        dtype=np.float32, **settings)
+    # lambda = eta + sstats; the state holds the sufficient statistics
+    ldamodel.state.sstats = (topic_word - ldamodel.eta).astype(np.float32, copy=False)
+    ldamodel.state.numdocs = numdocs
+    ldamodel.num_updates = num_updates
+    ldamodel.sync_state()
+    return ldamodel
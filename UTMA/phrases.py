@@ -0,0 +1,207 @@
+# phrases.py - Distributed Phrase (Bigram/Trigram) Detection for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script makes collocation detection a scalable pipeline stage of the Unified Topic Modeling and Analysis
+# (UTMA) instead of a notebook step. Unigram and bigram candidates are counted per JSONL shard on the Dask
+# workers, the count tables are merged in a tree reduction with Gensim-style pruning of rare candidates, and a
+# frozen Gensim phraser is built from the merged counts. The phraser is then applied to the shards in parallel,
+# appending detected phrases to each document as the DocumentParser notebook does.
+#
+# Functions:
+# - count_phrase_candidates: Counts unigram and bigram candidates in one shard.
+# - merge_phrase_counts: Merges two count tables, pruning rare candidates when the table grows too large.
+# - learn_phrases: Learns a frozen phraser from all shards on the Dask cluster.
+# - apply_phrases_to_shard / detect_phrases: Applies the learned phrasers to the corpus shards.
+#
+# Dependencies:
+# - Python libraries: os, json, logging
+# - Dask libraries: distributed
+# - Gensim library for Phrases
+#
+# Developed with AI assistance.
+
+import os
+import json
+import logging
+
+from gensim import utils as gensim_utils
+from gensim.models.phrases import Phrases
+
+from .process_futures import iter_jsonl_documents, list_jsonl_shards, remove_jsonl_shards
+
+DEFAULT_MAX_VOCAB_SIZE = 40000000  # Gensim's default bound on the candidate table
+
+
+def _phrased_documents(shard_path, phrasers):
+    """Yield the documents of a shard with the previously learned phrasers applied in order."""
+    for document in iter_jsonl_documents(shard_path):
+        for phraser in phrasers:
+            document = phraser[document]
+        yield document
+
+
+def count_phrase_candidates(shard_path, phrasers=(), delimiter='_', max_vocab_size=DEFAULT_MAX_VOCAB_SIZE):
+    """
+    Counts unigram and bigram candidates in one JSONL shard.
+
+    Counting uses Gensim's own vocabulary learner, so the table is identical to what `Phrases`
+    would collect for the same documents.
+
+    Args:
+        shard_path (str): Path to the JSONL shard.
+        phrasers (sequence of FrozenPhrases): Phrasers applied before counting, e.g. the bigram
+            phraser when learning trigrams.
+        delimiter (str): String joining the tokens of a phrase.
+        max_vocab_size (int): Bound on the table; rare candidates are pruned beyond it.
+
+    Returns:
+        tuple: (counts dict, corpus word count, min_reduce reached while pruning).
+    """
+    min_reduce, vocab, total_words = Phrases._learn_vocab(
+        _phrased_documents(shard_path, phrasers), max_vocab_size, delimiter, frozenset(), progress_per=10000
+    )
+    return vocab, total_words, min_reduce
+
+
+def merge_phrase_counts(left, right, max_vocab_size=DEFAULT_MAX_VOCAB_SIZE):
+    """
+    Merges two candidate count tables.
+
+    When the merged table exceeds `max_vocab_size`, candidates rarer than the running
+    `min_reduce` are pruned, exactly as `Phrases.add_vocab` does when training incrementally.
+
+    Args:
+        left (tuple): Output of `count_phrase_candidates` or of a previous merge.
+        right (tuple): Output of `count_phrase_candidates` or of a previous merge.
+        max_vocab_size (int): Bound on the merged table.
+
+    Returns:
+        tuple: (counts dict, corpus word count, min_reduce).
+    """
+    left_vocab, left_words, left_min_reduce = left
+    right_vocab, right_words, right_min_reduce = right
+    if len(left_vocab) < len(right_vocab):
+        left_vocab, right_vocab = right_vocab, left_vocab
+
+    for candidate, count in right_vocab.items():
+        left_vocab[candidate] = left_vocab.get(candidate, 0) + count
+
+    min_reduce = max(left_min_reduce, right_min_reduce)
+    if len(left_vocab) > max_vocab_size:
+        gensim_utils.prune_vocab(left_vocab, min_reduce)
+        min_reduce += 1
+
+    return left_vocab, left_words + right_words, min_reduce
+
+
+def learn_phrases(client, shard_paths, phrasers=(), min_count=20, threshold=10.0, delimiter='_',
+                  max_vocab_size=DEFAULT_MAX_VOCAB_SIZE):
+    """
+    Learns a frozen phraser from all shards on the Dask cluster.
+
+    Each shard is counted by a worker; the tables are merged pairwise on the workers in a tree
+    reduction, so only the final table is transferred to the driver.
+
+    Args:
+        client (Client): Dask client.
+        shard_paths (list of str): JSONL shards readable by the workers.
+        phrasers (sequence of FrozenPhrases): Phrasers applied before counting.
+        min_count (int): Ignore candidates with a total count below this value.
+        threshold (float): Score threshold for forming a phrase (Gensim's default scorer).
+        delimiter (str): String joining the tokens of a phrase.
+        max_vocab_size (int): Bound on each count table.
+
+    Returns:
+        FrozenPhrases: The learned phraser.
+    """
+    counts = client.map(count_phrase_candidates, shard_paths, phrasers=phrasers, delimiter=delimiter,
+                        max_vocab_size=max_vocab_size, pure=False)
+
+    while len(counts) > 1:
+        merged = [client.submit(merge_phrase_counts, counts[i], counts[i + 1], max_vocab_size=max_vocab_size, pure=False)
+                  for i in range(0, len(counts) - 1, 2)]
+        if len(counts) % 2:
+            merged.append(counts[-1])
+        counts = merged
+
+    vocab, total_words, min_reduce = counts[0].result()
+
+    phrases = Phrases(min_count=min_count, threshold=threshold, max_vocab_size=max_vocab_size, delimiter=delimiter)
+    phrases.vocab = vocab
+    phrases.corpus_word_count = total_words
+    phrases.min_reduce = min_reduce
+
+    logging.info(f"Learned phrase candidates from {len(shard_paths)} shards: {len(vocab)} entries, {total_words} words.")
+    return phrases.freeze()
+
+
+def apply_phrases_to_shard(shard_path, output_path, phrasers, append=True):
+    """
+    Applies the phrasers to one shard and writes the result as a new JSONL shard.
+
+    Args:
+        shard_path (str): Input JSONL shard.
+        output_path (str): Output JSONL shard.
+        phrasers (sequence of FrozenPhrases): Phrasers applied in order.
+        append (bool): If True, detected phrases are appended to the original tokens, as in the
+            DocumentParser notebook; otherwise the phrased token sequence replaces them.
+
+    Returns:
+        int: Number of documents written.
+    """
+    written = 0
+    delimiter = phrasers[0].delimiter
+    with open(output_path, 'w', encoding='utf-8') as outfile:
+        for document in iter_jsonl_documents(shard_path):
+            phrased = document
+            for phraser in phrasers:
+                phrased = phraser[phrased]
+            if append:
+                phrased = document + [token for token in phrased if delimiter in token]
+            outfile.write(json.dumps(phrased, ensure_ascii=False) + '\n')
+            written += 1
+    return written
+
+
+def detect_phrases(client, data_source, output_dir, min_count=20, threshold=10.0, trigrams=False, append=True):
+    """
+    Runs the distributed phrase detection stage over a JSONL file or shard directory.
+
+    Args:
+        client (Client): Dask client.
+        data_source (str): JSONL file or directory of JSONL shards.
+        output_dir (str): Directory that receives the phrased shards and the saved phrasers; shards and
+            phrasers of a previous run in it are removed first.
+        min_count (int): Minimum total count of a phrase.
+        threshold (float): Phrase score threshold.
+        trigrams (bool): Also learn a second-level phraser over the bigram output.
+        append (bool): Append phrases to the documents instead of replacing the joined tokens.
+
+    Returns:
+        str: `output_dir`, which can be used as the new data source.
+    """
+    if os.path.abspath(output_dir) == os.path.abspath(data_source):
+        raise ValueError(f"Phrase detection cannot write its output into its data source {data_source}.")
+    shard_paths = list_jsonl_shards(data_source)
+    # Shards and phrasers of an earlier run would otherwise be read as part of this output
+    os.makedirs(output_dir, exist_ok=True)
+    remove_jsonl_shards(output_dir, "phrased-")
+    for name in os.listdir(output_dir):
+        if name.startswith("phrases-") and name.endswith("gram.pkl"):
+            os.remove(os.path.join(output_dir, name))
+
+    phrasers = [learn_phrases(client, shard_paths, min_count=min_count, threshold=threshold)]
+    if trigrams:
+        phrasers.append(learn_phrases(client, shard_paths, phrasers=phrasers, min_count=min_count, threshold=threshold))
+
+    for level, phraser in enumerate(phrasers, start=2):
+        phraser.save(os.path.join(output_dir, f"phrases-{level}gram.pkl"))
+
+    output_paths = [os.path.join(output_dir, f"phrased-{index:05d}.jsonl") for index in range(len(shard_paths))]
+    written = client.gather(client.map(apply_phrases_to_shard, shard_paths, output_paths, phrasers=phrasers,
+                                       append=append, pure=False))
+
+    logging.info(f"Applied {len(phrasers)} phraser(s) to {sum(written)} documents in {len(shard_paths)} shards.")
+    return output_dir
@@ -0,0 +1,365 @@
+# preprocess.py - Parallel, Batched Document Preprocessing for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script is the unattended replacement for the paragraph loop of the DocumentParser notebook in the
+# Unified Topic Modeling and Analysis (UTMA). HTML and JSON files are streamed from the corpus directory,
+# paragraphs are extracted from <p> tags and cleaned, and spaCy processes them with `nlp.pipe` using batching
+# and multiple processes. Tokens are filtered by part of speech, length and stop words (NLTK English plus the
+# `custom_stopwords.json` lists, held in a set), and the resulting documents are written incrementally to
+# sharded JSONL files that `utma.py` can read directly.
+#
+# Usage:
+#   python -m UTMA.preprocess --corpus_path <dir> --output_dir <dir> [--n_process 4] [--batch_size 256]
+#
+# Functions:
+# - detect_encoding: Sniffs a file's encoding from a prefix of its bytes.
+# - iter_paragraphs: Streams cleaned paragraphs from HTML and JSON files.
+# - load_stopwords: Builds the stop-word set from NLTK and custom_stopwords.json.
+# - ShardedJsonlWriter: Writes tokenized documents to rotating JSONL shards.
+# - preprocess_corpus: Runs the full pipeline.
+#
+# Dependencies:
+# - Python libraries: os, re, json, argparse, logging, collections
+# - chardet, BeautifulSoup (bs4), nltk, spaCy
+# - remove_jsonl_shards from process_futures
+#
+# Developed with AI assistance.
+
+import os
+import re
+import json
+import argparse
+import logging
+from collections import Counter
+from time import time
+
+import chardet
+from bs4 import BeautifulSoup
+import spacy
+
+from .process_futures import remove_jsonl_shards
+
+DOC_ID = r'.*[\d\w\-.]+\.(html|json)$'  # Document filenames ending in .html or .json
+TAGS = ['p']  # HTML tags to extract content from
+POS_TAGS = frozenset(['NOUN', 'ADJ', 'VERB', 'ADV'])  # Content-word parts of speech to keep
+MIN_TOKEN_LENGTH = 5  # Minimum characters for a token to be kept
+MIN_DOCUMENT_TOKENS = 1  # Minimum tokens for a paragraph to be kept; 1 keeps every non-empty paragraph, as the notebook does
+ENCODING_SAMPLE_BYTES = 64 * 1024  # Prefix size used to sniff file encodings
+
+QUOTE_TRANSLATION = str.maketrans({
+    '‘': "'",  # Left single quotation mark
+    '’': "'",  # Right single quotation mark
+    '“': '"',  # Left double quotation mark
+    '”': '"',  # Right double quotation mark
+})
+NON_PRINTABLE_PATTERN = re.compile(r'[\x00-\x1F\x7F-\x9F]+')
+
+
+def detect_encoding(file_path, sample_bytes=ENCODING_SAMPLE_BYTES):
+    """
+    Detects the character encoding of a file from a prefix of its bytes.
+
+    Parameters:
+        file_path (str): Path to the file whose encoding needs to be detected.
+        sample_bytes (int): Number of leading bytes handed to chardet.
+
+    Returns:
+        str: The detected encoding, or 'utf-8' if chardet is not confident.
+    """
+    with open(file_path, 'rb') as f:
+        raw_data = f.read(sample_bytes)
+    return chardet.detect(raw_data)['encoding'] or 'utf-8'
+
+
+def iter_corpus_files(corpus_path, pattern=DOC_ID):
+    """Yields the paths of all files under `corpus_path` whose name matches `pattern`, in sorted order."""
+    regex = re.compile(pattern, re.IGNORECASE)
+    for root, dirs, files in os.walk(corpus_path):
+        dirs.sort()
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            if regex.search(path):
+                yield path
+
+
+def clean_paragraph(text):
+    """
+    Replaces curly quotes and removes non-printable characters from a paragraph.
+
+    Parameters:
+        text (str): The paragraph to clean.
+
+    Returns:
+        str: The cleaned paragraph, stripped of surrounding whitespace.
+    """
+    return NON_PRINTABLE_PATTERN.sub('', text.translate(QUOTE_TRANSLATION)).strip()
+
+
+def extract_paragraphs(content, tags=TAGS):
+    """
+    Extracts the text of the given tags from HTML content.
+
+    Content without <p> tags is logged and skipped, matching the DocumentParser notebook.
+
+    Parameters:
+        content (str): Raw HTML content.
+        tags (list): HTML tags to extract.
+
+    Yields:
+        str: Text of each matching element.
+    """
+    content = content.replace("\\n", "\n").strip()
+    if "<p>" not in content and "</p>" not in content:
+        logging.info(f"Skipping non-HTML content: {content[:100]}...")
+        return
+
+    soup = BeautifulSoup(content, 'html.parser')
+    for element in soup.find_all(tags):
+        yield element.get_text()
+
+
+def iter_paragraphs(corpus_path, tags=TAGS, pattern=DOC_ID):
+    """
+    Streams cleaned paragraphs from the HTML and JSON files of a corpus.
+
+    JSON files must contain a list of HTML strings. Files are read one at a time, and the
+    encoding of each is sniffed from a prefix only.
+
+    Parameters:
+        corpus_path (str): Root directory containing the corpus.
+        tags (list): HTML tags to extract.
+        pattern (str): Regular expression selecting the files to process.
+
+    Yields:
+        str: A non-empty, cleaned paragraph.
+    """
+    for path in iter_corpus_files(corpus_path, pattern):
+        encoding = detect_encoding(path)
+        try:
+            with open(path, 'r', encoding=encoding, errors='replace') as f:
+                if path.lower().endswith('.json'):
+                    data = json.load(f)
+                    if not isinstance(data, list):
+                        logging.error(f"{path} does not contain a list of HTML strings.")
+                        continue
+                    contents = (item for item in data if isinstance(item, str))
+                else:
+                    contents = [f.read()]
+
+                for content in contents:
+                    for paragraph in extract_paragraphs(content, tags):
+                        paragraph = clean_paragraph(paragraph)
+                        if paragraph:
+                            yield paragraph
+        except json.JSONDecodeError:
+            logging.error(f"{path} is not a valid JSON file.")
+        except OSError as e:
+            logging.error(f"Could not read {path}: {e}")
+
+
+def load_stopwords(custom_stopwords_path=None, stopword_keys=("cdc_mmwr",)):
+    """
+    Builds the stop-word set from NLTK's English list and the custom stop-word file.
+
+    Parameters:
+        custom_stopwords_path (str or None): Path to `custom_stopwords.json`.
+        stopword_keys (iterable of str): Keys of the custom file whose lists are added.
+
+    Returns:
+        frozenset: Lower-cased stop words for constant-time lookups.
+    """
+    try:
+        from nltk.corpus import stopwords
+        stop_words = set(stopwords.words('english'))
+    except LookupError:
+        logging.warning("NLTK stopwords corpus not found; falling back to spaCy's English stop words.")
+        from spacy.lang.en.stop_words import STOP_WORDS
+        stop_words = set(STOP_WORDS)
+
+    if custom_stopwords_path:
+        with open(custom_stopwords_path, 'r', encoding='utf-8') as file:
+            custom_stopwords = json.load(file)
+        for key in stopword_keys:
+            stop_words.update(custom_stopwords.get(key, []))
+
+    return frozenset(word.lower() for word in stop_words)
+
+
+def filter_tokens(doc, stop_words, lemmatize=True, min_token_length=MIN_TOKEN_LENGTH, stopword_count=None):
+    """
+    Keeps the content words of a spaCy Doc, mirroring the DocumentParser notebook's filter.
+
+    Parameters:
+        doc (spacy.tokens.Doc): The processed paragraph.
+        stop_words (frozenset): Stop words; both the text and the lemma of a token are checked.
+        lemmatize (bool): Emit lemmas instead of surface forms.
+        min_token_length (int): Minimum length of the surface form.
+        stopword_count (Counter or None): Updated with the stop words that were removed.
+
+    Returns:
+        list of str: The kept tokens.
+    """
+    tokens = []
+    for token in doc:
+        if token.pos_ not in POS_TAGS or len(token.text) < min_token_length:
+            continue
+        word = token.lemma_ if lemmatize and token.lemma_ else token.text
+        if token.text.lower() not in stop_words and token.lemma_.lower() not in stop_words:
+            tokens.append(word)
+        elif stopword_count is not None:
+            stopword_count[word] += 1
+    return tokens
+
+
+class ShardedJsonlWriter:
+    """
+    Writes tokenized documents to rotating JSONL shards.
+
+    Shards are named `<prefix>-00000.jsonl`, `<prefix>-00001.jsonl`, ... and hold at most
+    `shard_size` documents each. Every document is written as soon as it is produced. Shards with the
+    same prefix left in `output_dir` by an earlier run are removed first, so a smaller rerun does not
+    leave stale shards that would be read as part of the corpus.
+    """
+
+    def __init__(self, output_dir, prefix="data", shard_size=100000):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.shard_paths = []
+        self.documents_written = 0
+        self._file = None
+        self._shard_count = 0
+        os.makedirs(output_dir, exist_ok=True)
+        remove_jsonl_shards(output_dir, f"{prefix}-")
+
+    def _open_next_shard(self):
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(self.output_dir, f"{self.prefix}-{len(self.shard_paths):05d}.jsonl")
+        self._file = open(path, 'w', encoding='utf-8')
+        self._shard_count = 0
+        self.shard_paths.append(path)
+
+    def write(self, tokens):
+        if self._file is None or self._shard_count >= self.shard_size:
+            self._open_next_shard()
+        self._file.write(json.dumps(tokens, ensure_ascii=False) + '\n')
+        self._shard_count += 1
+        self.documents_written += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def preprocess_corpus(corpus_path, output_dir, custom_stopwords_path=None, stopword_keys=("cdc_mmwr",),
+                      spacy_model="en_core_web_lg", n_process=1, batch_size=256, shard_size=100000,
+                      lemmatize=True, min_token_length=MIN_TOKEN_LENGTH, min_document_tokens=MIN_DOCUMENT_TOKENS,
+                      prefix="data"):
+    """
+    Runs the preprocessing pipeline from raw HTML/JSON files to sharded JSONL documents.
+
+    Parameters:
+        corpus_path (str): Root directory containing the corpus.
+        output_dir (str): Directory that receives the JSONL shards and a summary file.
+        custom_stopwords_path (str or None): Path to `custom_stopwords.json`.
+        stopword_keys (iterable of str): Keys of the custom stop-word lists to apply.
+        spacy_model (str): Name of the spaCy model to load.
+        n_process (int): Number of processes used by `nlp.pipe`.
+        batch_size (int): Number of paragraphs per `nlp.pipe` batch.
+        shard_size (int): Maximum documents per output shard.
+        lemmatize (bool): Emit lemmas instead of surface forms.
+        min_token_length (int): Minimum characters for a token to be kept.
+        min_document_tokens (int): Minimum kept tokens for a paragraph to be written.
+        prefix (str): File name prefix of the shards.
+
+    Returns:
+        dict: Summary with paragraph, document and shard counts.
+    """
+    started = time()
+    stop_words = load_stopwords(custom_stopwords_path, stopword_keys)
+    nlp = spacy.load(spacy_model, disable=['parser', 'ner'])
+    stopword_count = Counter()
+    paragraph_count = 0
+
+    def counted_paragraphs():
+        nonlocal paragraph_count
+        for paragraph in iter_paragraphs(corpus_path):
+            paragraph_count += 1
+            yield paragraph
+
+    with ShardedJsonlWriter(output_dir, prefix=prefix, shard_size=shard_size) as writer:
+        for doc in nlp.pipe(counted_paragraphs(), batch_size=batch_size, n_process=n_process):
+            tokens = filter_tokens(doc, stop_words, lemmatize, min_token_length, stopword_count)
+            if len(tokens) >= min_document_tokens:
+                writer.write(tokens)
+
+    summary = {
+        'corpus_path': corpus_path,
+        'paragraphs': paragraph_count,
+        'documents': writer.documents_written,
+        'shards': writer.shard_paths,
+        'most_common_stopwords': stopword_count.most_common(50),
+        'minutes': round((time() - started) / 60, 2),
+    }
+    with open(os.path.join(output_dir, f"{prefix}-summary.json"), 'w', encoding='utf-8') as summaryfile:
+        json.dump(summary, summaryfile, indent=1, ensure_ascii=False)
+
+    logging.info(f"Preprocessed {paragraph_count} paragraphs into {writer.documents_written} documents "
+                 f"across {len(writer.shard_paths)} shards in {summary['minutes']} minutes.")
+    return summary
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments for the preprocessing stage."""
+    parser = argparse.ArgumentParser(description="Preprocess HTML/JSON documents into sharded JSONL for UTMA.")
+    parser.add_argument("--corpus_path", type=str, required=True, help="Root directory containing the HTML and JSON documents.")
+    parser.add_argument("--output_dir", type=str, required=True, help="Directory for the sharded JSONL output.")
+    parser.add_argument("--custom_stopwords", type=str, help="Path to custom_stopwords.json (default config/custom_stopwords.json if present).")
+    parser.add_argument("--stopword_keys", type=str, nargs="+", help="Keys of custom_stopwords.json to apply (default cdc_mmwr).")
+    parser.add_argument("--spacy_model", type=str, help="spaCy model to load (default en_core_web_lg).")
+    parser.add_argument("--n_process", type=int, help="Number of processes for nlp.pipe (default 1).")
+    parser.add_argument("--batch_size", type=int, help="Paragraphs per nlp.pipe batch (default 256).")
+    parser.add_argument("--shard_size", type=int, help="Maximum documents per JSONL shard (default 100000).")
+    parser.add_argument("--min_token_length", type=int, help="Minimum characters per kept token (default 5).")
+    parser.add_argument("--min_document_tokens", type=int, help="Minimum tokens per kept document (default 1, every non-empty paragraph, as in the notebook).")
+    parser.add_argument("--no_lemmatization", action="store_true", help="Keep surface forms instead of lemmas.")
+    parser.add_argument("--prefix", type=str, help="File name prefix of the shards (default data).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    default_stopwords = os.path.join("config", "custom_stopwords.json")
+    custom_stopwords_path = args.custom_stopwords or (default_stopwords if os.path.exists(default_stopwords) else None)
+
+    summary = preprocess_corpus(
+        args.corpus_path,
+        args.output_dir,
+        custom_stopwords_path=custom_stopwords_path,
+        stopword_keys=tuple(args.stopword_keys) if args.stopword_keys else ("cdc_mmwr",),
+        spacy_model=args.spacy_model or "en_core_web_lg",
+        n_process=args.n_process if args.n_process is not None else 1,
+        batch_size=args.batch_size if args.batch_size is not None else 256,
+        shard_size=args.shard_size if args.shard_size is not None else 100000,
+        lemmatize=not args.no_lemmatization,
+        min_token_length=args.min_token_length if args.min_token_length is not None else MIN_TOKEN_LENGTH,
+        min_document_tokens=args.min_document_tokens if args.min_document_tokens is not None else MIN_DOCUMENT_TOKENS,
+        prefix=args.prefix or "data",
+    )
+    print(f"Wrote {summary['documents']} documents to {len(summary['shards'])} shards in {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,11 +9,14 @@
 #
 # Functions:
 # - futures_create_lda_datasets: Creates datasets for LDA training and validation from input files.
+# - futures_create_lda_datasets_streaming: Single-pass, bounded-memory variant that reads JSONL input line by line.
+# - futures_create_encoded_lda_datasets: Splits an integer-encoded corpus into array-backed batches.
+# - remove_jsonl_shards: Clears the shards of a previous run from a pipeline stage's output directory.
 # - Database utilities: Includes functions for dynamically creating and updating tables in PostgreSQL.
 # - Error handling: Implements exponential backoff for retrying failed tasks and garbage collection to manage memory.
 #
 # Dependencies:
-# - Python libraries: time, os, json, random, pandas, logging
+# - Python libraries: time, os, json, random, hashlib, pandas, logging
 # - Dask libraries: distributed
 #
 # Developed with AI assistance.
@@ -25,8 +28,9 @@ from time import sleep
 import logging
 from dask.distributed import wait
 import os
-from json import load
+from json import load, loads
 from random import shuffle
+import hashlib
 import pandas as pd 
 from .utils import garbage_collection
 
@@ -104,6 +108,206 @@ def futures_create_lda_datasets(filename, train_ratio, validation_ratio, batch_s
     print(f"Final cumulative count after all batches: {cumulative_count}")
 
 
+def iter_jsonl_documents(filename):
+    """
+    Yields one tokenized document per non-empty line of a JSONL file or a directory of JSONL shards.
+
+    This is the `data.jsonl` layout written by the DocumentParser notebook, or the sharded output of
+    `python -m UTMA.preprocess`: each line holds a JSON list of tokens. Shards are read in sorted
+    order and only one line is held in memory at a time.
+
+    Args:
+        filename (str): Path to the JSONL file, or to a directory containing '*.jsonl' shards.
+
+    Yields:
+        list: The tokens of the next document.
+    """
+    for shard_path in list_jsonl_shards(filename):
+        with open(shard_path, 'r', encoding='utf-8') as jsonlfile:
+            for line in jsonlfile:
+                line = line.strip()
+                if line:
+                    yield loads(line)
+
+
+def list_jsonl_shards(filename):
+    """Return the '*.jsonl' shards of a directory in sorted order, or `[filename]` for a single file."""
+    if os.path.isdir(filename):
+        return [os.path.join(filename, name) for name in sorted(os.listdir(filename)) if name.lower().endswith('.jsonl')]
+    return [filename]
+
+
+def remove_jsonl_shards(directory, prefix):
+    """
+    Removes the '<prefix>*.jsonl' shards of a directory before a pipeline stage writes new ones.
+
+    A stage that writes fewer shards than a previous run in the same directory would otherwise leave
+    stale shards behind, which `list_jsonl_shards` would read as part of its output.
+
+    Returns:
+        int: The number of shards removed.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    stale = [name for name in os.listdir(directory) if name.startswith(prefix) and name.lower().endswith('.jsonl')]
+    for name in stale:
+        os.remove(os.path.join(directory, name))
+    if stale:
+        logging.info(f"Removed {len(stale)} shards of a previous run from {directory}.")
+    return len(stale)
+
+
+def is_jsonl_source(filename):
+    """Return True if `filename` is a JSONL file or a directory of JSONL shards."""
+    return filename.lower().endswith('.jsonl') or os.path.isdir(filename)
+
+
+def iter_documents(filename):
+    """
+    Yields tokenized documents from a JSONL file or shard directory (streamed) or a JSON list file.
+
+    Args:
+        filename (str): Path to a '.jsonl' file, a directory of '.jsonl' shards, or a '.json' file of tokenized documents.
+
+    Yields:
+        list: The tokens of the next document.
+    """
+    if is_jsonl_source(filename):
+        yield from iter_jsonl_documents(filename)
+    else:
+        with open(filename, 'r', encoding='utf-8') as jsonfile:
+            yield from load(jsonfile)
+
+
+def assign_split(record_index, train_ratio, validation_ratio, seed=0):
+    """
+    Deterministically assigns a record to the train, validation or test split.
+
+    The record index and seed are hashed to a uniform value in [0, 1), so membership is decided
+    without knowing the corpus size and is reproducible across runs with the same seed.
+
+    Args:
+        record_index (int): Position of the record in the input file.
+        train_ratio (float): Fraction of records assigned to training.
+        validation_ratio (float): Fraction of records assigned to validation.
+        seed (int): Seed mixed into the hash; use the run's random_state.
+
+    Returns:
+        str: One of 'train', 'validation' or 'test'.
+    """
+    digest = hashlib.blake2b(f"{seed}:{record_index}".encode(), digest_size=8).digest()
+    position = int.from_bytes(digest, 'big') / 2 ** 64
+
+    if position < train_ratio:
+        return 'train'
+    elif position < train_ratio + validation_ratio:
+        return 'validation'
+    return 'test'
+
+
+def futures_create_lda_datasets_streaming(filename, train_ratio, validation_ratio, batch_size, seed=0):
+    """
+    Streams a JSONL corpus into train, validation and test batches in a single pass.
+
+    Unlike `futures_create_lda_datasets`, the file is never loaded as a whole. Each document is
+    assigned to a split with `assign_split` as it is read, and a batch is yielded as soon as its
+    split buffer reaches `batch_size`, so the caller can scatter batches while reading continues.
+    Remaining partial batches are flushed at the end of the file.
+
+    Args:
+        filename (str): Path to the JSONL file (one JSON token list per line) or a directory of JSONL shards.
+        train_ratio (float): Fraction of documents assigned to training.
+        validation_ratio (float): Fraction of documents assigned to validation.
+        batch_size (int): Number of documents per yielded batch.
+        seed (int): Seed for the hash-based split assignment.
+
+    Yields:
+        dict: Batch information with the same keys as `futures_create_lda_datasets`. Because the
+        split sizes are not known in advance, 'num_samples' is the running count of documents
+        yielded for that split so far.
+    """
+    phases = ('train', 'validation', 'test')
+    buffers = {phase: ([], []) for phase in phases}
+    split_counts = {phase: 0 for phase in phases}
+    cumulative_count = 0
+
+    def make_batch(phase):
+        nonlocal cumulative_count
+        data_batch, indices_batch = buffers[phase]
+        buffers[phase] = ([], [])
+        cumulative_count += len(data_batch)
+        split_counts[phase] += len(data_batch)
+        return {
+            'type': phase,
+            'data': data_batch,
+            'indices_batch': indices_batch,
+            'cumulative_count': cumulative_count,
+            'num_samples': split_counts[phase]
+        }
+
+    for record_index, document in enumerate(iter_jsonl_documents(filename)):
+        phase = assign_split(record_index, train_ratio, validation_ratio, seed)
+        data_batch, indices_batch = buffers[phase]
+        data_batch.append(document)
+        indices_batch.append(record_index)
+
+        if len(data_batch) >= batch_size:
+            yield make_batch(phase)
+
+    # Flush the partially filled batches in train, validation, test order
+    for phase in phases:
+        if len(buffers[phase][0]) > 0:
+            yield make_batch(phase)
+
+    print(f"Total documents assigned to training set: {split_counts['train']}")
+    print(f"Total documents assigned to validation set: {split_counts['validation']}")
+    print(f"Total documents assigned to test set: {split_counts['test']}")
+    print(f"Final cumulative count after all batches: {cumulative_count}")
+
+
+def futures_create_encoded_lda_datasets(encoded_corpus, train_ratio, validation_ratio, batch_size, seed=0):
+    """
+    Splits an `EncodedCorpus` into train, validation and test batches of `EncodedBatch` objects.
+
+    Split membership uses the same seeded hash as `futures_create_lda_datasets_streaming`, so a
+    JSONL file and its encoded form produce identical splits for the same seed.
+
+    Args:
+        encoded_corpus (EncodedCorpus): The corpus produced by `write_encoded_corpus`.
+        train_ratio (float): Fraction of documents assigned to training.
+        validation_ratio (float): Fraction of documents assigned to validation.
+        batch_size (int): Number of documents per yielded batch.
+        seed (int): Seed for the hash-based split assignment.
+
+    Yields:
+        dict: Batch information with the same keys as `futures_create_lda_datasets`; 'data' is an
+        `EncodedBatch`.
+    """
+    split_indices = {'train': [], 'validation': [], 'test': []}
+    for record_index in range(len(encoded_corpus)):
+        split_indices[assign_split(record_index, train_ratio, validation_ratio, seed)].append(record_index)
+
+    print(f"Total documents assigned to training set: {len(split_indices['train'])}")
+    print(f"Total documents assigned to validation set: {len(split_indices['validation'])}")
+    print(f"Total documents assigned to test set: {len(split_indices['test'])}")
+
+    cumulative_count = 0
+    for phase, indices in split_indices.items():
+        for start in range(0, len(indices), batch_size):
+            indices_batch = indices[start:start + batch_size]
+            data_batch = encoded_corpus.take(indices_batch)
+            cumulative_count += len(indices_batch)
+            yield {
+                'type': phase,
+                'data': data_batch,
+                'indices_batch': indices_batch,
+                'cumulative_count': cumulative_count,
+                'num_samples': len(indices)
+            }
+
+    print(f"Final cumulative count after all batches: {cumulative_count}")
+
+
 def process_completed_futures(phase, connection_string, corpus_label, \
                             completed_train_futures, completed_validation_futures, completed_test_futures, \
                             num_documents, workers, \
@@ -0,0 +1,199 @@
+# run_ledger.py - Crash-Safe Run Ledger for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script records the progress of a Unified Topic Modeling and Analysis (UTMA) grid run in a local SQLite
+# database, so a run that dies after days of training can be resumed instead of retrained from scratch. Every
+# task is keyed by the corpus content hash, a hash of the settings that shape the split and the training, the
+# phase, the batch id and the (n_topics, alpha, beta) configuration, and is marked complete once its results
+# are written to PostgreSQL. The trained models of the train phase are saved next to the database, and the
+# sampled (or searched) combinations of the run are stored as its plan, so a resumed run repeats the same
+# combinations, skips the finished tasks and reloads the trained models for the validation and test phases.
+# The database runs in WAL mode and commits after every update, so an interrupted run loses at most the
+# tasks that were in flight.
+#
+# Functions:
+# - ledger_signature: Hash of the split and training settings of a run.
+# - RunLedger: SQLite ledger of completed tasks, trained models and the plan of a run.
+#
+# Dependencies:
+# - Python libraries: os, json, sqlite3, hashlib, logging, datetime
+#
+# Developed with AI assistance.
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+
+LEDGER_FILE = "run_ledger.sqlite"
+
+
+def ledger_signature(settings):
+    """
+    Hashes the settings that must match for completed tasks to be reused.
+
+    Args:
+        settings (dict): Split and training settings (ratios, batch size, seed, passes, ...).
+
+    Returns:
+        str: Hex BLAKE2b digest of the settings.
+    """
+    encoded = json.dumps(settings, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _config_key(config):
+    """Normalize (n_topics, alpha, beta); alpha and beta are stored as strings, as in the results."""
+    return int(config[0]), str(config[1]), str(config[2])
+
+
+class RunLedger:
+    """
+    SQLite ledger of the completed tasks, trained models and plan of one run.
+
+    Batch ids are the positions of the batches in their split; they identify the same documents
+    across runs when the split is deterministic (--split_dir, JSONL or encoded input).
+    """
+
+    def __init__(self, path, corpus_hash, signature):
+        self.path = path
+        self.corpus_hash = corpus_hash
+        self.signature = signature
+        self.model_dir = os.path.join(os.path.dirname(os.path.abspath(path)), "ledger_models",
+                                      f"{corpus_hash[:16]}-{signature[:16]}")
+        os.makedirs(self.model_dir, exist_ok=True)
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                corpus_hash TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                phase TEXT NOT NULL,
+                batch_id INTEGER NOT NULL,
+                n_topics INTEGER NOT NULL,
+                alpha TEXT NOT NULL,
+                beta TEXT NOT NULL,
+                completed_at TEXT NOT NULL,
+                PRIMARY KEY (corpus_hash, signature, phase, batch_id, n_topics, alpha, beta)
+            );
+            CREATE TABLE IF NOT EXISTS models (
+                corpus_hash TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                n_topics INTEGER NOT NULL,
+                alpha TEXT NOT NULL,
+                beta TEXT NOT NULL,
+                path TEXT NOT NULL,
+                saved_at TEXT NOT NULL,
+                PRIMARY KEY (corpus_hash, signature, n_topics, alpha, beta)
+            );
+            CREATE TABLE IF NOT EXISTS plans (
+                corpus_hash TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                combinations TEXT NOT NULL,
+                saved_at TEXT NOT NULL,
+                PRIMARY KEY (corpus_hash, signature)
+            );
+        """)
+        self.connection.commit()
+
+    def _run_key(self):
+        return self.corpus_hash, self.signature
+
+    def completed_tasks(self, phase):
+        """Return the set of (batch_id, n_topics, alpha, beta) completed in a phase."""
+        rows = self.connection.execute(
+            "SELECT batch_id, n_topics, alpha, beta FROM tasks WHERE corpus_hash = ? AND signature = ? AND phase = ?",
+            self._run_key() + (phase,)
+        )
+        return {tuple(row) for row in rows}
+
+    def pending_configs(self, phase, batch_id, configs, completed=None):
+        """
+        Filters the configurations still to be run on a batch.
+
+        Args:
+            phase (str): 'train', 'validation' or 'test'.
+            batch_id (int): Position of the batch in its split.
+            configs (list of tuple): (n_topics, alpha, beta) configurations.
+            completed (set or None): Result of `completed_tasks(phase)`, to avoid one query per batch.
+
+        Returns:
+            list of tuple: The configurations without a completed task, in their original order.
+        """
+        completed = self.completed_tasks(phase) if completed is None else completed
+        return [config for config in configs if (batch_id,) + _config_key(config) not in completed]
+
+    def mark_complete(self, phase, batch_id, configs):
+        """Mark the tasks of a batch complete for the given configurations."""
+        completed_at = datetime.now().isoformat(timespec='seconds')
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [self._run_key() + (phase, int(batch_id)) + _config_key(config) + (completed_at,) for config in configs]
+        )
+        self.connection.commit()
+
+    def save_model(self, config, model_bytes):
+        """Write a pickled trained model to the ledger directory and record it for the configuration."""
+        n_topics, alpha, beta = _config_key(config)
+        digest = hashlib.blake2b(f"{n_topics}|{alpha}|{beta}".encode('utf-8'), digest_size=8).hexdigest()
+        path = os.path.join(self.model_dir, f"model-{n_topics}-{digest}.pkl")
+        with open(f"{path}.tmp", 'wb') as model_file:
+            model_file.write(model_bytes)
+        os.replace(f"{path}.tmp", path)
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self._run_key() + (n_topics, alpha, beta, path, datetime.now().isoformat(timespec='seconds'))
+        )
+        self.connection.commit()
+        return path
+
+    def load_models(self):
+        """Return {(n_topics, alpha, beta): pickled model bytes} for the models saved by earlier runs."""
+        models = {}
+        rows = self.connection.execute(
+            "SELECT n_topics, alpha, beta, path FROM models WHERE corpus_hash = ? AND signature = ?", self._run_key()
+        )
+        for n_topics, alpha, beta, path in rows:
+            if not os.path.exists(path):
+                logging.warning(f"Ledger model {path} is missing; configuration ({n_topics}, {alpha}, {beta}) will be retrained.")
+                continue
+            with open(path, 'rb') as model_file:
+                models[(n_topics, alpha, beta)] = model_file.read()
+        return models
+
+    def save_plan(self, combinations):
+        """Store the (n_topics, alpha, beta, phase) combinations of the run."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?)",
+            self._run_key() + (json.dumps([list(combination) for combination in combinations]),
+                               datetime.now().isoformat(timespec='seconds'))
+        )
+        self.connection.commit()
+
+    def load_plan(self):
+        """Return the stored combinations of the run as tuples, or None."""
+        row = self.connection.execute(
+            "SELECT combinations FROM plans WHERE corpus_hash = ? AND signature = ?", self._run_key()
+        ).fetchone()
+        return None if row is None else [tuple(combination) for combination in json.loads(row[0])]
+
+    def summary(self):
+        """Return the number of completed tasks per phase and of saved models."""
+        rows = self.connection.execute(
+            "SELECT phase, COUNT(*) FROM tasks WHERE corpus_hash = ? AND signature = ? GROUP BY phase", self._run_key()
+        )
+        summary = {phase: count for phase, count in rows}
+        summary['models'] = self.connection.execute(
+            "SELECT COUNT(*) FROM models WHERE corpus_hash = ? AND signature = ?", self._run_key()
+        ).fetchone()[0]
+        return summary
+
+    def close(self):
+        self.connection.close()
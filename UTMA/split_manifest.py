@@ -0,0 +1,209 @@
+# split_manifest.py - Persisted Train/Validation/Test Split for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script persists the train/validation/test split of the Unified Topic Modeling and Analysis (UTMA) as
+# per-batch shards on local disk, together with a manifest keyed by the corpus content hash and the seed.
+# The first run writes every batch as it is generated and lets the workers load it from disk; later runs on
+# the same corpus and seed skip reading, splitting and scattering entirely and have the workers load their
+# shards directly, so the driver is no longer a network and serialization bottleneck and restarts are
+# nearly instant. The shard directory must be readable by all workers (local disk for a LocalCluster,
+# a shared filesystem otherwise). Hashing reads the whole corpus, so the digest is cached next to the manifests
+# together with the size and modification time of every file, and only recomputed when those change.
+#
+# Functions:
+# - source_signature: Paths, sizes and modification times of a data source's files.
+# - corpus_fingerprint: Content hash of a JSON/JSONL file or directory of shards, optionally cached by signature.
+# - load_split_manifest: Returns a complete manifest matching the corpus, seed and split parameters, if any.
+# - SplitShardWriter: Writes batches as shards and records them in a new manifest.
+# - load_split_shard / submit_split_shards: Load shards on the workers.
+#
+# Dependencies:
+# - Python libraries: os, json, pickle, hashlib, logging
+# - Dask libraries: distributed
+#
+# Developed with AI assistance.
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+
+MANIFEST_FILE = "manifest.json"
+FINGERPRINT_CACHE_FILE = "corpus_fingerprints.json"
+HASH_CHUNK_BYTES = 1024 ** 2
+SPLIT_TYPES = ("train", "validation", "test")
+
+
+def _source_files(data_source):
+    """Return the files of a data source: every file of a directory in sorted order, or the file itself."""
+    if os.path.isdir(data_source):
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(data_source) for name in names)
+    return [data_source]
+
+
+def source_signature(data_source):
+    """
+    Returns a cheap signature of a data source from file metadata only.
+
+    Returns:
+        list: [relative path, size, modification time in ns] of every file, in sorted order.
+    """
+    signature = []
+    for path in _source_files(data_source):
+        stat = os.stat(path)
+        relative_path = os.path.relpath(path, data_source) if path != data_source else ''
+        signature.append([relative_path, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def corpus_fingerprint(data_source, cache_file=None):
+    """
+    Computes a content hash of a data source.
+
+    Directories are hashed file by file in sorted order, including the relative file names, so
+    renaming or reordering shards changes the fingerprint. Hashing reads the whole corpus; with
+    `cache_file`, the digest is stored with the `source_signature` of the data source and reused
+    without reading the files again while their paths, sizes and modification times are unchanged.
+
+    Args:
+        data_source (str): JSON/JSONL file or directory.
+        cache_file (str or None): JSON file caching digests by data source path.
+
+    Returns:
+        str: Hex BLAKE2b digest.
+    """
+    cache, cache_key, signature = {}, os.path.abspath(data_source), None
+    if cache_file is not None:
+        signature = source_signature(data_source)
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as cachefile:
+                cache = json.load(cachefile)
+        except (OSError, ValueError):
+            cache = {}
+        entry = cache.get(cache_key)
+        if entry is not None and entry.get('signature') == signature:
+            return entry['fingerprint']
+
+    fingerprint = hashlib.blake2b(digest_size=20)
+    for path in _source_files(data_source):
+        fingerprint.update(os.path.relpath(path, data_source).encode() if path != data_source else b'')
+        with open(path, 'rb') as infile:
+            for chunk in iter(lambda: infile.read(HASH_CHUNK_BYTES), b''):
+                fingerprint.update(chunk)
+    digest = fingerprint.hexdigest()
+
+    if cache_file is not None:
+        cache[cache_key] = {'signature': signature, 'fingerprint': digest}
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        with open(f"{cache_file}.tmp", 'w', encoding='utf-8') as cachefile:
+            json.dump(cache, cachefile)
+        os.replace(f"{cache_file}.tmp", cache_file)
+    return digest
+
+
+def split_directory(split_root, corpus_hash, seed):
+    """Return the directory holding the split of a corpus for a seed."""
+    return os.path.join(split_root, f"{corpus_hash[:16]}-seed{seed}")
+
+
+def load_split_manifest(split_root, corpus_hash, seed, params):
+    """
+    Returns the persisted split for the corpus and seed if it is complete and was written with `params`.
+
+    Args:
+        split_root (str): Root directory of persisted splits.
+        corpus_hash (str): `corpus_fingerprint` of the data source.
+        seed (int): Seed of the split.
+        params (dict): Split parameters (ratios, batch size, corpus format) that must match.
+
+    Returns:
+        dict or None: The manifest, or None if the split has to be (re)written.
+    """
+    manifest_path = os.path.join(split_directory(split_root, corpus_hash, seed), MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+        manifest = json.load(manifest_file)
+
+    if manifest.get('corpus_hash') != corpus_hash or manifest.get('seed') != seed or manifest.get('params') != params:
+        logging.info(f"Persisted split at {manifest_path} was written with other parameters; it will be rewritten.")
+        return None
+    missing = [batch['path'] for batch in manifest['batches'] if not os.path.exists(batch['path'])]
+    if missing:
+        logging.warning(f"Persisted split at {manifest_path} is missing {len(missing)} shards; it will be rewritten.")
+        return None
+    return manifest
+
+
+class SplitShardWriter:
+    """
+    Writes the batches of a split to disk and records them in a manifest.
+
+    The manifest is written by `finalize` after the last shard, so an interrupted run never leaves
+    a manifest that refers to missing shards.
+    """
+
+    def __init__(self, split_root, corpus_hash, seed, params):
+        self.directory = split_directory(split_root, corpus_hash, seed)
+        os.makedirs(self.directory, exist_ok=True)
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        self.manifest = {'corpus_hash': corpus_hash, 'seed': seed, 'params': params, 'batches': []}
+        self.counts = dict.fromkeys(SPLIT_TYPES, 0)
+
+    def write(self, batch_info):
+        """Write one batch yielded by the dataset generators and return its shard path."""
+        split_type = batch_info['type']
+        path = os.path.join(self.directory, f"{split_type}-{self.counts[split_type]:05d}.pkl")
+        with open(path, 'wb') as shard_file:
+            pickle.dump(batch_info['data'], shard_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.counts[split_type] += 1
+        self.manifest['batches'].append({
+            'type': split_type,
+            'path': path,
+            'num_documents': len(batch_info['data']),
+        })
+        return path
+
+    def write_and_submit(self, client, batch_info):
+        """Write one batch and have a worker load it, in place of `client.scatter`; returns the future."""
+        return client.submit(load_split_shard, self.write(batch_info))
+
+    def finalize(self):
+        """Write the manifest, making the split available to later runs."""
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=2)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+        logging.info(f"Persisted split to {self.directory}: {self.counts}")
+        return self.manifest
+
+
+def load_split_shard(path):
+    """Worker task: load one persisted batch."""
+    with open(path, 'rb') as shard_file:
+        return pickle.load(shard_file)
+
+
+def submit_split_shards(client, manifest):
+    """
+    Has the workers load every shard of a persisted split.
+
+    Args:
+        client (Client): Dask client.
+        manifest (dict): Manifest from `load_split_manifest`.
+
+    Returns:
+        dict: Maps 'train', 'validation' and 'test' to lists of futures, in the original batch order.
+    """
+    futures = {split_type: [] for split_type in SPLIT_TYPES}
+    for batch in manifest['batches']:
+        futures[batch['type']].append(client.submit(load_split_shard, batch['path']))
+    return futures
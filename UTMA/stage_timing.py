@@ -0,0 +1,76 @@
+# stage_timing.py - Per-Stage Timing and Memory Instrumentation for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script measures where a Unified Topic Modeling and Analysis (UTMA) task spends its time, without
+# running a profiler. A StageTimer wraps each stage of a task (materializing the batch with `dask.compute`,
+# building the Dictionary and BoW corpus, training, coherence statistics and scoring, inference, serialization,
+# ...) in a context manager that reads the monotonic `time.perf_counter` clock. A stage entered several times
+# (for example serialization) accumulates its seconds and counts its calls. With memory tracing on,
+# `tracemalloc` is started once per process and its peak is reset at the start of every stage, so each stage
+# also reports the peak of traced Python allocations above its starting level. tracemalloc is process-wide:
+# with several threads per worker, concurrent tasks add to each other's peaks, and tracing slows allocation,
+# so it is meant for diagnostic runs.
+#
+# Functions:
+# - StageTimer: Accumulates wall time and optional tracemalloc peaks per named stage.
+#
+# Dependencies:
+# - Python libraries: time, tracemalloc, contextlib
+#
+# Developed with AI assistance.
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Per-stage wall time and, with `trace_memory`, tracemalloc peaks of one task.
+
+    Stages are recorded in the order they are first entered; nested stages are not supported.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as stage `name`, adding to earlier calls of the same stage."""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            record['seconds'] += time.perf_counter() - start
+            record['calls'] += 1
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] - start_memory
+                record['peak_bytes'] = max(record.get('peak_bytes', 0), peak)
+
+    def merge(self, other, prefix=''):
+        """Add the stages of another timer, optionally under a name prefix, and return self."""
+        for name, record in other.stages.items():
+            target = self.stages.setdefault(prefix + name, {'seconds': 0.0, 'calls': 0})
+            target['seconds'] += record['seconds']
+            target['calls'] += record['calls']
+            if 'peak_bytes' in record:
+                target['peak_bytes'] = max(target.get('peak_bytes', 0), record['peak_bytes'])
+        return self
+
+    def as_dict(self):
+        """Return the stages with their seconds rounded to microseconds and the total, ready for JSON."""
+        stages = {name: dict(record, seconds=round(record['seconds'], 6)) for name, record in self.stages.items()}
+        return {
+            'stages': stages,
+            'total_seconds': round(sum(record['seconds'] for record in self.stages.values()), 6),
+            'trace_memory': self.trace_memory,
+        }
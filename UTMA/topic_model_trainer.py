@@ -11,6 +11,14 @@
 # Functions:
 # - Trains and evaluates LDA models for topic modeling based on dynamic, adaptive resource allocation
 # - Tracks batch-specific metadata, including dynamic core count, model parameters, and evaluation scores
+# - Selects between single-process LdaModel and multi-process LdaMulticore training from the idle threads of the Dask workers
+# - Fuses several hyperparameter configurations into one task that shares the prepared corpus and coherence statistics
+# - Scores c_v coherence from co-occurrence statistics computed once per batch and cached on the worker,
+#   with gensim's CoherenceModel as a fallback backend
+# - Optionally stops training early once the held-out bound stops improving between passes
+# - Optionally stores trained models in a compact float32 numpy format instead of a pickle
+# - Derives the bound, perplexity and document-topic matrix from one inference pass per corpus
+# - Records the wall time, and optionally the tracemalloc peak, of every stage of a task in its result
 # - Manages parallelized workflows and efficient data processing using Dask's Client and LocalCluster
 #
 # Dependencies:
@@ -27,10 +35,10 @@ from dask.distributed import wait  # Manages asynchronous execution in distribut
 import logging  # Provides error logging and information tracking throughout the script's execution.
 
 from gensim.models import LdaModel  # Implements Latent Dirichlet Allocation (LDA) for topic modeling.
-from gensim.corpora import Dictionary  # Converts tokenized text data into a bag-of-words format for LDA.
-from gensim.models import CoherenceModel  # Evaluates topic model coherence to measure topic interpretability.
+from gensim.models import LdaMulticore  # Multi-process LDA training used when a task may use several cores.
 
 import pickle  # Serializes models and data structures to store results or share between processes.
+import multiprocessing  # Detects daemonic worker processes, which cannot start LdaMulticore workers.
 import math  # Supports mathematical calculations, such as computing fractional core usage for parallel processing.
 import hashlib  # Generates unique hashes for document metadata, ensuring data consistency.
 import numpy as np  # Enables numerical operations, potentially for data manipulation or vector operations.
@@ -41,18 +49,95 @@ from datetime import datetime
 
 from .alpha_eta import calculate_numeric_alpha, calculate_numeric_beta  # Functions that calculate alpha and beta values for LDA.
 from .utils import convert_float32_to_float  # Utility function for data type conversion, ensuring compatibility within the script.
-
-    
-# https://examples.dask.org/applications/embarrassingly-parallel.html
-def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[str, float], train_data: list, data: list, phase: str,
-                   random_state: int, passes: int, iterations: int, update_every: int, eval_every: int, cores: int,
-                   per_word_topics: bool, ldamodel=None, **kwargs):
-
-    time_of_method_call = pd.to_datetime('now')  # Record the current timestamp for logging and metadata.
-
-    coherence_score_list = []  # Initialize a list to store coherence scores for evaluation.
-
-    # Initialize a dictionary to hold the corpus data for each phase
+from .bow_cache import batch_content_hash, cached_dictionary, cached_doc2bow  # Worker-side cache of Dictionaries and BoW corpora shared across grid tasks.
+from .encoded_corpus import encoded_batch, materialize_documents  # Resolves scattered token lists or integer-encoded batches into documents.
+from .doc_topic_inference import infer_document_topics, document_topic_lists, evaluate_corpus  # Batched document-topic inference and held-out evaluation.
+from .model_serialization import serialize_lda_model  # Pickled or compact numpy serialization of trained models.
+from .coherence_engine import COHERENCE_TOPN, top_topic_ids, cached_coherence_engine, score_model_topics, score_model_topics_gensim  # Co-occurrence statistics computed once per batch.
+from .stage_timing import StageTimer  # Per-stage wall time and optional tracemalloc peaks of a task.
+
+# Training backends accepted by `train_model_v2` and `select_lda_backend`
+LDA_BACKENDS = ('single', 'multicore', 'auto')
+
+# Settings of convergence-based early stopping (see `fit_lda_model_early_stopping`)
+EARLY_STOPPING_DEFAULTS = {'tolerance': 0.001, 'patience': 2, 'holdout_fraction': 0.1}
+
+
+def select_lda_backend(backend, queued_tasks, worker_threads):
+    """
+    Chooses the LDA training backend and its process count for a round of training tasks.
+
+    The core budget of a Dask worker is its `nthreads`, and up to that many tasks run on it at once,
+    so each task gets its worker's threads divided by the number of tasks running there concurrently.
+    In 'multicore' mode that is the worker's thread count. With 'auto', the queued tasks are spread
+    over the workers, and tasks switch to `LdaMulticore` only when that leaves threads idle; they stay
+    on single-process `LdaModel` otherwise.
+
+    Args:
+        backend (str): One of `LDA_BACKENDS`.
+        queued_tasks (int): Number of training tasks submitted together.
+        worker_threads (list of int): `nthreads` of every Dask worker, from `client.scheduler_info()`.
+
+    Returns:
+        tuple: (backend, lda_workers) where backend is 'single' or 'multicore' and lda_workers is
+        the `workers` argument for `LdaMulticore` (None for 'single').
+    """
+    if backend == 'single':
+        return 'single', None
+
+    # The smallest worker bounds the share of every task
+    worker_cores = max(1, min(worker_threads, default=1))
+    if backend == 'multicore':
+        # Each of the worker's concurrent tasks gets 1/nthreads of the processes beside its master
+        return 'multicore', max(1, (worker_cores - 1) // worker_cores)
+
+    concurrent_tasks = max(1, min(worker_cores, math.ceil(queued_tasks / max(1, len(worker_threads)))))
+    cores_per_task = worker_cores // concurrent_tasks
+    if cores_per_task >= 2:
+        return 'multicore', cores_per_task - 1
+    return 'single', None
+
+
+def create_lda_model(backend, lda_workers, update_every, **model_params):
+    """
+    Trains an LDA model with the selected backend.
+
+    `LdaMulticore` always trains online and has no `update_every`; its master process dispatches
+    chunks to `lda_workers` worker processes. Inside a daemonic process, which cannot have children,
+    the single-process backend is used instead.
+
+    Returns:
+        LdaModel: The trained model (`LdaMulticore` is a subclass).
+    """
+    if backend == 'multicore' and multiprocessing.current_process().daemon:
+        logging.warning("LdaMulticore cannot start worker processes from a daemonic process; using LdaModel. "
+                        "Set distributed.worker.daemon to False to enable the multicore backend.")
+        backend = 'single'
+
+    if backend == 'multicore':
+        return LdaMulticore(workers=lda_workers, **model_params)
+    return LdaModel(update_every=update_every, **model_params)
+
+
+
+def prepare_task_corpus(train_data, data, phase, vocabulary=None, prepared_dictionary=None, stage_timer=None):
+    """
+    Materializes the batch data of a task and converts it to bag-of-words once.
+
+    Args:
+        train_data: Training batch data as passed to `train_model_v2`.
+        data: Batch data of `phase` as passed to `train_model_v2`.
+        phase (str): 'train', 'validation' or 'test'.
+        vocabulary (list of str): Vocabulary of the encoded corpus, for encoded batches.
+        prepared_dictionary (PreparedDictionary or None): Shared training Dictionary, if any.
+        stage_timer (StageTimer or None): Records the 'materialize', 'hashing' and 'dictionary' stages.
+
+    Returns:
+        dict: The documents, Dictionary, content hash and BoW corpus of `phase`, the batch text with its
+        MD5 and SHA-256, and the chunksize. The training documents are None when they were not decoded
+        (encoded validation and test batches with a shared Dictionary).
+    """
+    stage_timer = stage_timer or StageTimer()
     corpus_data = {
         "train": [],
         "validation": [],
@@ -61,38 +146,194 @@ def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[
 
     try:
         # Compute the Dask collections in `data`, resolving all delayed computations at once.
-        train_batch_documents = dask.compute(*train_data)
-        batch_documents = dask.compute(*data)
+        # Integer-encoded batches (see encoded_corpus.py) are converted to BoW from their token ids and decoded
+        # against the shared vocabulary only where text is needed: coherence, the stored batch text and a
+        # per-batch Dictionary. Validation and test tasks with a shared Dictionary never decode the training batch.
+        with stage_timer.stage('materialize'):
+            train_batch = encoded_batch(train_data) if vocabulary is not None else None
+            phase_batch = encoded_batch(data) if vocabulary is not None else None
+            train_batch_documents = None
+            if phase == "train" or prepared_dictionary is None or train_batch is None:
+                train_batch_documents = materialize_documents(train_data, vocabulary)
+            batch_documents = materialize_documents(data, vocabulary)
         # Set a chunksize for model processing, dividing documents into smaller groups for efficient processing.
-        chunksize = max(1, int(len(train_batch_documents) // 5))
+        train_batch_size = len(train_batch_documents) if train_batch_documents is not None else len(train_batch)
+        chunksize = max(1, int(train_batch_size // 5))
     except Exception as e:
         logging.error(f"Error computing streaming_documents data: {e}")  # Log any errors during Dask computation.
         raise  # Re-raise the exception to stop execution if data computation fails.
 
-    # Create a Gensim dictionary from the batch documents, mapping words to unique IDs for the corpus.
-    try:
-        train_dictionary_batch = Dictionary(list(train_batch_documents))
-    except TypeError:
-        print("Error: The data structure is not correct to create the Dictionary object.")  # Print an error if data format is incompatible.
-
+    # The documents of the phase are hashed once per task: the content hash keys the cached BoW corpus and coherence
+    # engine (encoded batches hash their arrays instead of the decoded text), and the MD5 and SHA-256 of the batch
+    # text are stored with every result of the task, fused configurations included.
+    with stage_timer.stage('hashing'):
+        phase_documents = train_batch_documents if phase == "train" else batch_documents
+        phase_encoded = train_batch if phase == "train" else phase_batch
+        content_hash = phase_encoded.content_hash() if phase_encoded is not None else batch_content_hash(phase_documents)
+        # Flatten the list of documents, converting each sublist of tokens into a single list for metadata.
+        flattened_batch = [item for sublist in phase_documents for item in sublist]
+        batch_text = ' '.join(flattened_batch)
+        text_sha256 = hashlib.sha256(batch_text.encode()).hexdigest()
+        text_md5 = hashlib.md5(batch_text.encode()).hexdigest()
+
+    # Reuse the training Dictionary prepared once per corpus (see corpus_preparation.py) when one is shared;
+    # otherwise create a Gensim dictionary from the batch documents, mapping words to unique IDs for the corpus.
+    # Per-batch dictionaries and BoW conversions are cached on the worker (see bow_cache.py), so tasks for other
+    # hyperparameters on the same batch reuse them.
+    with stage_timer.stage('dictionary'):
+        if prepared_dictionary is not None:
+            train_dictionary_batch = prepared_dictionary.dictionary
+            dictionary_key = prepared_dictionary.dictionary_hash
+        else:
+            try:
+                # In the train phase the Dictionary is built from the documents that were just hashed
+                dictionary_key = content_hash if phase == "train" else (
+                    train_batch.content_hash() if train_batch is not None else batch_content_hash(train_batch_documents))
+                train_dictionary_batch = cached_dictionary(train_batch_documents, dictionary_key)
+            except TypeError as e:
+                logging.error(f"The data structure is not correct to create the Dictionary object: {e}")
+                raise  # Without a Dictionary the batch cannot be converted to BoW.
+
+        # Convert tokens (or token ids) to BoW format using the training dictionary for the phase corpus
+        corpus_data[phase] = cached_doc2bow(phase_encoded if phase_encoded is not None else phase_documents,
+                                            train_dictionary_batch, dictionary_key, content_hash, vocabulary)
+
+    return {
+        'train_documents': train_batch_documents,
+        'documents': batch_documents,
+        'dictionary': train_dictionary_batch,
+        'dictionary_key': dictionary_key,
+        'content_hash': content_hash,
+        'corpus': corpus_data[phase],
+        'batch_text': batch_text,
+        'text_sha256': text_sha256,
+        'text_md5': text_md5,
+        'chunksize': chunksize,
+    }
 
-    # Corrected code inside train_model_v2
-    number_of_documents = 0  # Counter for tracking the number of documents processed.
 
-    if phase == "train":
-        # Flatten the list of documents, converting each sublist of tokens into a single list for metadata.
-        flattened_batch = [item for sublist in train_batch_documents for item in sublist]
-        for doc_tokens in train_batch_documents:
-            bow_out = train_dictionary_batch.doc2bow(doc_tokens)  # Convert tokens to BoW format using training dictionary
-            corpus_data['train'].append(bow_out)  # Add the bag-of-words representation to the training corpus batch
-            number_of_documents += 1  # Increment the document counter
+def fit_lda_model(prepared_corpus, n_topics, alpha_str, beta_str, random_state, passes, iterations, update_every,
+                  eval_every, backend='single', lda_workers=None, per_word_topics=True):
+    """Trains one float32 LDA model on the training BoW corpus of `prepared_corpus`."""
+    n_alpha = calculate_numeric_alpha(alpha_str, n_topics)
+    n_beta = calculate_numeric_beta(beta_str, n_topics)
+    # `backend` and `lda_workers` come from `select_lda_backend` on the driver
+    return create_lda_model(
+        backend, lda_workers, update_every,
+        corpus=prepared_corpus['corpus'],
+        id2word=prepared_corpus['dictionary'],
+        num_topics=n_topics,
+        alpha=float(n_alpha),
+        eta=float(n_beta),
+        random_state=random_state,
+        passes=passes,
+        iterations=iterations,
+        eval_every=eval_every,
+        chunksize=prepared_corpus['chunksize'],
+        per_word_topics=per_word_topics,
+        dtype=np.float32
+    )
+
+
+def fit_lda_model_early_stopping(prepared_corpus, n_topics, alpha_str, beta_str, random_state, passes, iterations,
+                                 update_every, eval_every, backend='single', lda_workers=None, tolerance=0.001,
+                                 patience=2, holdout_fraction=0.1, per_word_topics=True):
+    """
+    Trains one LDA model pass by pass and stops once the held-out bound stops improving.
+
+    A `holdout_fraction` of the training BoW corpus is held out, drawn with a permutation seeded by
+    `random_state`; batches are cut from the corpus in order, so their tail is not a random sample.
+    After every pass the per-word bound of the held-out documents is recorded; training stops when its
+    relative improvement stays below `tolerance` for `patience` consecutive passes, or after `passes`
+    passes. The model is kept and finished with one `update` on the held-out documents, so no training
+    data is lost to the holdout at the cost of a fraction of a pass. Batches too small to hold out any
+    documents track the training bound instead.
+
+    Returns:
+        tuple: (model, trace) where trace holds `passes_used` and `convergence_curve`, the held-out
+        per-word bound of the returned model after each of its passes, before the final update on the
+        held-out documents.
+    """
+    corpus = prepared_corpus['corpus']
+    holdout_size = int(len(corpus) * holdout_fraction)
+    if 1 <= holdout_size < len(corpus):
+        holdout = np.zeros(len(corpus), dtype=bool)
+        holdout[np.random.RandomState(random_state).permutation(len(corpus))[:holdout_size]] = True
+        fit_corpus = [document for document, held_out in zip(corpus, holdout) if not held_out]
+        holdout_corpus = [document for document, held_out in zip(corpus, holdout) if held_out]
     else:
-        # Flatten the list of documents, converting each sublist of tokens into a single list for metadata.
-        flattened_batch = [item for sublist in batch_documents for item in sublist]
-        for doc_tokens in batch_documents:
-            bow_out = train_dictionary_batch.doc2bow(doc_tokens)  # Convert tokens to BoW format using training dictionary
-            corpus_data[phase].append(bow_out)  # Append the bag-of-words representation to the appropriate phase corpus
-            number_of_documents += 1  # Increment the document counter
+        fit_corpus, holdout_corpus = corpus, corpus
+
+    ldamodel = fit_lda_model(dict(prepared_corpus, corpus=fit_corpus), n_topics, alpha_str, beta_str, random_state,
+                             1, iterations, update_every, eval_every, backend, lda_workers, per_word_topics)
+    curve = []
+    stale_passes = 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curve.append(float(ldamodel.log_perplexity(holdout_corpus)))
+        while len(curve) < passes:
+            # `update` continues the online learning-rate schedule of the previous passes
+            ldamodel.update(fit_corpus)
+            curve.append(float(ldamodel.log_perplexity(holdout_corpus)))
+            previous, current = curve[-2], curve[-1]
+            if math.isfinite(previous) and math.isfinite(current) and previous != 0:
+                improvement = (current - previous) / abs(previous)
+            else:
+                improvement = 0.0
+            stale_passes = stale_passes + 1 if improvement < tolerance else 0
+            if stale_passes >= patience:
+                break
+
+    if fit_corpus is not corpus:
+        ldamodel.update(holdout_corpus)
+
+    logging.info(f"Early stopping used {len(curve)} of {passes} passes for {n_topics} topics, alpha {alpha_str}, beta {beta_str}.")
+    return ldamodel, {'passes_used': len(curve), 'convergence_curve': curve}
+
+
+def train_lda_model(prepared_corpus, n_topics, alpha_str, beta_str, random_state, passes, iterations, update_every,
+                    eval_every, backend='single', lda_workers=None, early_stopping=None, per_word_topics=True):
+    """
+    Trains one LDA model for all `passes`, or with early stopping when `early_stopping` holds its settings
+    (keys of `EARLY_STOPPING_DEFAULTS`). Returns (model, trace) as `fit_lda_model_early_stopping` does.
+    """
+    if early_stopping:
+        settings = dict(EARLY_STOPPING_DEFAULTS, **early_stopping)
+        return fit_lda_model_early_stopping(prepared_corpus, n_topics, alpha_str, beta_str, random_state, passes,
+                                            iterations, update_every, eval_every, backend, lda_workers,
+                                            per_word_topics=per_word_topics, **settings)
+    ldamodel = fit_lda_model(prepared_corpus, n_topics, alpha_str, beta_str, random_state, passes, iterations,
+                             update_every, eval_every, backend, lda_workers, per_word_topics)
+    return ldamodel, {'passes_used': passes, 'convergence_curve': []}
+
+
+# https://examples.dask.org/applications/embarrassingly-parallel.html
+def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[str, float], train_data: list, data: list, phase: str,
+                   random_state: int, passes: int, iterations: int, update_every: int, eval_every: int, cores: int,
+                   per_word_topics: bool, ldamodel=None, vocabulary=None, prepared_dictionary=None,
+                   backend='single', lda_workers=None, prepared_corpus=None, coherence_engine=None,
+                   early_stopping=None, training_trace=None, compact_model=False, trace_memory=False,
+                   stage_timer=None, coherence_backend='engine', **kwargs):
+
+    time_of_method_call = pd.to_datetime('now')  # Record the current timestamp for logging and metadata.
+
+    # Wall time (and, with trace_memory, tracemalloc peak) of every stage, returned as 'stage_timings';
+    # fused tasks pass a timer that already holds the training of this configuration
+    stage_timer = stage_timer or StageTimer(trace_memory)
+
+    coherence_score_list = []  # Initialize a list to store coherence scores for evaluation.
+
+    # Materialize the batch, resolve the Dictionary and convert to BoW once per task; fused tasks
+    # (see train_models_fused) pass the corpus they already prepared for all of their configurations.
+    if prepared_corpus is None:
+        prepared_corpus = prepare_task_corpus(train_data, data, phase, vocabulary, prepared_dictionary, stage_timer)
+    train_batch_documents = prepared_corpus['train_documents']
+    batch_documents = prepared_corpus['documents']
+    train_dictionary_batch = prepared_corpus['dictionary']
+    chunksize = prepared_corpus['chunksize']
+    corpus_data = {"train": [], "validation": [], "test": []}
+    corpus_data[phase] = prepared_corpus['corpus']
+
+    number_of_documents = len(corpus_data[phase])  # Number of documents added to the phase corpus.
 
     logging.info(f"There was a total of {number_of_documents} documents added to the corpus_data.")  # Log document count.
 
@@ -106,30 +347,27 @@ def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[
 
     if phase in ['validation', 'test']:
         # For validation and test phases, no model is created
-        ldamodel_bytes = pickle.dumps(ldamodel)  # Re-serialize the trained model for later use and storage.
+        with stage_timer.stage('serialization'):
+            ldamodel_bytes = serialize_lda_model(ldamodel, compact_model)  # Re-serialize the trained model for later use and storage.
         ldamodel = ldamodel  # Model from TRAIN data
         coherence_score = DEFAULT_SCORE
         convergence_score = DEFAULT_SCORE
         perplexity_score = DEFAULT_SCORE
 
+    # A model already trained by `train_models_fused` is scored without retraining
+    elif ldamodel is not None:
+        with stage_timer.stage('serialization'):
+            ldamodel_bytes = serialize_lda_model(ldamodel, compact_model)
+
     # Only create and train the LdaModel if phase is "train"
     elif phase == "train":
         try:
-            ldamodel = LdaModel(
-                corpus=corpus_data["train"],
-                id2word=train_dictionary_batch,
-                num_topics=n_topics,
-                alpha=float(n_alpha),
-                eta=float(n_beta),
-                random_state=random_state,
-                passes=passes,
-                iterations=iterations,
-                update_every=update_every,
-                eval_every=eval_every,
-                chunksize=chunksize,
-                per_word_topics=True
-            )
-            ldamodel_bytes = pickle.dumps(ldamodel)
+            with stage_timer.stage('training'):
+                ldamodel, training_trace = train_lda_model(prepared_corpus, n_topics, alpha_str, beta_str, random_state,
+                                                           passes, iterations, update_every, eval_every, backend,
+                                                           lda_workers, early_stopping, per_word_topics)
+            with stage_timer.stage('serialization'):
+                ldamodel_bytes = serialize_lda_model(ldamodel, compact_model)
         except Exception as e:
             logging.error(f"An error occurred during LDA model training: {e}")
             raise  # Stop execution if model creation fails.
@@ -138,29 +376,42 @@ def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[
     # Calculate scores
     with np.errstate(divide='ignore', invalid='ignore'):
         try:
-            if phase == "train":
-                coherence_model_lda = CoherenceModel(  model=ldamodel, processes=math.floor(cores * (1/3)), 
-                                                    dictionary=train_dictionary_batch, texts=train_batch_documents, coherence='c_v' )
+            coherence_texts = train_batch_documents if phase == "train" else batch_documents
+            if coherence_backend == 'gensim':
+                # Fallback: a CoherenceModel rescans the texts for this model
+                with stage_timer.stage('coherence'):
+                    topic_scores = score_model_topics_gensim(ldamodel, coherence_texts, train_dictionary_batch, 'c_v', COHERENCE_TOPN)
             else:
-                coherence_model_lda = CoherenceModel(  model=ldamodel, processes=math.floor(cores * (1/3)), 
-                                                    dictionary=train_dictionary_batch, texts=batch_documents, coherence='c_v' )
-            coherence_score = coherence_model_lda.get_coherence()
+                # Co-occurrence statistics of the texts are computed once per batch (see coherence_engine.py);
+                # fused tasks pass the engine they already filled with the top words of every model
+                if coherence_engine is None:
+                    with stage_timer.stage('coherence_statistics'):
+                        coherence_engine = cached_coherence_engine(coherence_texts, train_dictionary_batch,
+                                                                   prepared_corpus['dictionary_key'],
+                                                                   prepared_corpus['content_hash'])
+                # One scoring pass yields the model coherence, the per-topic coherence and the coherence-sorted top words
+                with stage_timer.stage('coherence'):
+                    topic_scores = score_model_topics(ldamodel, coherence_engine, 'c_v', COHERENCE_TOPN)
+            coherence_score = topic_scores['coherence']
             coherence_score_list.append(coherence_score)
         except Exception as e:
             logging.error(f"Issue calculating coherence score: {e}. Value '{DEFAULT_SCORE}' assigned.")
+            topic_scores = None
             coherence_score = DEFAULT_SCORE
             coherence_score_list.append(coherence_score)
+    # One inference pass per chunk yields the bound, the per-word bound and, for validation and test,
+    # the document-topic matrix of the results (see doc_topic_inference.py)
+    doc_topic_matrix = None
     with np.errstate(divide='ignore', invalid='ignore'):
         try:
-            convergence_score = ldamodel.bound(corpus_data[phase])
+            with stage_timer.stage('inference'):
+                convergence_score, perplexity_score, doc_topic_matrix = evaluate_corpus(
+                    ldamodel, corpus_data[phase],
+                    minimum_probability=0.01 if phase in ['validation', 'test'] else 0.0
+                )
         except Exception as e:
-            logging.error(f"Issue calculating convergence score: {e}. Value '{DEFAULT_SCORE}' assigned.")
+            logging.error(f"Issue calculating convergence and perplexity scores: {e}. Value '{DEFAULT_SCORE}' assigned.")
             convergence_score = DEFAULT_SCORE
-    with np.errstate(divide='ignore', invalid='ignore'):
-        try:
-            perplexity_score = ldamodel.log_perplexity(corpus_data[phase])
-        except RuntimeWarning as e:
-            logging.info(f"Issue calculating perplexity score: {e}. Value '{DEFAULT_SCORE}' assigned.")
             perplexity_score = DEFAULT_SCORE
 
 
@@ -169,7 +420,8 @@ def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[
     
     # Retrieve the top words for each topic with their probabilities. This provides the most relevant words defining each topic.
     try:
-        show_topics_results = ldamodel.show_topics(num_topics=-1, num_words=num_words, formatted=False)
+        with stage_timer.stage('show_topics'):
+            show_topics_results = ldamodel.show_topics(num_topics=-1, num_words=num_words, formatted=False)
         topics_to_store = [
             {
                 "method": "show_topics",
@@ -206,10 +458,13 @@ def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[
         # Get the topic distribution for each document in the validation or test corpus
         try:
             if phase in ['validation', 'test']:
-                validation_results_to_store = [
-                    ldamodel.get_document_topics(bow_doc, minimum_probability=0.01)
-                    for bow_doc in corpus_data[phase]
-                ]
+                # The matrix of the scoring pass; inferred again only if that pass failed
+                if doc_topic_matrix is None:
+                    with stage_timer.stage('inference'):
+                        doc_topic_matrix = infer_document_topics(ldamodel, corpus_data[phase], minimum_probability=0.01,
+                                                                 return_sparse=True)
+                with stage_timer.stage('validation_results'):
+                    validation_results_to_store = document_topic_lists(doc_topic_matrix)
             else: 
                 validation_results_to_store = ['N/A']
         except Exception as e:
@@ -226,35 +481,33 @@ def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[
             logging.error(f"JSON serialization failed due to non-compatible types: {e}")
             validation_results_jsonb = json.dumps({"error": "Validation data generation failed", "phase": phase})
 
-    with np.errstate(divide='ignore', invalid='ignore'):
-        try:
-            if phase == "train":
-            # Retrieve the top topics based on coherence scores, which assess how interpretable or meaningful each topic is.
-                topics = ldamodel.top_topics(texts=train_batch_documents, processes=math.floor(cores * (1/3)))
-            else:
-                topics = ldamodel.top_topics(texts=batch_documents, processes=math.floor(cores * (1/3)))
-
-            # Extract only the words from each topic, removing the associated scores to provide a simplified view of topic terms.
-            topic_words = []
-            for topic in topics:
-                topic_representation = topic[0]  # Access the list of top words with their coherence-based ordering.
-                words = [word for _, word in topic_representation]  # Isolate just the words for easy reference.
-                topic_words.append(words)  # Store the list of words for each topic.
-        except Exception as e:
-            logging.error(f"An error occurred while extracting topic words: {e}")
-            # If topics extraction fails, provide a single "N/A" list as a fallback
-            topic_words = [["N/A"]]  # Fallback with one list containing "N/A" to indicate failure
-
-        # Ensure all numerical values are in a JSON-compatible format for downstream compatibility.
-        topics_to_store = convert_float32_to_float(topic_words)
-        topic_words_jsonb = json.dumps(topic_words)  # Serializes to JSON format
+    # The top words of each topic, most coherent topic first, come from the same scoring pass as the coherence
+    if topic_scores is not None:
+        topic_words = topic_scores['top_words']
+        # Topics whose words never occur in the texts score NaN, which JSONB cannot hold
+        topic_coherence = [score if math.isfinite(score) else None for score in topic_scores['topic_coherence']]
+    else:
+        # If scoring failed, provide a single "N/A" list as a fallback
+        topic_words = [["N/A"]]  # Fallback with one list containing "N/A" to indicate failure
+        topic_coherence = []
+    topic_words_jsonb = json.dumps(topic_words)  # Serializes to JSON format
+    topic_coherence_jsonb = json.dumps(topic_coherence)
+
+    # Pickle the batch text, corpus and Dictionary stored with the result; the text was hashed by `prepare_task_corpus`
+    with stage_timer.stage('serialization'):
+        text_bytes = pickle.dumps([prepared_corpus['batch_text']])
+        text_json_bytes = pickle.dumps(batch_documents)
+        corpus_bytes = pickle.dumps(corpus_data[phase])
+        dictionary_bytes = prepared_dictionary.dictionary_bytes if prepared_dictionary is not None else pickle.dumps(train_dictionary_batch)
+    text_sha256 = prepared_corpus['text_sha256']
+    text_md5 = prepared_corpus['text_md5']
 
     # Generate unique time-based key with document text hash
     time_of_method_call = datetime.now()
     time_hash = time_of_method_call.strftime('%Y%m%d%H%M%S%f')
     random_suffix = f"{random.randint(100, 999)}"
     unique_time_key = hashlib.md5((time_hash + random_suffix).encode()).hexdigest()
-    text_hash = hashlib.md5(' '.join(flattened_batch).encode()).hexdigest()
+    text_hash = text_md5
 
     # Concatenate document hash and unique time hash to form the final key
     string_time = (text_hash + unique_time_key).strip()  # `strip()` is optional here
@@ -272,13 +525,14 @@ def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[
     # Document and Batch Details
     'batch_size': len(batch_documents),  # Number of documents processed in this batch.
     'num_documents': float('-inf'),  # Placeholder for the total document count.
-    'text': pickle.dumps([' '.join(flattened_batch)]),  # Concatenated text of the batch for metadata/logging.
-    'text_json': pickle.dumps(batch_documents),  # Serialized batch documents for reference.
+    'text': text_bytes,  # Concatenated text of the batch for metadata/logging.
+    'text_json': text_json_bytes,  # Serialized batch documents for reference.
     'show_topics': show_topics_jsonb, # Serialized top terms per topic for analysis
     'top_words': topic_words_jsonb, # Serialized most coherent words across topics for comparative analysis
+    'topic_coherence': topic_coherence_jsonb, # c_v coherence of every topic, indexed by topic id
     'validation_result': validation_results_jsonb, 
-    'text_sha256': hashlib.sha256(' '.join(flattened_batch).encode()).hexdigest(),  # SHA-256 hash of text for integrity.
-    'text_md5': hashlib.md5(' '.join(flattened_batch).encode()).hexdigest(),  # MD5 hash for quick lookups.
+    'text_sha256': text_sha256,  # SHA-256 hash of text for integrity.
+    'text_md5': text_md5,  # MD5 hash for quick lookups.
     
     # Model and Training Parameters
     'topics': n_topics,  # Number of topics generated in the model.
@@ -293,16 +547,20 @@ def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[
     'chunksize': chunksize,  # Number of documents processed in each chunk.
     'random_state': random_state,  # Random seed for reproducibility.
     'per_word_topics': per_word_topics,  # Boolean flag for per-word topics.
+    'passes_used': training_trace['passes_used'] if training_trace else None,  # Passes actually trained (fewer than `passes` after early stopping).
+    'convergence_curve': json.dumps(training_trace['convergence_curve'] if training_trace else None),  # Held-out per-word bound of this model after every pass (before its final update on the held-out documents), when early stopping is on.
     
     # Evaluation Metrics
     'convergence': convergence_score,  # Convergence score for evaluating model stability.
     'perplexity': perplexity_score,  # Perplexity score to assess model fit.
     'coherence': coherence_score,  # Coherence score to measure topic interpretability.
+    'stage_timings': json.dumps(stage_timer.as_dict()),  # Seconds (and optional tracemalloc peak) per stage of this task.
     
     # Serialized Data
     'lda_model': ldamodel_bytes,  # Serialized LDA model, if trained in this batch.
-    'corpus': pickle.dumps(corpus_data[phase]),  # Serialized corpus used for training.
-    'dictionary': pickle.dumps(train_dictionary_batch),  # Serialized dictionary for topic modeling.
+    'model_size_bytes': len(ldamodel_bytes),  # Size of the serialized model, pickled or compact.
+    'corpus': corpus_bytes,  # Serialized corpus used for training.
+    'dictionary': dictionary_bytes,  # Serialized dictionary, pickled once per corpus when shared.
     
     # Visualization Creation Verification Placeholders
     'create_pylda': None,  # Placeholder for pyLDA verification of visualization creation.
@@ -310,3 +568,65 @@ def train_model_v2(n_topics: int, alpha_str: Union[str, float], beta_str: Union[
     }
 
     return current_increment_data
+
+
+def train_models_fused(configs, train_data, data, phase: str, random_state: int, passes: int, iterations: int,
+                       update_every: int, eval_every: int, cores: int, per_word_topics: bool, ldamodels=None,
+                       vocabulary=None, prepared_dictionary=None, backend='single', lda_workers=None,
+                       early_stopping=None, training_traces=None, trace_memory=False, coherence_backend='engine',
+                       **kwargs):
+    """
+    Trains or evaluates several hyperparameter configurations against one prepared corpus in a single task.
+
+    The batch is materialized, the Dictionary resolved and the BoW corpus built once for all
+    configurations, and c_v coherence reuses one coherence engine whose co-occurrence counts cover the
+    top words of every model, instead of repeating each step per configuration. The stage timings of
+    every result hold the stages shared by the task (corpus preparation, hashing and coherence statistics) under
+    a 'fused_' prefix, measured once for all of its configurations.
+
+    Args:
+        configs (list of tuple): (n_topics, alpha_str, beta_str) per configuration.
+        train_data, data, phase, random_state, passes, iterations, update_every, eval_every, cores,
+        per_word_topics, vocabulary, prepared_dictionary, backend, lda_workers: As for `train_model_v2`.
+        ldamodels (list of LdaModel or None): Trained models aligned with `configs`, required for the
+            validation and test phases; in the train phase, models trained elsewhere (see distributed_em.py)
+            are scored without retraining.
+        training_traces (list of dict or None): Training traces of `ldamodels`, aligned with `configs`.
+        trace_memory (bool): Record tracemalloc peaks in the stage timings.
+        coherence_backend (str): 'engine' shares one coherence engine across the configurations; 'gensim'
+            scores every model with its own CoherenceModel.
+
+    Returns:
+        list of dict: One `train_model_v2` result per configuration, in the order of `configs`.
+    """
+    shared_timer = StageTimer(trace_memory)
+    stage_timers = [StageTimer(trace_memory) for _ in configs]
+    prepared_corpus = prepare_task_corpus(train_data, data, phase, vocabulary, prepared_dictionary, shared_timer)
+
+    training_traces = training_traces or [None] * len(configs)
+    if phase == "train" and ldamodels is None:
+        trained = []
+        for (n_topics, alpha_str, beta_str), stage_timer in zip(configs, stage_timers):
+            with stage_timer.stage('training'):
+                trained.append(train_lda_model(prepared_corpus, n_topics, alpha_str, beta_str, random_state, passes,
+                                               iterations, update_every, eval_every, backend, lda_workers,
+                                               early_stopping, per_word_topics))
+        ldamodels = [ldamodel for ldamodel, _ in trained]
+        training_traces = [trace for _, trace in trained]
+
+    texts = prepared_corpus['train_documents'] if phase == "train" else prepared_corpus['documents']
+    coherence_engine = None
+    if coherence_backend == 'engine':
+        with shared_timer.stage('coherence_statistics'):
+            coherence_engine = cached_coherence_engine(texts, prepared_corpus['dictionary'], prepared_corpus['dictionary_key'],
+                                                   prepared_corpus['content_hash'])
+            coherence_engine.precompute([top_topic_ids(model, COHERENCE_TOPN) for model in ldamodels], ('c_v',))
+
+    return [
+        train_model_v2(n_topics, alpha_str, beta_str, train_data, data, phase, random_state, passes, iterations,
+                       update_every, eval_every, cores, per_word_topics, ldamodel=model, vocabulary=vocabulary,
+                       prepared_dictionary=prepared_dictionary, prepared_corpus=prepared_corpus, lda_workers=lda_workers,
+                       coherence_engine=coherence_engine, coherence_backend=coherence_backend, training_trace=trace,
+                       stage_timer=stage_timer.merge(shared_timer, prefix='fused_'), **kwargs)
+        for (n_topics, alpha_str, beta_str), model, trace, stage_timer in zip(configs, ldamodels, training_traces, stage_timers)
+    ]
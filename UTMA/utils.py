@@ -8,6 +8,7 @@
 #
 # Functions:
 # - garbage_collection: Performs garbage collection with debugging options, useful for memory management.
+# - update_run_metadata: Merges values into the JSON run metadata file of the current run.
 # - Additional utilities: Provides miscellaneous helper functions for data processing and system resource management.
 #
 # Dependencies:
@@ -17,6 +18,7 @@
 
 
 import os
+import json
 import logging
 from datetime import datetime
 import multiprocessing
@@ -80,6 +82,24 @@ def convert_float32_to_float(data):
     else:
         return data
 
+def update_run_metadata(metadata_path, **values):
+    """
+    Merge `values` into the run metadata JSON file at `metadata_path`.
+
+    The file is rewritten through a temporary file so a crash never leaves it half written.
+    """
+    metadata = {}
+    if os.path.exists(metadata_path):
+        with open(metadata_path, 'r', encoding='utf-8') as metadata_file:
+            metadata = json.load(metadata_file)
+    metadata.update(convert_float32_to_float(values))
+
+    temp_path = f"{metadata_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as metadata_file:
+        json.dump(metadata, metadata_file, indent=2, default=str)
+    os.replace(temp_path, metadata_path)
+    return metadata
+
 def get_file_size(file_path):
     """Get the size of a local file."""
     return os.path.getsize(file_path)
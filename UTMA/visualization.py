@@ -19,6 +19,8 @@
 
 
 from .utils import garbage_collection
+from .doc_topic_inference import infer_document_topics
+from .model_serialization import deserialize_lda_model
 import os 
 import numpy as np
 import pyLDAvis
@@ -42,8 +44,8 @@ def fill_distribution_matrix(ldaModel, corpus, num_topics):
 
     This function creates a matrix where each row represents a document, and each column 
     represents a topic. The values in the matrix indicate the probability distribution of 
-    topics across documents as assigned by the LDA model. The function does not use Numba 
-    for optimization due to the complex object types involved in the LDA topic data.
+    topics across documents as assigned by the LDA model, computed with batched inference
+    (see doc_topic_inference.py) rather than one `get_document_topics` call per document.
 
     Parameters:
     - ldaModel: The trained LDA model used to obtain topic distributions.
@@ -54,11 +56,7 @@ def fill_distribution_matrix(ldaModel, corpus, num_topics):
     - distributions_matrix: A NumPy array with shape (num_documents, num_topics), where each entry 
       represents the topic probability for a document.
     """
-    distributions_matrix = np.zeros((len(corpus), num_topics))
-    for i, doc in enumerate(corpus):
-        doc_topics = ldaModel.get_document_topics(doc, minimum_probability=0)
-        for topic_num, prob in doc_topics:
-            distributions_matrix[i, topic_num] = prob
+    distributions_matrix = infer_document_topics(ldaModel, corpus)
     return distributions_matrix
 
 # The create_vis_pcoa function utilizes Principal Coordinate Analysis (PCoA) to visualize topic
@@ -103,20 +101,14 @@ def create_vis_pcoa(ldaModel, corpus, topics, phase_name, filename, time_key, PC
          logging.error(f"Couldn't create PCoA file: {e}")
 
     # try Jensen-Shannon Divergence & Principal Coordinate Analysis (aka Classical Multidimensional Scaling)
-    topic_labels = [] # list to store topic labels
-
-    ldaModel = pickle.loads(ldaModel)
-    topic_distributions = [ldaModel.get_document_topics(doc, minimum_probability=0) for doc in pickle.loads(corpus)]
+    ldaModel = deserialize_lda_model(ldaModel)
 
     # Ensure all topics are represented even if their probability is 0
     num_topics = ldaModel.num_topics
-    distributions_matrix = np.zeros((len(pickle.loads(corpus)), num_topics))
+    distributions_matrix = fill_distribution_matrix(ldaModel, pickle.loads(corpus), num_topics)
 
-    # apply topic labels and extract distribution matrix
-    for i, doc_topics in enumerate(topic_distributions):
-        topic_labels.append(f"Topic {max(doc_topics, key=lambda x: x[1])[0]}")
-        for topic_num, prob in doc_topics:
-            distributions_matrix[i, topic_num] = prob
+    # apply topic labels from the most probable topic of each document
+    topic_labels = [f"Topic {topic_num}" for topic_num in distributions_matrix.argmax(axis=1)]
     
     try: 
         pcoa_results = pyLDAvis.js_PCoA(distributions_matrix) 
@@ -207,7 +199,7 @@ def create_vis_pca(ldaModel, corpus, topics, phase_name, filename, time_key, PCO
         logging.error(f"Couldn't create PCoA file: {e}")
 
     # Deserialize model and corpus
-    ldaModel = pickle.loads(ldaModel)
+    ldaModel = deserialize_lda_model(ldaModel)
     corpus = pickle.loads(corpus)
     num_topics = ldaModel.num_topics
 
@@ -226,7 +218,7 @@ def create_vis_pca(ldaModel, corpus, topics, phase_name, filename, time_key, PCO
     # Plotting and visualization
     try:
         fig, ax = plt.subplots(figsize=(10, 10))
-        topic_labels = [f"Topic {max(doc_topics, key=lambda x: x[1])[0]}" for doc_topics in ldaModel.get_document_topics(corpus, minimum_probability=0)]
+        topic_labels = [f"Topic {topic_num}" for topic_num in distributions_matrix.argmax(axis=1)]
         unique_labels = list(set(topic_labels))
         colors = plt.cm.jet(np.linspace(0, 1, len(unique_labels)))
         label_to_color = dict(zip(unique_labels, colors))
@@ -308,10 +300,12 @@ def create_vis_pylda(ldaModel, corpus, dictionary, topics, phase_name, filename,
         # https://github.com/bmabey/pyLDAvis/issues/69#issuecomment-311337191
         # as mentioned in the forum, use mds='mmds' instead of default js_PCoA
         # https://pyldavis.readthedocs.io/en/latest/modules/API.html#pyLDAvis.prepare
-        ldaModel = pickle.loads(ldaModel)
+        ldaModel = deserialize_lda_model(ldaModel)
         corpus = pickle.loads(corpus)
         dictionary = pickle.loads(dictionary)
-        vis = pyLDAvis.gensim.prepare(ldaModel, corpus, dictionary,  mds='mmds', n_jobs=int(CORES*(2/3)), sort_topics=False)
+        # pyLDAvis normalizes doc_topic_dist row-wise with matrix semantics, so pass an np.matrix
+        doc_topic_dist = np.asmatrix(infer_document_topics(ldaModel, corpus))
+        vis = pyLDAvis.gensim.prepare(ldaModel, corpus, dictionary, doc_topic_dist=doc_topic_dist, mds='mmds', n_jobs=int(CORES*(2/3)), sort_topics=False)
 
         pyLDAvis.save_html(vis, IMAGEFILE)
         create_pylda = True
@@ -0,0 +1,260 @@
+# vocabulary_stats.py - Streaming Vocabulary Statistics and Pruning for UTMA
+# Author: Alan Hamm
+# Date: November 2024
+#
+# Description:
+# This script collects document-frequency and term-frequency statistics for the Unified Topic Modeling and
+# Analysis (UTMA) in one streaming pass with bounded memory, so the vocabulary can be pruned before any model
+# is built. Frequent terms ("the head") are counted exactly in a dictionary capped at a configurable size;
+# every term is also counted in a pair of count-min sketches, which hold the tail in fixed memory and decide
+# when an evicted term has become frequent enough to re-enter the head. The pruned vocabulary is turned
+# directly into a Gensim Dictionary, so rare tokens never reach the LDA topic-word matrices.
+#
+# Functions:
+# - CountMinSketch: Fixed-size frequency sketch with conservative (over-)estimates.
+# - VocabularyStats: Exact head counts plus sketches for the tail, with pruning into a Dictionary.
+# - collect_vocabulary_stats: Runs the streaming pass over an iterable of tokenized documents.
+# - estimate_lda_model_bytes: Approximate peak memory of an LDA model for a vocabulary and topic count.
+#
+# Dependencies:
+# - Python libraries: hashlib, logging, collections, itertools, numpy
+# - Gensim library for the Dictionary
+#
+# Developed with AI assistance.
+
+import hashlib
+import logging
+from collections import Counter
+from itertools import islice
+
+import numpy as np
+from gensim.corpora import Dictionary
+
+DEFAULT_SKETCH_WIDTH = 2 ** 20
+DEFAULT_SKETCH_DEPTH = 4
+DEFAULT_MAX_HEAD_TERMS = 1000000
+
+# K x V arrays alive at the peak of an LdaModel update: sstats, the lambda temporary,
+# expElogbeta and the per-chunk sstats of the E-step
+LDA_TOPIC_WORD_ARRAYS = 4
+
+
+class CountMinSketch:
+    """
+    A count-min sketch over string keys.
+
+    Estimates never undercount; they overcount by at most about `e / width` of the total added
+    count with probability `1 - exp(-depth)`. Row columns are derived from one 64-bit hash per key
+    (double hashing), so hashing can be shared between sketches of the same shape.
+    """
+
+    def __init__(self, width=DEFAULT_SKETCH_WIDTH, depth=DEFAULT_SKETCH_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def columns(self, keys):
+        """Return a (depth, len(keys)) array with the column of every key in every row."""
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') for key in keys),
+            dtype=np.uint64, count=len(keys)
+        )
+        first = hashes & np.uint64(0xFFFFFFFF)
+        second = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((first[None, :] + rows * second[None, :]) % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, columns, counts):
+        """Add `counts` to the keys whose columns were computed with `columns`."""
+        counts = np.asarray(counts, dtype=np.uint32)
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts)
+
+    def estimate(self, columns):
+        """Return the estimated counts of the keys whose columns were computed with `columns`."""
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+
+class VocabularyStats:
+    """
+    Document and term frequencies of a corpus collected with bounded memory.
+
+    While the head has room every term is counted exactly. Once it exceeds `max_head_terms`, the
+    least frequent half is evicted and only terms whose sketched document frequency reaches the
+    evicted level are admitted again, starting from their sketched counts. Head counts are therefore
+    exact for terms that never left the head and slight overestimates otherwise.
+
+    Attributes:
+        head (dict): Maps a term to its [document frequency, term frequency].
+        num_docs (int): Number of documents seen.
+        num_pos (int): Number of tokens seen.
+        admission_df (int): Minimum sketched document frequency for a term to enter a full head.
+    """
+
+    def __init__(self, max_head_terms=DEFAULT_MAX_HEAD_TERMS, sketch_width=DEFAULT_SKETCH_WIDTH,
+                 sketch_depth=DEFAULT_SKETCH_DEPTH):
+        self.max_head_terms = max_head_terms
+        self.df_sketch = CountMinSketch(sketch_width, sketch_depth)
+        self.tf_sketch = CountMinSketch(sketch_width, sketch_depth)
+        self.head = {}
+        self.num_docs = 0
+        self.num_pos = 0
+        self.admission_df = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.head)
+
+    def add_documents(self, documents):
+        """
+        Adds a chunk of tokenized documents.
+
+        Frequencies are aggregated over the chunk first, so each distinct term is hashed once per chunk.
+        """
+        chunk_df = Counter()
+        chunk_tf = Counter()
+        for document in documents:
+            chunk_df.update(set(document))
+            chunk_tf.update(document)
+            self.num_docs += 1
+            self.num_pos += len(document)
+        if not chunk_df:
+            return
+
+        terms = list(chunk_df)
+        document_frequencies = [chunk_df[term] for term in terms]
+        columns = self.df_sketch.columns(terms)
+        self.df_sketch.add(columns, document_frequencies)
+        self.tf_sketch.add(columns, [chunk_tf[term] for term in terms])
+
+        new_terms = [position for position, term in enumerate(terms) if term not in self.head]
+        for term, document_frequency in zip(terms, document_frequencies):
+            counts = self.head.get(term)
+            if counts is not None:
+                counts[0] += document_frequency
+                counts[1] += chunk_tf[term]
+
+        if new_terms and not self.evictions:
+            # Nothing has left the head yet, so a term outside it is new and its chunk counts are exact
+            for position in new_terms:
+                self.head[terms[position]] = [document_frequencies[position], chunk_tf[terms[position]]]
+        elif new_terms:
+            new_columns = columns[:, new_terms]
+            estimated_df = self.df_sketch.estimate(new_columns)
+            estimated_tf = self.tf_sketch.estimate(new_columns)
+            for position, df, tf in zip(new_terms, estimated_df.tolist(), estimated_tf.tolist()):
+                if df >= self.admission_df:
+                    self.head[terms[position]] = [df, tf]
+
+        if len(self.head) > self.max_head_terms:
+            self._evict()
+
+    def _evict(self):
+        """Drop the least frequent half of the head and raise the admission level to match."""
+        ranked = sorted(self.head.items(), key=lambda item: item[1][0], reverse=True)
+        keep = self.max_head_terms // 2
+        self.admission_df = max(self.admission_df, ranked[keep][1][0] + 1)
+        self.head = dict(ranked[:keep])
+        self.evictions += 1
+
+    def prune(self, no_below=5, no_above=0.5, keep_n=100000, keep_tokens=None):
+        """
+        Selects the terms that survive the thresholds, with the semantics of `Dictionary.filter_extremes`.
+
+        Args:
+            no_below (int): Keep terms appearing in at least this many documents.
+            no_above (float): Keep terms appearing in at most this fraction of documents.
+            keep_n (int or None): Keep only the `keep_n` most frequent terms after the above filters.
+            keep_tokens (iterable of str or None): Terms to keep regardless of the filters.
+
+        Returns:
+            list: (term, document frequency, term frequency) tuples, most frequent first.
+        """
+        keep_tokens = set(keep_tokens or ())
+        no_above_abs = int(no_above * self.num_docs)
+        kept = [
+            (term, df, tf) for term, (df, tf) in self.head.items()
+            if term in keep_tokens or no_below <= df <= no_above_abs
+        ]
+        kept.sort(key=lambda item: item[1], reverse=True)
+        if keep_n is not None:
+            kept = kept[:keep_n]
+        return kept
+
+    def to_dictionary(self, no_below=5, no_above=0.5, keep_n=100000, keep_tokens=None):
+        """
+        Builds a Gensim Dictionary directly from the pruned vocabulary.
+
+        Returns:
+            Dictionary: Dictionary with ids assigned by decreasing document frequency and with
+            `dfs`, `cfs`, `num_docs` and `num_pos` taken from the collected statistics.
+        """
+        dictionary = Dictionary()
+        for token_id, (term, df, tf) in enumerate(self.prune(no_below, no_above, keep_n, keep_tokens)):
+            dictionary.token2id[term] = token_id
+            dictionary.dfs[token_id] = df
+            dictionary.cfs[token_id] = tf
+        dictionary.num_docs = self.num_docs
+        dictionary.num_pos = self.num_pos
+        dictionary.num_nnz = sum(dictionary.dfs.values())
+        return dictionary
+
+    def summary(self):
+        """Return the counters of the pass as a JSON-serializable dict."""
+        return {
+            'num_docs': self.num_docs,
+            'num_pos': self.num_pos,
+            'head_terms': len(self.head),
+            'head_evictions': self.evictions,
+            'admission_df': self.admission_df,
+            'sketch_bytes': self.df_sketch.nbytes + self.tf_sketch.nbytes,
+        }
+
+
+def collect_vocabulary_stats(documents, chunk_size=10000, max_head_terms=DEFAULT_MAX_HEAD_TERMS,
+                             sketch_width=DEFAULT_SKETCH_WIDTH, sketch_depth=DEFAULT_SKETCH_DEPTH):
+    """
+    Runs the streaming statistics pass over an iterable of tokenized documents.
+
+    Args:
+        documents (iterable of list of str): Documents, e.g. from `iter_documents`; consumed once.
+        chunk_size (int): Number of documents aggregated before the sketches are updated.
+        max_head_terms (int): Maximum number of exactly counted terms.
+        sketch_width (int): Columns per sketch row.
+        sketch_depth (int): Rows per sketch.
+
+    Returns:
+        VocabularyStats: The collected statistics.
+    """
+    stats = VocabularyStats(max_head_terms, sketch_width, sketch_depth)
+    documents = iter(documents)
+    while True:
+        chunk = list(islice(documents, chunk_size))
+        if not chunk:
+            break
+        stats.add_documents(chunk)
+
+    logging.info(f"Vocabulary statistics collected over {stats.num_docs} documents: {stats.summary()}")
+    return stats
+
+
+def estimate_lda_model_bytes(num_terms, num_topics, dtype=np.float32):
+    """
+    Estimates the peak memory of training one LDA model.
+
+    Counts the K x V topic-word arrays alive during an update; document-topic state is
+    proportional to the chunk size and ignored.
+
+    Args:
+        num_terms (int): Vocabulary size.
+        num_topics (int): Number of topics.
+        dtype (numpy dtype): Floating point type of the model.
+
+    Returns:
+        int: Approximate number of bytes.
+    """
+    return LDA_TOPIC_WORD_ARRAYS * num_topics * num_terms * np.dtype(dtype).itemsize
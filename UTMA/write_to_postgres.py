@@ -31,7 +31,7 @@ import sqlalchemy
 from sqlalchemy import create_engine, inspect
 from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine, Column, String, Integer, Boolean, Float, LargeBinary, DateTime, JSON, TEXT
+from sqlalchemy import create_engine, Column, String, Integer, BigInteger, Boolean, Float, LargeBinary, DateTime, JSON, TEXT
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 import pickle
@@ -102,6 +102,7 @@ def create_dynamic_table_class(table_name):
         'text_json' : Column(LargeBinary),
         'show_topics': Column(JSONB),
         'top_words': Column(JSONB),
+        'topic_coherence': Column(JSONB),
         'validation_result': Column(JSONB),
         'text_sha256' : Column(String),
         'text_md5' : Column(String),
@@ -119,11 +120,15 @@ def create_dynamic_table_class(table_name):
         'chunksize' : Column(Integer),
         'random_state' : Column(Integer),
         'per_word_topics' : Column(Boolean),
+        'passes_used' : Column(Integer),
+        'convergence_curve' : Column(JSONB),
+        'model_size_bytes' : Column(BigInteger),
         
         # Evaluation Metrics
         'convergence' : Column(Float(precision=32)),
         'perplexity' : Column(Float(precision=32)),
         'coherence' : Column(Float(precision=32)),
+        'stage_timings' : Column(JSONB),
         
         # Visualization Placeholders
         'create_pylda' : Column(Boolean),
@@ -164,7 +169,23 @@ def create_table_if_not_exists(table_class, database_uri):
             logging.error(f"An error occurred while creating the table: {e}")
             raise  # Re-raise exception after logging it for further handling or clean exit.
     else:
-        logging.info(f"Table '{table_class.__tablename__}' already exists. No action taken.")
+        # Tables created by earlier versions lack newer columns; add them so inserts keep working
+        existing_columns = {column['name'] for column in inspector.get_columns(table_class.__tablename__)}
+        missing_columns = [column for column in table_class.__table__.columns if column.name not in existing_columns]
+        if not missing_columns:
+            logging.info(f"Table '{table_class.__tablename__}' already exists. No action taken.")
+            return
+        try:
+            with engine.begin() as connection:
+                for column in missing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(sqlalchemy.text(
+                        f'ALTER TABLE "{table_class.__tablename__}" ADD COLUMN IF NOT EXISTS "{column.name}" {column_type}'
+                    ))
+            logging.info(f"Added columns {[column.name for column in missing_columns]} to table '{table_class.__tablename__}'.")
+        except ProgrammingError as e:
+            logging.error(f"An error occurred while adding columns to the table: {e}")
+            raise
 
 
 # Function to add new model data to metadata postgres table
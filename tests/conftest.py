@@ -0,0 +1,34 @@
+# conftest.py - Shared fixtures for the UTMA tests
+#
+# Makes the repository root importable, so `import UTMA` works when pytest is run from any directory, and
+# provides small synthetic corpora drawn from the LDA generative process (see UTMA/benchmarks).
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from UTMA.benchmarks.synthetic_corpus import generate_lda_corpus  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def lda_texts():
+    """Tokenized documents with a small vocabulary, so words recur inside coherence windows."""
+    texts = generate_lda_corpus(num_documents=150, vocabulary_size=120, num_topics=4, document_length=60,
+                                alpha=0.1, beta=0.05, seed=7)
+    # Edge cases of the window accounting: an empty document and a short document with one repeated word
+    return texts + [[], [texts[0][0]] * 5]
+
+
+@pytest.fixture(scope="session")
+def lda_model(lda_texts):
+    """A small LdaModel trained on `lda_texts`, with its Dictionary and BoW corpus."""
+    from gensim.corpora import Dictionary
+    from gensim.models import LdaModel
+
+    dictionary = Dictionary(lda_texts)
+    corpus = [dictionary.doc2bow(text) for text in lda_texts]
+    model = LdaModel(corpus, id2word=dictionary, num_topics=4, passes=5, random_state=1)
+    return model, dictionary, corpus
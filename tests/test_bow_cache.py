@@ -0,0 +1,64 @@
+import pytest
+
+from UTMA import bow_cache, coherence_engine
+from UTMA.bow_cache import BowCache
+from UTMA.topic_model_trainer import prepare_task_corpus, train_models_fused
+
+
+def test_fused_task_hashes_its_batch_once(lda_texts, monkeypatch):
+    cache = BowCache(256 * 1024 ** 2)
+    monkeypatch.setattr(bow_cache, "get_worker_cache", lambda: cache)
+    monkeypatch.setattr(coherence_engine, "get_worker_cache", lambda: cache)
+    hashed = []
+    original_hash = bow_cache.batch_content_hash
+
+    def counting_hash(documents):
+        hashed.append(len(documents))
+        return original_hash(documents)
+
+    for module in ("UTMA.bow_cache", "UTMA.coherence_engine", "UTMA.topic_model_trainer"):
+        monkeypatch.setattr(f"{module}.batch_content_hash", counting_hash)
+
+    configs = [(3, 'symmetric', 'symmetric'), (4, 'symmetric', 'symmetric')]
+    results = train_models_fused(configs, lda_texts, "N/A", "train", 1, 1, 10, 1, 0, 1, True)
+    assert hashed == [len(lda_texts)]
+    # A second task on the same batch reuses the cached Dictionary, BoW corpus and coherence engine
+    misses = cache.stats()['misses']
+    train_models_fused(configs, lda_texts, "N/A", "train", 1, 1, 10, 1, 0, 1, True)
+    assert cache.stats()['misses'] == misses
+    assert len({result['text_md5'] for result in results}) == 1
+
+
+def test_prepare_task_corpus_reraises_dictionary_errors(caplog):
+    # Documents given as strings instead of token lists cannot form a Dictionary
+    with pytest.raises(TypeError):
+        prepare_task_corpus(["a whole document", "another document"], "N/A", "train")
+    assert "Dictionary" in caplog.text
+
+
+def test_cached_coherence_engine_growth_counts_against_the_budget(lda_texts, lda_model, monkeypatch):
+    model, dictionary, _ = lda_model
+    cache = BowCache(256 * 1024 ** 2)
+    monkeypatch.setattr(coherence_engine, "get_worker_cache", lambda: cache)
+
+    engine = coherence_engine.cached_coherence_engine(lda_texts, dictionary, "key")
+    initial_bytes = cache.stats()['bytes']
+    assert initial_bytes == engine.nbytes
+
+    engine.precompute(coherence_engine.top_topic_ids(model, 10), ('c_v', 'u_mass'))
+    assert engine.nbytes > initial_bytes
+    assert cache.stats()['bytes'] == engine.nbytes
+    assert cache.stats()['entries'] == 1
+
+
+def test_cached_coherence_engine_outgrowing_the_budget_is_dropped(lda_texts, lda_model, monkeypatch):
+    model, dictionary, _ = lda_model
+    probe = coherence_engine.CoherenceEngine(lda_texts, dictionary)
+    cache = BowCache(probe.nbytes + 1)
+    monkeypatch.setattr(coherence_engine, "get_worker_cache", lambda: cache)
+
+    engine = coherence_engine.cached_coherence_engine(lda_texts, dictionary, "key")
+    assert cache.stats()['entries'] == 1
+    engine.precompute(coherence_engine.top_topic_ids(model, 10), ('c_v',))
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['bytes'] == 0
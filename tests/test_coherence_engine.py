@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from gensim.models import CoherenceModel
+
+from UTMA.coherence_engine import CoherenceEngine, COHERENCE_MEASURES, top_topic_ids
+
+
+def gensim_topic_coherences(model, texts, dictionary, corpus, measure, topn=10):
+    coherence_model = CoherenceModel(model=model, texts=texts, corpus=corpus if measure == 'u_mass' else None,
+                                     dictionary=dictionary, coherence=measure, topn=topn, processes=1)
+    return np.array(coherence_model.get_coherence_per_topic())
+
+
+@pytest.mark.parametrize("measure", COHERENCE_MEASURES)
+def test_topic_coherences_match_gensim(lda_texts, lda_model, measure):
+    model, dictionary, corpus = lda_model
+    engine = CoherenceEngine(lda_texts, dictionary)
+
+    expected = gensim_topic_coherences(model, lda_texts, dictionary, corpus, measure)
+    np.testing.assert_allclose(engine.topic_coherences(top_topic_ids(model, 10), measure), expected,
+                               rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("window_size", [1, 2, 5, 110])
+def test_window_counts_match_gensim_accumulator(lda_texts, lda_model, window_size):
+    from gensim.topic_coherence.text_analysis import WordOccurrenceAccumulator
+
+    _, dictionary, _ = lda_model
+    relevant_ids = np.arange(30)
+    accumulator = WordOccurrenceAccumulator(set(relevant_ids.tolist()), dictionary).accumulate(lda_texts, window_size)
+
+    engine = CoherenceEngine(lda_texts, dictionary)
+    state = engine._extend_windows(window_size, relevant_ids)
+    counts = state['counts'][state['columns'][relevant_ids]][:, state['columns'][relevant_ids]].toarray()
+
+    expected = np.array([[accumulator[(int(first), int(second)) if first != second else int(first)]
+                          for second in relevant_ids] for first in relevant_ids])
+    np.testing.assert_array_equal(counts, expected)
+    assert int(state['window_offsets'][-1]) == accumulator.num_docs
+
+
+def test_incremental_extension_matches_fresh_engine(lda_texts, lda_model):
+    model, dictionary, _ = lda_model
+    topics = top_topic_ids(model, 10)
+
+    extended = CoherenceEngine(lda_texts, dictionary)
+    extended.precompute(topics[:2], ('c_v',))
+    fresh = CoherenceEngine(lda_texts, dictionary)
+
+    np.testing.assert_allclose(extended.topic_coherences(topics, 'c_v'), fresh.topic_coherences(topics, 'c_v'))
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+from dask.distributed import Client
+
+from UTMA.deduplication import MinHasher, NearDuplicateIndex, deduplicate_corpus, deduplicate_documents
+from UTMA.process_futures import iter_documents, list_jsonl_shards
+
+
+def near_copy(document):
+    """The document with its last token changed: 3-gram Jaccard similarity well above 0.8."""
+    return document[:-1] + ["changed"]
+
+
+@pytest.fixture
+def documents_with_duplicates(lda_texts):
+    originals = [text for text in lda_texts[:40] if len(text) >= 40]
+    # Later exact and near copies of earlier documents
+    return originals + [list(originals[3]), near_copy(originals[5]), list(originals[0])]
+
+
+def test_deduplicate_documents_keeps_first_occurrence(documents_with_duplicates):
+    index = NearDuplicateIndex(0.8)
+    kept = list(deduplicate_documents(documents_with_duplicates, MinHasher(seed=3), index, chunk_size=7))
+
+    assert kept == documents_with_duplicates[:-3]
+    assert index.counts['exact_duplicates'] == 2
+    assert index.counts['near_duplicates'] == 1
+
+
+def test_near_copy_first_in_order_is_kept(documents_with_duplicates):
+    copy = near_copy(documents_with_duplicates[5])
+    documents = [copy] + documents_with_duplicates[:-3]
+
+    kept = list(deduplicate_documents(documents, MinHasher(seed=3)))
+
+    assert kept[0] == copy
+    assert documents_with_duplicates[5] not in kept
+
+
+def test_deduplicate_corpus_matches_sequential_pass_and_clears_stale_shards(documents_with_duplicates, tmp_path):
+    source = tmp_path / "source.jsonl"
+    source.write_text("".join(json.dumps(document) + "\n" for document in documents_with_duplicates))
+    output_dir = tmp_path / "dedup"
+    output_dir.mkdir()
+    (output_dir / "dedup-00042.jsonl").write_text(json.dumps(["stale"]) + "\n")
+
+    with Client(processes=False, n_workers=1, threads_per_worker=2, dashboard_address=None) as client:
+        # Small blocks, so the documents are sketched by several tasks
+        deduplicate_corpus(client, str(source), str(output_dir), seed=3, block_bytes=2048)
+
+    assert "dedup-00042.jsonl" not in [path.rsplit("/", 1)[-1] for path in list_jsonl_shards(str(output_dir))]
+    assert list(iter_documents(str(output_dir))) == documents_with_duplicates[:-3]
@@ -0,0 +1,39 @@
+import copy
+
+import numpy as np
+import pytest
+
+from UTMA import doc_topic_inference
+from UTMA.doc_topic_inference import evaluate_corpus, infer_document_topics, variational_document_bound
+
+
+def test_document_bound_matches_gensim_bound_for_the_same_gamma(lda_model):
+    model, _, corpus = lda_model
+    gamma, _ = model.inference(corpus)
+
+    bound = model.bound([]) + variational_document_bound(model, corpus, gamma)
+
+    # gensim's bound expects one (1, num_topics) gamma per document, as returned by `inference([doc])`
+    assert bound == pytest.approx(model.bound(corpus, gamma=gamma[:, np.newaxis, :]), rel=1e-6)
+
+
+def test_document_bound_is_independent_of_block_size(lda_model, monkeypatch):
+    model, _, corpus = lda_model
+    gamma, _ = model.inference(corpus)
+    unblocked = variational_document_bound(model, corpus, gamma)
+
+    monkeypatch.setattr(doc_topic_inference, "BOUND_BLOCK_ELEMENTS", 7 * model.num_topics)
+    assert variational_document_bound(model, corpus, gamma) == pytest.approx(unblocked, rel=1e-9)
+
+
+def test_evaluate_corpus_matches_bound_and_log_perplexity(lda_model):
+    model, _, corpus = lda_model
+    model = copy.deepcopy(model)
+    # Converged inference, so the random initialization of gamma does not matter
+    model.iterations, model.gamma_threshold = 1000, 1e-8
+
+    bound, per_word_bound, doc_topic_matrix = evaluate_corpus(model, corpus, chunksize=40)
+
+    assert bound == pytest.approx(model.bound(corpus), rel=1e-4)
+    assert per_word_bound == pytest.approx(model.log_perplexity(corpus), rel=1e-4)
+    np.testing.assert_allclose(doc_topic_matrix.toarray(), infer_document_topics(model, corpus), atol=1e-3)
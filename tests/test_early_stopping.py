@@ -0,0 +1,60 @@
+import numpy as np
+from gensim.corpora import Dictionary
+from gensim.models import LdaModel
+
+from UTMA.topic_model_trainer import fit_lda_model, fit_lda_model_early_stopping
+
+
+def prepared(texts):
+    dictionary = Dictionary(texts)
+    return {'corpus': [dictionary.doc2bow(text) for text in texts], 'dictionary': dictionary,
+            'chunksize': max(1, len(texts) // 5)}
+
+
+def test_early_stopping_finishes_the_probe_model_on_the_holdout(lda_texts, monkeypatch):
+    prepared_corpus = prepared(lda_texts)
+    fitted = []
+    updates = []
+
+    def recording_fit(corpus_arg, *args, **kwargs):
+        fitted.append((len(corpus_arg['corpus']), args[4]))
+        return fit_lda_model(corpus_arg, *args, **kwargs)
+
+    original_update = LdaModel.update
+
+    def recording_update(self, corpus, *args, **kwargs):
+        updates.append(len(corpus))
+        return original_update(self, corpus, *args, **kwargs)
+
+    monkeypatch.setattr("UTMA.topic_model_trainer.fit_lda_model", recording_fit)
+    monkeypatch.setattr(LdaModel, "update", recording_update)
+    model, trace = fit_lda_model_early_stopping(prepared_corpus, 4, 'symmetric', 'symmetric', 3, 6, 20, 1, 0,
+                                                tolerance=0.5, patience=1, holdout_fraction=0.2)
+
+    corpus_size = len(prepared_corpus['corpus'])
+    holdout_size = int(corpus_size * 0.2)
+    # One model is trained: no retraining from scratch on the full batch
+    assert fitted == [(corpus_size - holdout_size, 1)]
+    # Every pass updates on the fitted documents, then one update adds the held-out documents
+    assert updates == [corpus_size - holdout_size] * trace['passes_used'] + [holdout_size]
+    assert len(trace['convergence_curve']) == trace['passes_used'] < 6
+
+
+def test_holdout_is_a_seeded_sample(lda_texts, monkeypatch):
+    prepared_corpus = prepared(lda_texts)
+    holdouts = []
+
+    def recording_perplexity(self, chunk, *args, **kwargs):
+        holdouts.append([prepared_corpus['corpus'].index(document) for document in chunk])
+        return -7.0
+
+    monkeypatch.setattr("gensim.models.LdaModel.log_perplexity", recording_perplexity)
+    for seed in (3, 3, 4):
+        fit_lda_model_early_stopping(prepared_corpus, 4, 'symmetric', 'symmetric', seed, 2, 5, 1, 0,
+                                     holdout_fraction=0.2)
+
+    first, repeated, other_seed = holdouts[0], holdouts[2], holdouts[4]
+    assert first == repeated != other_seed
+    # Not simply the tail of the batch
+    assert first != list(range(len(lda_texts) - len(first), len(lda_texts)))
+    assert np.all(np.diff(first) > 0)
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+from gensim.corpora import Dictionary
+
+from UTMA.encoded_corpus import (encoded_batch, encoded_corpus_exists, encoded_doc2bow,
+                                 load_encoded_corpus, write_encoded_corpus)
+
+
+def test_encoded_doc2bow_matches_doc2bow(lda_texts, tmp_path):
+    corpus = write_encoded_corpus(lda_texts, str(tmp_path / "encoded"))
+    batch = corpus.take(np.arange(len(corpus)))
+    # A pruned Dictionary, so some tokens of the batch are missing from it
+    dictionary = Dictionary(lda_texts[:50])
+    dictionary.filter_extremes(no_below=3, no_above=0.9, keep_n=None)
+
+    expected = [dictionary.doc2bow(document) for document in lda_texts]
+    assert encoded_doc2bow(batch, corpus.vocabulary, dictionary) == expected
+
+
+def test_encoded_batch_joins_batches_in_order(lda_texts, tmp_path):
+    corpus = write_encoded_corpus(lda_texts, str(tmp_path / "encoded"))
+    first, second = corpus.take([3, 0, 5]), corpus.take([len(corpus) - 2, 1])
+
+    joined = encoded_batch([first, second])
+
+    assert joined.decode(corpus.vocabulary) == first.decode(corpus.vocabulary) + second.decode(corpus.vocabulary)
+    assert encoded_batch(first) is first
+    assert encoded_batch([["token"]]) is None
+
+
+def test_changed_source_fingerprint_triggers_rewrite(lda_texts, tmp_path):
+    output_dir = str(tmp_path / "encoded")
+    write_encoded_corpus(lda_texts[:10], output_dir, fingerprint="first")
+    assert encoded_corpus_exists(output_dir, "first")
+    assert not encoded_corpus_exists(output_dir, "second")
+
+    write_encoded_corpus(lda_texts[:20], output_dir, fingerprint="second")
+    assert encoded_corpus_exists(output_dir, "second")
+    assert len(load_encoded_corpus(output_dir)) == 20
+    # Only the finished corpus is left behind, no staging directories
+    assert os.listdir(tmp_path) == ["encoded"]
+
+
+def test_prepare_task_corpus_from_encoded_batches(lda_texts, tmp_path):
+    from UTMA.corpus_preparation import PreparedDictionary
+    from UTMA.topic_model_trainer import prepare_task_corpus
+
+    corpus = write_encoded_corpus(lda_texts, str(tmp_path / "encoded"))
+    train_batch, validation_batch = corpus.take(np.arange(100)), corpus.take(np.arange(100, len(corpus)))
+    dictionary = Dictionary(lda_texts[:100])
+
+    train = prepare_task_corpus(train_batch, "N/A", "train", corpus.vocabulary)
+    assert train['corpus'] == [dictionary.doc2bow(document) for document in lda_texts[:100]]
+
+    validation = prepare_task_corpus(train_batch, validation_batch, "validation", corpus.vocabulary,
+                                     PreparedDictionary(dictionary))
+    assert validation['train_documents'] is None
+    assert list(validation['documents']) == lda_texts[100:]
+    assert validation['corpus'] == [dictionary.doc2bow(document) for document in lda_texts[100:]]
@@ -0,0 +1,63 @@
+import pytest
+
+from UTMA.hyperparameter_search import halving_schedule, search_batch_order, successive_halving
+
+
+def test_halving_schedule_rungs_and_cost():
+    schedule = halving_schedule(81, max_passes=81, num_batches=81, eta=3)
+
+    assert [rung['num_configs'] for rung in schedule] == [81, 27, 9, 3]
+    assert [rung['keep'] for rung in schedule] == [27, 9, 3, 1]
+    assert [rung['passes'] for rung in schedule] == [1, 3, 9, 27]
+    assert [rung['num_batches'] for rung in schedule] == [1, 3, 9, 27]
+    # Rung r costs num_configs * eta^(r - 2s) full trainings, s = 4
+    costs = [rung['num_configs'] * rung['passes'] * rung['num_batches'] / (81 * 81) for rung in schedule]
+    assert costs == pytest.approx([81 * 3.0 ** (r - 8) for r in range(4)])
+
+
+def test_halving_schedule_small_grids():
+    assert halving_schedule(1, 10, 5) == []
+    assert halving_schedule(2, 10, 5) == []
+    with pytest.raises(ValueError):
+        halving_schedule(9, 10, 5, eta=1)
+
+
+class RecordingClient:
+    """Stands in for a Dask client: runs nothing and records the training batch of every task."""
+
+    def __init__(self):
+        self.batches = []
+
+    def submit(self, function, configs, train_batch, *args, **kwargs):
+        self.batches.append(train_batch)
+        return RecordedFuture([{'config': config, 'score': -float(config[0])} for config in configs])
+
+
+class RecordedFuture:
+    def __init__(self, results):
+        self.results = results
+
+    def result(self):
+        return self.results
+
+
+def test_search_batch_order_is_a_seeded_permutation():
+    order = search_batch_order(50, random_state=3)
+    assert sorted(order) == list(range(50))
+    assert order == search_batch_order(50, random_state=3) != search_batch_order(50, random_state=4)
+    assert order[:5] != list(range(5))
+
+
+def test_successive_halving_draws_rung_batches_at_random(monkeypatch):
+    monkeypatch.setattr("UTMA.hyperparameter_search.wait", lambda futures: None)
+    client = RecordingClient()
+    configs = [(n_topics, 'symmetric', 'symmetric') for n_topics in range(2, 11)]
+    train_batches = [f"batch-{index}" for index in range(27)]
+
+    survivors, history = successive_halving(client, configs, train_batches, [], max_passes=9, random_state=5)
+
+    order = search_batch_order(len(train_batches), random_state=5)
+    assert [rung['batch_ids'] for rung in history] == [order[:rung['num_batches']] for rung in history]
+    assert history[0]['batch_ids'] != list(range(history[0]['num_batches']))
+    assert set(client.batches) == {train_batches[index] for index in history[-1]['batch_ids']}
+    assert survivors == [(2, 'symmetric', 'symmetric')]
@@ -0,0 +1,19 @@
+from UTMA.topic_model_trainer import select_lda_backend
+
+
+def test_multicore_splits_the_worker_threads_between_its_tasks():
+    # Four workers with four threads each: four concurrent tasks per worker, one core each
+    assert select_lda_backend('multicore', 100, [4, 4, 4, 4]) == ('multicore', 1)
+    assert select_lda_backend('multicore', 1, [1]) == ('multicore', 1)
+    assert select_lda_backend('single', 1, [8]) == ('single', None)
+
+
+def test_auto_uses_idle_worker_threads_only():
+    # Two tasks on two 8-thread workers leave seven threads idle beside each task
+    assert select_lda_backend('auto', 2, [8, 8]) == ('multicore', 7)
+    assert select_lda_backend('auto', 8, [8, 8]) == ('multicore', 1)
+    # Enough tasks to occupy every thread
+    assert select_lda_backend('auto', 16, [8, 8]) == ('single', None)
+    assert select_lda_backend('auto', 2, [1, 1]) == ('single', None)
+    # The budget comes from the workers' threads, not from the driver's CPU count
+    assert select_lda_backend('auto', 1, [2]) == ('multicore', 1)
@@ -0,0 +1,44 @@
+import pickle
+from copy import deepcopy
+
+import numpy as np
+
+from UTMA.model_serialization import COMPACT_MODEL_MAGIC, deserialize_lda_model, serialize_lda_model
+
+
+def test_compact_round_trip_preserves_topics_and_inference(lda_model):
+    model, dictionary, corpus = lda_model
+    model_bytes = serialize_lda_model(model, compact=True)
+    assert model_bytes.startswith(COMPACT_MODEL_MAGIC)
+    assert len(model_bytes) < len(pickle.dumps(model))
+
+    restored = deserialize_lda_model(model_bytes)
+    assert restored.num_topics == model.num_topics
+    assert dict(restored.id2word.token2id) == dict(dictionary.token2id)
+    np.testing.assert_allclose(restored.get_topics(), model.get_topics(), rtol=1e-5, atol=1e-7)
+    np.testing.assert_allclose(restored.alpha, model.alpha, rtol=1e-6)
+    np.testing.assert_allclose(restored.eta, model.eta, rtol=1e-6)
+    assert (restored.iterations, restored.passes, restored.num_updates, restored.state.numdocs) == \
+        (model.iterations, model.passes, model.num_updates, model.state.numdocs)
+
+    gamma, _ = model.inference(corpus[:20])
+    restored_gamma, _ = restored.inference(corpus[:20])
+    np.testing.assert_allclose(restored_gamma, gamma, rtol=1e-3, atol=1e-3)
+
+
+def test_pickled_models_remain_loadable(lda_model):
+    model, _, _ = lda_model
+    restored = deserialize_lda_model(serialize_lda_model(model))
+    np.testing.assert_array_equal(restored.get_topics(), model.get_topics())
+
+
+def test_non_contiguous_ids_fall_back_to_pickle(lda_model, caplog):
+    model, dictionary, _ = lda_model
+    model = deepcopy(model)
+    model.id2word = deepcopy(dictionary)
+    # Drop id 0 without compactifying, as a Dictionary filtered after training would
+    del model.id2word.token2id[model.id2word[0]]
+    model.id2word.id2token = {}
+    model_bytes = serialize_lda_model(model, compact=True)
+    assert not model_bytes.startswith(COMPACT_MODEL_MAGIC)
+    assert "not contiguous" in caplog.text
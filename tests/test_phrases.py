@@ -0,0 +1,42 @@
+import json
+
+import pytest
+from dask.distributed import Client
+
+from UTMA.phrases import detect_phrases
+from UTMA.process_futures import list_jsonl_shards
+
+
+@pytest.fixture(scope="module")
+def client():
+    with Client(processes=False, n_workers=1, threads_per_worker=2, dashboard_address=None) as client:
+        yield client
+
+
+def write_jsonl(path, documents):
+    with open(path, 'w', encoding='utf-8') as outfile:
+        for document in documents:
+            outfile.write(json.dumps(document) + '\n')
+
+
+def test_detect_phrases_appends_phrases(client, tmp_path):
+    source = tmp_path / "source.jsonl"
+    write_jsonl(source, [["new", "york", "city", "trip"], ["visit", "new", "york"]] * 20 + [["other", "words"]] * 5)
+
+    output_dir = detect_phrases(client, str(source), str(tmp_path / "phrases"), min_count=5, threshold=0.1)
+
+    documents = [json.loads(line) for path in list_jsonl_shards(output_dir) for line in open(path, encoding='utf-8')]
+    assert documents[0][:4] == ["new", "york", "city", "trip"] and "new_york" in documents[0][4:]
+    assert len(documents) == 45
+
+
+def test_detect_phrases_removes_stale_shards(client, tmp_path):
+    output_dir = tmp_path / "phrases"
+    output_dir.mkdir()
+    write_jsonl(output_dir / "phrased-00007.jsonl", [["stale", "document"]])
+    source = tmp_path / "source.jsonl"
+    write_jsonl(source, [["alpha", "beta"]] * 10)
+
+    detect_phrases(client, str(source), str(output_dir), min_count=5, threshold=0.1)
+
+    assert [path.rsplit("/", 1)[-1] for path in list_jsonl_shards(str(output_dir))] == ["phrased-00000.jsonl"]
@@ -0,0 +1,25 @@
+import json
+
+from UTMA.preprocess import ShardedJsonlWriter
+from UTMA.process_futures import list_jsonl_shards
+
+
+def write_documents(output_dir, documents, shard_size):
+    with ShardedJsonlWriter(str(output_dir), shard_size=shard_size) as writer:
+        for document in documents:
+            writer.write(document)
+    return writer
+
+
+def test_rerun_with_fewer_documents_removes_stale_shards(tmp_path):
+    write_documents(tmp_path, [["first", str(index)] for index in range(5)], shard_size=2)
+    assert len(list_jsonl_shards(str(tmp_path))) == 3
+    (tmp_path / "other-00000.jsonl").write_text(json.dumps(["kept"]) + '\n', encoding='utf-8')
+
+    writer = write_documents(tmp_path, [["second", "0"]], shard_size=2)
+    shards = sorted(path.name for path in tmp_path.glob("data-*.jsonl"))
+    assert shards == ["data-00000.jsonl"]
+    assert [path.endswith("data-00000.jsonl") for path in writer.shard_paths] == [True]
+    assert (tmp_path / "data-00000.jsonl").read_text(encoding='utf-8').splitlines() == ['["second", "0"]']
+    # Shards of another prefix are left alone
+    assert (tmp_path / "other-00000.jsonl").exists()
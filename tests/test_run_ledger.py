@@ -0,0 +1,57 @@
+import os
+import pickle
+
+from UTMA.run_ledger import RunLedger, ledger_signature
+
+SETTINGS = {'train_ratio': 0.7, 'validation_ratio': 0.15, 'batch_size': 100, 'seed': 42, 'passes': 5}
+CONFIGS = [(3, 'symmetric', 'auto'), (4, 0.1, 'symmetric'), (5, 'asymmetric', 0.01)]
+
+
+def test_resumed_run_skips_completed_tasks(tmp_path):
+    path = str(tmp_path / "run_ledger.sqlite")
+    signature = ledger_signature(SETTINGS)
+    ledger = RunLedger(path, "corpus-hash", signature)
+    ledger.save_plan([config + ('train',) for config in CONFIGS])
+    ledger.mark_complete('train', 0, CONFIGS)
+    ledger.mark_complete('train', 1, CONFIGS[:1])
+    ledger.save_model(CONFIGS[1], pickle.dumps({'n_topics': 4}))
+    ledger.close()
+
+    # A fresh process reopens the ledger and only runs what the interrupted run did not finish
+    resumed = RunLedger(path, "corpus-hash", signature)
+    completed = resumed.completed_tasks('train')
+    assert resumed.pending_configs('train', 0, CONFIGS, completed) == []
+    assert resumed.pending_configs('train', 1, CONFIGS, completed) == CONFIGS[1:]
+    assert resumed.pending_configs('train', 2, CONFIGS, completed) == CONFIGS
+    assert resumed.pending_configs('validation', 0, CONFIGS) == CONFIGS
+    # Alpha and beta are matched as the strings stored with the results
+    assert resumed.pending_configs('train', 1, [(4, '0.1', 'symmetric')], completed) == [(4, '0.1', 'symmetric')]
+    assert resumed.pending_configs('train', 0, [(4, '0.1', 'symmetric')], completed) == []
+
+    assert resumed.load_plan() == [config + ('train',) for config in CONFIGS]
+    assert pickle.loads(resumed.load_models()[(4, '0.1', 'symmetric')]) == {'n_topics': 4}
+    assert resumed.summary() == {'train': 4, 'models': 1}
+    resumed.close()
+
+
+def test_changed_settings_start_a_new_run(tmp_path):
+    path = str(tmp_path / "run_ledger.sqlite")
+    ledger = RunLedger(path, "corpus-hash", ledger_signature(SETTINGS))
+    ledger.mark_complete('train', 0, CONFIGS)
+    ledger.close()
+
+    for corpus_hash, settings in [("corpus-hash", dict(SETTINGS, passes=10)), ("other-corpus", SETTINGS)]:
+        other = RunLedger(path, corpus_hash, ledger_signature(settings))
+        assert other.completed_tasks('train') == set()
+        assert other.pending_configs('train', 0, CONFIGS) == CONFIGS
+        assert other.load_plan() is None
+        other.close()
+
+
+def test_missing_model_file_is_retrained(tmp_path, caplog):
+    ledger = RunLedger(str(tmp_path / "run_ledger.sqlite"), "corpus-hash", ledger_signature(SETTINGS))
+    path = ledger.save_model(CONFIGS[0], b"model")
+    os.remove(path)
+    assert ledger.load_models() == {}
+    assert "will be retrained" in caplog.text
+    ledger.close()
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from gensim.models import CoherenceModel
+
+from UTMA.coherence_engine import CoherenceEngine, score_model_topics, score_model_topics_gensim
+
+
+@pytest.mark.parametrize("measure", ['c_v', 'u_mass'])
+def test_score_model_topics_matches_coherence_model(lda_texts, lda_model, measure):
+    model, dictionary, _ = lda_model
+    coherence_model = CoherenceModel(model=model, texts=lda_texts, dictionary=dictionary, coherence=measure,
+                                     topn=20, processes=1)
+
+    scores = score_model_topics(model, CoherenceEngine(lda_texts, dictionary), measure, 20)
+
+    assert scores['coherence'] == pytest.approx(coherence_model.get_coherence(), rel=1e-9)
+    np.testing.assert_allclose(scores['topic_coherence'], coherence_model.get_coherence_per_topic(), rtol=1e-9)
+
+
+def test_top_words_follow_topic_coherence(lda_texts, lda_model):
+    model, dictionary, _ = lda_model
+    scores = score_model_topics(model, CoherenceEngine(lda_texts, dictionary), 'c_v', 20)
+
+    order = np.argsort(scores['topic_coherence'])[::-1]
+    expected = [[word for word, _ in model.show_topic(int(topic_id), topn=20)] for topic_id in order]
+    assert scores['top_words'] == expected
+
+
+def test_gensim_backend_matches_engine(lda_texts, lda_model):
+    model, dictionary, _ = lda_model
+
+    engine_scores = score_model_topics(model, CoherenceEngine(lda_texts, dictionary), 'c_v', 20)
+    gensim_scores = score_model_topics_gensim(model, lda_texts, dictionary, 'c_v', 20)
+
+    assert gensim_scores['top_words'] == engine_scores['top_words']
+    np.testing.assert_allclose(gensim_scores['topic_coherence'], engine_scores['topic_coherence'], rtol=1e-9)
@@ -0,0 +1,71 @@
+import json
+import os
+
+import numpy as np
+
+from UTMA.process_futures import assign_split, futures_create_lda_datasets_streaming
+from UTMA.split_manifest import SplitShardWriter, corpus_fingerprint, load_split_manifest
+
+
+def write_jsonl(path, documents):
+    with open(path, 'w', encoding='utf-8') as outfile:
+        for document in documents:
+            outfile.write(json.dumps(document) + '\n')
+
+
+def test_assign_split_is_deterministic_and_follows_ratios():
+    splits = [assign_split(index, 0.7, 0.2, seed=11) for index in range(20000)]
+
+    assert splits == [assign_split(index, 0.7, 0.2, seed=11) for index in range(20000)]
+    assert splits != [assign_split(index, 0.7, 0.2, seed=12) for index in range(20000)]
+    shares = {split: splits.count(split) / len(splits) for split in ('train', 'validation', 'test')}
+    np.testing.assert_allclose([shares['train'], shares['validation'], shares['test']], [0.7, 0.2, 0.1], atol=0.015)
+
+
+def test_streaming_split_is_reproducible(lda_texts, tmp_path):
+    source = tmp_path / "corpus.jsonl"
+    write_jsonl(source, lda_texts)
+
+    def split():
+        return [(batch['type'], batch['data']) for batch in
+                futures_create_lda_datasets_streaming(str(source), 0.6, 0.2, 16, seed=5)]
+
+    first = split()
+    assert first == split()
+    assert sorted(document for _, batch in first for document in batch) == sorted(lda_texts)
+
+
+def test_split_manifest_round_trip(lda_texts, tmp_path):
+    params = {'train_ratio': 0.6, 'validation_ratio': 0.2, 'batch_size': 16, 'encoded': False}
+    writer = SplitShardWriter(str(tmp_path), "a" * 40, 5, params)
+    assert load_split_manifest(str(tmp_path), "a" * 40, 5, params) is None
+    writer.write({'type': 'train', 'data': lda_texts[:16]})
+    writer.write({'type': 'validation', 'data': lda_texts[16:20]})
+    writer.finalize()
+
+    manifest = load_split_manifest(str(tmp_path), "a" * 40, 5, params)
+    assert [batch['type'] for batch in manifest['batches']] == ['train', 'validation']
+    assert load_split_manifest(str(tmp_path), "a" * 40, 6, params) is None
+    assert load_split_manifest(str(tmp_path), "a" * 40, 5, dict(params, batch_size=32)) is None
+    assert load_split_manifest(str(tmp_path), "b" * 40, 5, params) is None
+
+
+def test_cached_fingerprint_is_reused_until_the_source_changes(lda_texts, tmp_path):
+    source = tmp_path / "shards"
+    source.mkdir()
+    write_jsonl(source / "data-00000.jsonl", lda_texts[:10])
+    cache_file = str(tmp_path / "cache" / "corpus_fingerprints.json")
+
+    digest = corpus_fingerprint(str(source), cache_file)
+    assert digest == corpus_fingerprint(str(source))
+
+    # An unchanged source is answered from the cache without reading the files
+    with open(cache_file, encoding='utf-8') as cachefile:
+        cache = json.load(cachefile)
+    cache[os.path.abspath(source)]['fingerprint'] = "cached"
+    with open(cache_file, 'w', encoding='utf-8') as cachefile:
+        json.dump(cache, cachefile)
+    assert corpus_fingerprint(str(source), cache_file) == "cached"
+
+    write_jsonl(source / "data-00001.jsonl", lda_texts[10:20])
+    assert corpus_fingerprint(str(source), cache_file) == corpus_fingerprint(str(source)) != digest
@@ -0,0 +1,52 @@
+from collections import Counter
+
+from gensim.corpora import Dictionary
+
+from UTMA.vocabulary_stats import CountMinSketch, collect_vocabulary_stats
+
+
+def exact_dictionary(texts, no_below, no_above):
+    dictionary = Dictionary(texts)
+    dictionary.filter_extremes(no_below=no_below, no_above=no_above, keep_n=None)
+    return dictionary
+
+
+def test_vocabulary_matches_exact_dictionary(lda_texts):
+    # The head never fills, so every count is exact and pruning must agree with filter_extremes
+    stats = collect_vocabulary_stats(lda_texts, chunk_size=16, sketch_width=1024)
+    assert stats.evictions == 0
+    pruned = stats.to_dictionary(no_below=3, no_above=0.4, keep_n=None)
+    exact = exact_dictionary(lda_texts, no_below=3, no_above=0.4)
+
+    assert set(pruned.token2id) == set(exact.token2id)
+    for term, token_id in pruned.token2id.items():
+        assert pruned.dfs[token_id] == exact.dfs[exact.token2id[term]]
+        assert pruned.cfs[token_id] == exact.cfs[exact.token2id[term]]
+    assert (pruned.num_docs, pruned.num_pos) == (len(lda_texts), sum(len(text) for text in lda_texts))
+    # Ids are assigned by decreasing document frequency
+    ordered = [pruned.dfs[token_id] for token_id in range(len(pruned))]
+    assert ordered == sorted(ordered, reverse=True)
+
+
+def test_vocabulary_with_evictions_keeps_frequent_terms(lda_texts):
+    stats = collect_vocabulary_stats(lda_texts, chunk_size=8, max_head_terms=40, sketch_width=4096)
+    assert stats.evictions > 0
+    assert len(stats) <= 40
+
+    exact_df = Counter(term for text in lda_texts for term in set(text))
+    # Head counts are exact or, for readmitted terms, overestimates
+    for term, (df, _) in stats.head.items():
+        assert df >= exact_df[term]
+    # The most frequent terms never leave the head
+    top_terms = [term for term, _ in exact_df.most_common(10)]
+    assert set(top_terms) <= set(stats.head)
+
+
+def test_count_min_sketch_never_undercounts():
+    keys = [f"term{index}" for index in range(500)]
+    counts = list(range(1, 501))
+    sketch = CountMinSketch(width=256, depth=4)
+    columns = sketch.columns(keys)
+    sketch.add(columns, counts)
+    estimates = sketch.estimate(columns)
+    assert all(estimate >= count for estimate, count in zip(estimates.tolist(), counts))
@@ -76,6 +76,24 @@ def task_callback(future):
     else:
         print("Task completed successfully")
 
+def gather_task_results(futures):
+    """Collect the results of finished tasks, flattening the per-configuration lists returned by fused tasks."""
+    results = []
+    for future in futures:
+        result = future.result()
+        results.extend(result if isinstance(result, list) else [result])
+    return results
+
+def record_completed_tasks(run_ledger, phase, submitted_tasks):
+    """Mark the tasks of finished futures complete in the run ledger; `submitted_tasks` holds (future, batch_id, configs)."""
+    for future, batch_id, configs in submitted_tasks:
+        if future.status == 'finished':
+            run_ledger.mark_complete(phase, batch_id, configs)
+
+def trained_model_key(n_topics, alpha_value, beta_value):
+    """Key of a trained model in `train_models_dict`; results carry alpha and beta as strings."""
+    return (n_topics, str(alpha_value), str(beta_value))
+
 def parse_args():
     """Parse command-line arguments for configuring the topic analysis script."""
     parser = argparse.ArgumentParser(description="Configure the topic analysis script using command-line arguments.")
@@ -89,15 +107,31 @@ def parse_args():
     
     # Corpus and Data Arguments
     parser.add_argument("--corpus_label", type=str, help="Unique label used to identify the corpus in outputs and logs. Must be suitable as a PostgreSQL table name.")
-    parser.add_argument("--data_source", type=str, help="File path to the JSON file containing the data for analysis.")
+    parser.add_argument("--data_source", type=str, help="File path to the JSON file containing the data for analysis. A '.jsonl' file (one tokenized document per line) or a directory of JSONL shards from UTMA.preprocess is streamed instead of loaded whole.")
     parser.add_argument("--train_ratio", type=float, help="Fraction of data to use for training (e.g., 0.8 for 80% training and 20% testing).")
     parser.add_argument("--validation_ratio", type=float, help="Fraction of data to use for validation.")
+    parser.add_argument("--split_dir", type=str, help="Directory for the persisted train/validation/test split. Batches are written there as shards with a manifest keyed by corpus hash and random_state; later runs on the same corpus let the workers load the shards directly instead of re-reading and re-scattering the corpus.")
+    parser.add_argument("--encoded_corpus", type=str, help="Directory for the integer-encoded corpus (vocabulary + token-id/offset .npy arrays). Built from data_source on first use and whenever data_source changes, memory-mapped afterwards, and scattered as compact arrays.")
+    parser.add_argument("--dedup", action="store_true", help="Remove exact and near-duplicate documents (MinHash with LSH banding, computed on the Dask workers) before the data is split.")
+    parser.add_argument("--dedup_threshold", type=float, help="Near-duplicate detection: minimum estimated Jaccard similarity of token 3-gram sets for two documents to count as duplicates (default 0.8).")
+    parser.add_argument("--phrases", action="store_true", help="Detect bigram phrases on the Dask workers before ingestion and append them to the documents. Requires a JSONL data_source.")
+    parser.add_argument("--phrase_min_count", type=int, help="Phrase detection: ignore phrases with a total count below this value (default 20).")
+    parser.add_argument("--phrase_threshold", type=float, help="Phrase detection: score threshold for forming a phrase (default 10.0).")
+    parser.add_argument("--trigrams", action="store_true", help="Phrase detection: also learn trigrams over the detected bigrams.")
 
     # Topic Modeling Parameters
     parser.add_argument("--start_topics", type=int, help="Starting number of topics for evaluation.")
     parser.add_argument("--end_topics", type=int, help="Ending number of topics for evaluation.")
     parser.add_argument("--step_size", type=int, help="Incremental step size for increasing the topic count between start_topics and end_topics.")
 
+    # Corpus Preparation
+    parser.add_argument("--shared_dictionary", action="store_true", help="Build one pruned Dictionary from the training split and share it with all tasks instead of building one per task.")
+    parser.add_argument("--no_below", type=int, help="Shared dictionary: keep tokens that appear in at least this many training documents (default 5).")
+    parser.add_argument("--no_above", type=float, help="Shared dictionary: keep tokens that appear in at most this fraction of training documents (default 0.5).")
+    parser.add_argument("--keep_n", type=int, help="Shared dictionary: keep at most this many of the most frequent tokens (default 100000).")
+    parser.add_argument("--prune_vocabulary", action="store_true", help="Collect document and term frequencies in a streaming pass with bounded memory and build the shared dictionary from them before ingestion, using --no_below, --no_above and --keep_n. Implies --shared_dictionary.")
+    parser.add_argument("--vocab_head_terms", type=int, help="Vocabulary pruning: maximum number of exactly counted terms; rarer terms are tracked in count-min sketches (default 1000000).")
+
     # System Resource Management
     parser.add_argument("--num_workers", type=int, help="Minimum number of CPU cores to utilize for parallel processing.")
     parser.add_argument("--max_workers", type=int, help="Maximum number of CPU cores allocated for parallel processing.")
@@ -106,6 +140,7 @@ def parse_args():
     parser.add_argument("--mem_threshold", type=int, help="Memory usage threshold (in GB) to trigger data spill to disk.")
     parser.add_argument("--max_cpu", type=float, help="Maximum CPU utilization percentage to prevent overuse of resources.")
     parser.add_argument("--mem_spill", type=str, help="Directory for temporarily storing data when memory limits are exceeded.")
+    parser.add_argument("--bow_cache_mb", type=int, help="Per-worker budget (in MB) of the cache of Dictionaries and bag-of-words corpora reused across grid tasks (default 512, 0 disables).")
 
     # Gensim Model Settings
     parser.add_argument("--passes", type=int, help="Number of complete passes through the data for the Gensim topic model.")
@@ -113,10 +148,32 @@ def parse_args():
     parser.add_argument("--update_every", type=int, help="Frequency (in number of documents) to update model parameters during training.")
     parser.add_argument("--eval_every", type=int, help="Frequency (in iterations) for evaluating model perplexity and logging progress.")
     parser.add_argument("--random_state", type=int, help="Seed value to ensure reproducibility of results.")
-    parser.add_argument("--per_word_topics", type=bool, help="Whether to compute per-word topic probabilities (True/False).")
+    parser.add_argument("--fuse_width", type=int, help="Number of hyperparameter combinations of the same phase trained or evaluated together in one task per batch, sharing the prepared corpus and coherence statistics (default 1, no fusion).")
+    parser.add_argument("--data_parallel", action="store_true", help="Train one model per configuration over all training batches with data-parallel EM (E-step on the workers, M-step on the driver each pass) instead of one model per batch. Implies --shared_dictionary.")
+    parser.add_argument("--consensus", action="store_true", help="Merge the per-batch models of each configuration into one consensus model (Hungarian topic alignment and averaging on a Dask worker), used for validation and test. Implies --shared_dictionary.")
+    parser.add_argument("--early_stopping", action="store_true", help="Train passes one at a time and stop once the per-word bound of a held-out slice of the training batch stops improving (at most --passes passes).")
+    parser.add_argument("--early_stopping_tolerance", type=float, help="Early stopping: minimum relative improvement of the held-out bound per pass (default 0.001).")
+    parser.add_argument("--early_stopping_patience", type=int, help="Early stopping: passes without sufficient improvement before training stops (default 2).")
+    parser.add_argument("--early_stopping_holdout", type=float, help="Early stopping: fraction of the training batch held out to track convergence (default 0.1).")
+    parser.add_argument("--search", type=str, choices=SEARCH_MODES, help="Hyperparameter search: 'grid' (random 37.5%% sample of the grid, default) or 'successive_halving' (every configuration trains briefly on a subsample and only the best continue to full training), or 'bayesian' (a Gaussian-process surrogate proposes topics and continuous alpha/eta from completed trials).")
+    parser.add_argument("--halving_eta", type=int, help="Successive halving: keep the best 1/eta configurations per rung and give the next rung eta times the passes and data (default 3).")
+    parser.add_argument("--search_metric", type=str, choices=SEARCH_METRICS, help="Successive halving and Bayesian search: rank by c_v 'coherence' of the training batch or held-out 'perplexity' on the validation batches (default coherence).")
+    parser.add_argument("--halving_min_passes", type=int, help="Successive halving: minimum passes of the first rung (default 1).")
+    parser.add_argument("--search_trials", type=int, help="Bayesian search: number of configurations evaluated (default 30).")
+    parser.add_argument("--search_in_flight", type=int, help="Bayesian search: trials evaluated concurrently on the cluster (default: number of Dask workers).")
+    parser.add_argument("--search_batches", type=int, help="Bayesian search: training batches each trial is trained and scored on (default 1).")
+    parser.add_argument("--search_top", type=int, help="Bayesian search: best configurations passed to full training, validation and test (default 3).")
+    parser.add_argument("--resume", action="store_true", help="Resume an interrupted run: repeat its combinations, skip the tasks the run ledger marks complete and reload their trained models for validation and test.")
+    parser.add_argument("--ledger", type=str, help="SQLite run ledger recording completed tasks and trained models (default <root_dir>/metadata/run_ledger.sqlite).")
+    parser.add_argument("--lda_backend", type=str, choices=LDA_BACKENDS, help="Training backend: 'single' (LdaModel, default), 'multicore' (LdaMulticore within the Dask worker's threads, shared by its concurrent tasks), or 'auto' (LdaMulticore only while fewer training tasks are queued than there are worker threads).")
+    parser.add_argument("--per_word_topics", type=lambda value: value.strip().lower() in ("true", "1", "yes"), help="Whether to compute per-word topic probabilities (True/False).")
+    parser.add_argument("--compact_models", action="store_true", help="Serialize trained models in a compact float32 numpy format (topic-word lambda, priors and vocabulary only) instead of pickling the full LdaModel.")
+    parser.add_argument("--coherence_backend", type=str, choices=COHERENCE_BACKENDS, help="Coherence scoring: 'engine' (co-occurrence statistics computed once per batch and cached on the worker, default) or 'gensim' (a CoherenceModel per model, as a fallback).")
+    parser.add_argument("--trace_memory", action="store_true", help="Record the tracemalloc peak of every task stage next to its wall time in the stage_timings column (slows allocation; for diagnostic runs).")
 
     # Batch Processing Parameters
     parser.add_argument("--futures_batches", type=int, help="Number of batches to process concurrently.")
+    parser.add_argument("--auto_batch", action="store_true", help="Sample the data source, measure the real size of the documents, and derive futures_batches, base_batch_size and max_batch_size from --max_memory and the memory psutil reports. Explicit values take precedence.")
     parser.add_argument("--base_batch_size", type=int, help="Initial number of documents processed in parallel in each batch.")
     parser.add_argument("--max_batch_size", type=int, help="Maximum batch size, representing the upper limit of documents processed in parallel.")
     parser.add_argument("--increase_factor", type=float, help="Percentage increase in batch size after successful processing.")
@@ -159,6 +216,8 @@ required_args = {
 
 # Check for required arguments and log error if missing
 for arg, error_msg in required_args.items():
+    if arg == "futures_batches" and args.auto_batch:
+        continue
     if getattr(args, arg) is None:
         logging.error(error_msg)
         print(error_msg)
@@ -175,6 +234,17 @@ CONNECTION_STRING = f"postgresql://{USERNAME}:{PASSWORD}@{HOST}:{PORT}/{DATABASE
 CORPUS_LABEL = args.corpus_label
 DATA_SOURCE = args.data_source
 
+ENCODED_CORPUS_DIR = args.encoded_corpus
+SPLIT_DIR = args.split_dir
+
+DEDUP = args.dedup
+DEDUP_THRESHOLD = args.dedup_threshold if args.dedup_threshold is not None else 0.8
+
+PHRASES = args.phrases
+PHRASE_MIN_COUNT = args.phrase_min_count if args.phrase_min_count is not None else 20
+PHRASE_THRESHOLD = args.phrase_threshold if args.phrase_threshold is not None else 10.0
+TRIGRAMS = args.trigrams
+
 TRAIN_RATIO = args.train_ratio if args.train_ratio is not None else 0.70
 VALIDATION_RATIO = args.validation_ratio if args.validation_ratio is not None else 0.15
 
@@ -182,6 +252,15 @@ START_TOPICS = args.start_topics if args.start_topics is not None else 1
 END_TOPICS = args.end_topics
 STEP_SIZE = args.step_size
 
+DATA_PARALLEL = args.data_parallel
+CONSENSUS = args.consensus and not DATA_PARALLEL
+SHARED_DICTIONARY = args.shared_dictionary or DATA_PARALLEL or CONSENSUS
+NO_BELOW = args.no_below if args.no_below is not None else 5
+NO_ABOVE = args.no_above if args.no_above is not None else 0.5
+KEEP_N = args.keep_n if args.keep_n is not None else 100000
+PRUNE_VOCABULARY = args.prune_vocabulary
+VOCAB_HEAD_TERMS = args.vocab_head_terms if args.vocab_head_terms is not None else 1000000
+
 CORES = args.num_workers if args.num_workers is not None else 1
 MAXIMUM_CORES = args.max_workers if args.max_workers is not None else 1
 THREADS_PER_CORE = args.num_threads if args.num_threads is not None else 1
@@ -191,6 +270,7 @@ MEMORY_UTILIZATION_THRESHOLD = (args.mem_threshold * (1024 ** 3)) if args.mem_th
 CPU_UTILIZATION_THRESHOLD = args.max_cpu if args.max_cpu is not None else 120
 DASK_DIR = args.mem_spill if args.mem_spill else os.path.expanduser("~/temp/utma/max_spill")
 os.makedirs(DASK_DIR, exist_ok=True)
+BOW_CACHE_BYTES = (args.bow_cache_mb if args.bow_cache_mb is not None else 512) * (1024 ** 2)
 
 # Model configurations
 PASSES = args.passes if args.passes is not None else 15
@@ -199,12 +279,28 @@ UPDATE_EVERY = args.update_every if args.update_every is not None else 5
 EVAL_EVERY = args.eval_every if args.eval_every is not None else 5
 RANDOM_STATE = args.random_state if args.random_state is not None else 50
 PER_WORD_TOPICS = args.per_word_topics if args.per_word_topics is not None else True
-
-# Batch configurations
-FUTURES_BATCH_SIZE = args.futures_batches # number of input docuemtns to read in batches
-BATCH_SIZE = args.base_batch_size if args.base_batch_size is not None else FUTURES_BATCH_SIZE # number of documents used in each iteration of creating/training/saving 
-MAX_BATCH_SIZE = args.max_batch_size if args.max_batch_size is not None else FUTURES_BATCH_SIZE * 10 # the maximum number of documents(ie batches) assigned depending upon sys performance
-MIN_BATCH_SIZE = max(1, math.ceil(MAX_BATCH_SIZE * .10)) # the fewest number of docs(ie batches) to be processed if system is under stress
+COMPACT_MODELS = args.compact_models
+TRACE_MEMORY = args.trace_memory
+COHERENCE_BACKEND = args.coherence_backend if args.coherence_backend is not None else 'engine'
+LDA_BACKEND = args.lda_backend if args.lda_backend is not None else 'single'
+FUSE_WIDTH = max(1, args.fuse_width) if args.fuse_width is not None else 1
+SEARCH_MODE = args.search if args.search is not None else 'grid'
+EARLY_STOPPING = {
+    'tolerance': args.early_stopping_tolerance if args.early_stopping_tolerance is not None else EARLY_STOPPING_DEFAULTS['tolerance'],
+    'patience': args.early_stopping_patience if args.early_stopping_patience is not None else EARLY_STOPPING_DEFAULTS['patience'],
+    'holdout_fraction': args.early_stopping_holdout if args.early_stopping_holdout is not None else EARLY_STOPPING_DEFAULTS['holdout_fraction'],
+} if args.early_stopping else None
+HALVING_ETA = args.halving_eta if args.halving_eta is not None else 3
+SEARCH_METRIC = args.search_metric if args.search_metric is not None else 'coherence'
+HALVING_MIN_PASSES = args.halving_min_passes if args.halving_min_passes is not None else 1
+SEARCH_TRIALS = args.search_trials if args.search_trials is not None else 30
+SEARCH_IN_FLIGHT = args.search_in_flight
+SEARCH_BATCHES = args.search_batches if args.search_batches is not None else 1
+SEARCH_TOP = args.search_top if args.search_top is not None else 3
+RESUME = args.resume
+
+# Batch configurations (FUTURES_BATCH_SIZE, BATCH_SIZE, MAX_BATCH_SIZE and MIN_BATCH_SIZE) are set once the
+# data source is final, after the optional deduplication and phrase stages (see below)
 
 # Batch size adjustments and retry logic
 INCREASE_FACTOR = args.increase_factor if args.increase_factor is not None else 1.05
@@ -274,6 +370,11 @@ if 'LOG_START_TIME' not in os.environ:
 # Use the fixed timestamp from the environment variable
 #log_filename = f"log-{os.environ['LOG_START_TIME']}.log"
 log_filename = f"log-{os.environ['LOG_START_TIME']}.gz"
+
+# JSON file collecting corpus- and run-level statistics, such as the pruned vocabulary size
+RUN_METADATA_FILE = os.path.join(METADATA_DIR, f"{CORPUS_LABEL}-run-{os.environ['LOG_START_TIME']}.json")
+# SQLite ledger of completed tasks and trained models, read by --resume
+LEDGER_PATH = args.ledger if args.ledger is not None else os.path.join(METADATA_DIR, LEDGER_FILE)
 LOGFILE = os.path.join(LOG_DIR, log_filename)  # Directly join log_filename with LOG_DIRECTORY
 
 # Database connection parameters
@@ -421,6 +522,44 @@ if __name__=="__main__":
         sys.exit()
 
 
+    # Install the worker-side BoW cache; workers added later by adaptive scaling receive it as well
+    if BOW_CACHE_BYTES > 0:
+        client.register_plugin(BowCachePlugin(max_bytes=BOW_CACHE_BYTES))
+
+    # Near duplicates are removed on the workers before any split; the first occurrence of each group is kept
+    if DEDUP:
+        print("Removing duplicate documents...")
+        DATA_SOURCE, dedup_summary = deduplicate_corpus(client, DATA_SOURCE, os.path.join(ROOT_DIR, "dedup"),
+                                                        threshold=DEDUP_THRESHOLD, seed=RANDOM_STATE)
+        update_run_metadata(RUN_METADATA_FILE, deduplication=dedup_summary)
+        print(f"Kept {dedup_summary['documents_out']} of {dedup_summary['documents_in']} documents "
+              f"({dedup_summary['exact_duplicates']} exact, {dedup_summary['near_duplicates']} near duplicates removed).")
+
+    # Phrase detection runs on the workers over the JSONL shards; its output becomes the data source
+    if PHRASES:
+        if not is_jsonl_source(DATA_SOURCE):
+            logging.error("Phrase detection requires a '.jsonl' file or a directory of JSONL shards as data_source.")
+            client.close()
+            cluster.close()
+            sys.exit()
+        print("Detecting phrases...")
+        DATA_SOURCE = detect_phrases(client, DATA_SOURCE, os.path.join(ROOT_DIR, "phrases"),
+                                     min_count=PHRASE_MIN_COUNT, threshold=PHRASE_THRESHOLD, trigrams=TRIGRAMS)
+
+    # Batch configurations
+    # --auto_batch measures a sample of the data source instead of relying on hand-tuned batch sizes; it runs after
+    # deduplication and phrase detection, so it measures the documents that are actually split and trained on
+    BATCH_ESTIMATE = recommend_batch_sizes(DATA_SOURCE, max_memory_gb=args.max_memory, n_workers=CORES, threads_per_worker=THREADS_PER_CORE) if args.auto_batch else None
+    if BATCH_ESTIMATE is not None:
+        print(f"Auto batch: futures_batches={BATCH_ESTIMATE['futures_batches']}, base_batch_size={BATCH_ESTIMATE['base_batch_size']}, "
+              f"max_batch_size={BATCH_ESTIMATE['max_batch_size']} (~{BATCH_ESTIMATE['estimated_documents']} documents).")
+        update_run_metadata(RUN_METADATA_FILE, batch_estimate=BATCH_ESTIMATE)
+
+    FUTURES_BATCH_SIZE = args.futures_batches if args.futures_batches is not None else BATCH_ESTIMATE['futures_batches'] # number of input docuemtns to read in batches
+    BATCH_SIZE = args.base_batch_size if args.base_batch_size is not None else (BATCH_ESTIMATE['base_batch_size'] if BATCH_ESTIMATE else FUTURES_BATCH_SIZE) # number of documents used in each iteration of creating/training/saving 
+    MAX_BATCH_SIZE = args.max_batch_size if args.max_batch_size is not None else (BATCH_ESTIMATE['max_batch_size'] if BATCH_ESTIMATE else FUTURES_BATCH_SIZE * 10) # the maximum number of documents(ie batches) assigned depending upon sys performance
+    MIN_BATCH_SIZE = max(1, math.ceil(MAX_BATCH_SIZE * .10)) # the fewest number of docs(ie batches) to be processed if system is under stress
+
     print("Creating training and evaluation samples...")
 
     started = time()
@@ -430,19 +569,96 @@ if __name__=="__main__":
     scattered_test_data_futures = []
     all_futures = []
     
+    # Vocabulary of the integer-encoded corpus; shared with every worker once instead of per batch
+    vocabulary = None
+    vocabulary_future = None
+    # Training Dictionary built once per corpus during ingestion when --shared_dictionary is set
+    training_dictionary = None
+    prepared_dictionary_future = None
+
+    # The vocabulary is counted and pruned in one streaming pass before any batch is scattered or model built
+    if PRUNE_VOCABULARY:
+        print("Collecting vocabulary statistics...")
+        vocabulary_documents = iter_documents(DATA_SOURCE)
+        if ENCODED_CORPUS_DIR or is_jsonl_source(DATA_SOURCE):
+            # Same hash-based split as the dataset generators, so only training documents are counted
+            vocabulary_documents = (
+                document for record_index, document in enumerate(vocabulary_documents)
+                if assign_split(record_index, TRAIN_RATIO, VALIDATION_RATIO, RANDOM_STATE) == 'train'
+            )
+        vocabulary_stats = collect_vocabulary_stats(vocabulary_documents, max_head_terms=VOCAB_HEAD_TERMS)
+        prepared_dictionary = PreparedDictionary(vocabulary_stats.to_dictionary(no_below=NO_BELOW, no_above=NO_ABOVE, keep_n=KEEP_N))
+        prepared_dictionary_future = client.scatter([prepared_dictionary], broadcast=True)[0]
+
+        update_run_metadata(
+            RUN_METADATA_FILE,
+            vocabulary_stats=vocabulary_stats.summary(),
+            vocabulary_size=len(prepared_dictionary),
+            vocabulary_thresholds={'no_below': NO_BELOW, 'no_above': NO_ABOVE, 'keep_n': KEEP_N},
+            estimated_model_bytes=estimate_lda_model_bytes(len(prepared_dictionary), END_TOPICS),
+        )
+        print(f"Pruned vocabulary contains {len(prepared_dictionary)} tokens "
+              f"(estimated peak model memory at {END_TOPICS} topics: "
+              f"{estimate_lda_model_bytes(len(prepared_dictionary), END_TOPICS) / 1024 ** 2:.1f} MB).")
+
+    # Content hash of the corpus, shared by the encoded corpus, the persisted split and the run ledger; cached next
+    # to the split manifests (or the run metadata), so it is recomputed only when a file's size or mtime changes
+    corpus_hash = corpus_fingerprint(DATA_SOURCE, os.path.join(SPLIT_DIR or METADATA_DIR, FINGERPRINT_CACHE_FILE))
+
+    if ENCODED_CORPUS_DIR:
+        # An encoded corpus of an older version of the data source is rewritten
+        if not encoded_corpus_exists(ENCODED_CORPUS_DIR, corpus_hash):
+            logging.info(f"Writing integer-encoded corpus to {ENCODED_CORPUS_DIR}")
+            write_encoded_corpus(iter_documents(DATA_SOURCE), ENCODED_CORPUS_DIR, corpus_hash)
+        encoded_corpus = load_encoded_corpus(ENCODED_CORPUS_DIR, mmap_mode='r')
+        vocabulary = encoded_corpus.vocabulary
+        # Wrapped in a list so the vocabulary is scattered as one object rather than token by token
+        vocabulary_future = client.scatter([vocabulary], broadcast=True)[0]
+        dataset_batches = futures_create_encoded_lda_datasets(encoded_corpus, TRAIN_RATIO, VALIDATION_RATIO, FUTURES_BATCH_SIZE, seed=RANDOM_STATE)
+    # JSONL input is read line by line and split in a single pass, so scattering overlaps with reading
+    elif is_jsonl_source(DATA_SOURCE):
+        dataset_batches = futures_create_lda_datasets_streaming(DATA_SOURCE, TRAIN_RATIO, VALIDATION_RATIO, FUTURES_BATCH_SIZE, seed=RANDOM_STATE)
+    else:
+        dataset_batches = futures_create_lda_datasets(DATA_SOURCE, TRAIN_RATIO, VALIDATION_RATIO, FUTURES_BATCH_SIZE)
+
+    # A persisted split of the same corpus and seed replaces reading, splitting and scattering altogether;
+    # otherwise the batches are written to disk as they are generated and the workers load them from there
+    split_writer = None
+    if SPLIT_DIR:
+        split_params = {'train_ratio': TRAIN_RATIO, 'validation_ratio': VALIDATION_RATIO,
+                        'batch_size': FUTURES_BATCH_SIZE, 'encoded': bool(ENCODED_CORPUS_DIR)}
+        split_manifest = load_split_manifest(SPLIT_DIR, corpus_hash, RANDOM_STATE, split_params)
+        if split_manifest is not None:
+            print(f"Loading persisted split of corpus {corpus_hash[:16]} (seed {RANDOM_STATE}) on the workers...")
+            split_futures = submit_split_shards(client, split_manifest)
+            scattered_train_data_futures = split_futures['train']
+            scattered_validation_data_futures = split_futures['validation']
+            scattered_test_data_futures = split_futures['test']
+            if SHARED_DICTIONARY and prepared_dictionary_future is None:
+                for batch in split_manifest['batches']:
+                    if batch['type'] == 'train':
+                        training_dictionary = update_training_dictionary(training_dictionary, load_split_shard(batch['path']), vocabulary)
+            dataset_batches = []
+            batch_info = {}  # referenced by the training submissions below
+        else:
+            split_writer = SplitShardWriter(SPLIT_DIR, corpus_hash, RANDOM_STATE, split_params)
+
     # Process each batch as it is generated
-    for batch_info in futures_create_lda_datasets(DATA_SOURCE, TRAIN_RATIO, VALIDATION_RATIO, FUTURES_BATCH_SIZE):
+    for batch_info in dataset_batches:
         #print(f"Received batch: {batch_info['type']}")  # Debugging output
         if batch_info['type'] == "train":
             # Handle training data
             #print("We are inside the IF/ELSE block for producing TRAIN scatter.")
             try:
-                scattered_future = client.scatter(batch_info['data'])
+                scattered_future = split_writer.write_and_submit(client, batch_info) if split_writer else client.scatter(batch_info['data'])
                 #scattered_future.add_done_callback(task_callback)
                 # After yielding each batch
                 #print(f"Submitted {batch_info['type']} batch of size {len(batch_info['data'])} to Dask.")
 
                 scattered_train_data_futures.append(scattered_future)
+
+                if SHARED_DICTIONARY and prepared_dictionary_future is None:
+                    training_dictionary = update_training_dictionary(training_dictionary, batch_info['data'], vocabulary)
                 
             except Exception as e:
                 logging.error(f"There was an issue with creating the TRAIN scattered_future list: {e}")
@@ -450,7 +666,7 @@ if __name__=="__main__":
         elif batch_info['type'] == 'validation':
             # Handle validation data
             try:
-                scattered_future = client.scatter(batch_info['data'])
+                scattered_future = split_writer.write_and_submit(client, batch_info) if split_writer else client.scatter(batch_info['data'])
                 #scattered_future.add_done_callback(task_callback)
                 # After yielding each batch
                 #print(f"Submitted {batch_info['type']} batch of size {len(batch_info['data'])} to Dask.")
@@ -462,7 +678,7 @@ if __name__=="__main__":
         elif batch_info['type'] == 'test':
             # Handle test data
             try:
-                scattered_future = client.scatter(batch_info['data'])
+                scattered_future = split_writer.write_and_submit(client, batch_info) if split_writer else client.scatter(batch_info['data'])
                 #scattered_future.add_done_callback(task_callback)
                 # After yielding each batch
                 #print(f"Submitted {batch_info['type']} batch of size {len(batch_info['data'])} to Dask.")
@@ -473,6 +689,15 @@ if __name__=="__main__":
         else:
             logging.error("There are documents not being scattered across the workers.")
         
+    if split_writer is not None:
+        split_writer.finalize()
+
+    # Prune the training Dictionary once, pickle it once, and share it with every worker by reference
+    if SHARED_DICTIONARY and training_dictionary is not None:
+        prepared_dictionary = prepare_training_dictionary(training_dictionary, no_below=NO_BELOW, no_above=NO_ABOVE, keep_n=KEEP_N)
+        prepared_dictionary_future = client.scatter([prepared_dictionary], broadcast=True)[0]
+        print(f"Shared training dictionary contains {len(prepared_dictionary)} tokens.")
+
     #print(f"Completed creation of train-validation-test split in {round((time() - started)/60,2)} minutes.\n")
     logging.info(f"Completed creation of train-validation-test split in {round((time() - started)/60,2)} minutes.\n")
     #print("Document scatter across workers complete...\n")
@@ -484,6 +709,21 @@ if __name__=="__main__":
     train_futures = []  # List to store futures for training
     validation_futures = []  # List to store futures for validation
     test_futures = []  # List to store futures for testing
+
+    # Completed tasks are recorded in the run ledger under the corpus hash and the settings that shape the
+    # split and the models, so --resume only reuses work done on the same data with the same settings
+    run_ledger = RunLedger(LEDGER_PATH, corpus_hash, ledger_signature({
+        'train_ratio': TRAIN_RATIO, 'validation_ratio': VALIDATION_RATIO, 'batch_size': FUTURES_BATCH_SIZE,
+        'encoded': bool(ENCODED_CORPUS_DIR), 'random_state': RANDOM_STATE, 'topics': [START_TOPICS, END_TOPICS, STEP_SIZE],
+        'passes': PASSES, 'iterations': ITERATIONS, 'update_every': UPDATE_EVERY, 'eval_every': EVAL_EVERY,
+        'per_word_topics': PER_WORD_TOPICS, 'shared_dictionary': SHARED_DICTIONARY, 'prune_vocabulary': PRUNE_VOCABULARY,
+        'vocabulary_thresholds': [NO_BELOW, NO_ABOVE, KEEP_N], 'data_parallel': DATA_PARALLEL, 'consensus': CONSENSUS,
+        'early_stopping': EARLY_STOPPING, 'search': SEARCH_MODE,
+    }))
+    if RESUME:
+        print(f"Resuming from run ledger {LEDGER_PATH}: {run_ledger.summary()}")
+        if not (SPLIT_DIR or ENCODED_CORPUS_DIR or is_jsonl_source(DATA_SOURCE)):
+            logging.warning("The split of this data source is not deterministic; use --split_dir so resumed batch ids refer to the same documents.")
    
     num_topics = len(range(START_TOPICS, END_TOPICS + 1, STEP_SIZE))
 
@@ -543,6 +783,61 @@ if __name__=="__main__":
     # Determine undrawn combinations
     undrawn_combinations = list(set(combinations) - set(random_combinations))
 
+    # --resume: the combinations stored by the interrupted run replace sampling and search
+    resumed_combinations = run_ledger.load_plan() if RESUME else None
+    if resumed_combinations is not None:
+        random_combinations = resumed_combinations
+        undrawn_combinations = list(set(combinations) - set(random_combinations))
+
+    # Successive halving replaces the random sample: every configuration of the grid competes in short,
+    # subsampled rungs, and only the survivors go through the full train/validation/test loop below.
+    elif SEARCH_MODE == 'successive_halving':
+        search_configs = list(itertools.product(range(START_TOPICS, END_TOPICS + 1, STEP_SIZE), alpha_values, beta_values))
+        worker_threads = [worker["nthreads"] for worker in client.scheduler_info()["workers"].values()]
+        search_workers = len(worker_threads)
+        search_backend, search_lda_workers = select_lda_backend(LDA_BACKEND, len(search_configs), worker_threads)
+        search_started = time()
+        surviving_configs, search_history = successive_halving(
+            client, search_configs, scattered_train_data_futures, scattered_validation_data_futures, PASSES,
+            metric=SEARCH_METRIC, eta=HALVING_ETA, min_passes=HALVING_MIN_PASSES, fuse_width=FUSE_WIDTH,
+            random_state=RANDOM_STATE, iterations=ITERATIONS, update_every=UPDATE_EVERY, eval_every=EVAL_EVERY,
+            cores=search_workers, vocabulary=vocabulary_future, prepared_dictionary=prepared_dictionary_future,
+            backend=search_backend, lda_workers=search_lda_workers
+        )
+        random_combinations = [config + (phase,) for config in surviving_configs for phase in phases]
+        undrawn_combinations = list(set(combinations) - set(random_combinations))
+        update_run_metadata(RUN_METADATA_FILE, successive_halving={
+            'eta': HALVING_ETA, 'metric': SEARCH_METRIC, 'minutes': round((time() - search_started) / 60, 2),
+            'survivors': [list(config) for config in surviving_configs], 'rungs': search_history,
+        })
+        print(f"Successive halving kept {len(surviving_configs)} of {len(search_configs)} configurations for full training.")
+
+    # Bayesian optimization also replaces the random sample; alpha and eta are searched as continuous values
+    elif SEARCH_MODE == 'bayesian':
+        worker_threads = [worker["nthreads"] for worker in client.scheduler_info()["workers"].values()]
+        search_workers = len(worker_threads)
+        search_in_flight = SEARCH_IN_FLIGHT if SEARCH_IN_FLIGHT is not None else search_workers
+        search_backend, search_lda_workers = select_lda_backend(LDA_BACKEND, search_in_flight * SEARCH_BATCHES, worker_threads)
+        optimizer = BayesianOptimizer(range(START_TOPICS, END_TOPICS + 1, STEP_SIZE), seed=RANDOM_STATE)
+        search_started = time()
+        search_history = bayesian_search(
+            client, optimizer, SEARCH_TRIALS, search_in_flight, scattered_train_data_futures,
+            scattered_validation_data_futures, PASSES, metric=SEARCH_METRIC, num_batches=SEARCH_BATCHES,
+            random_state=RANDOM_STATE, iterations=ITERATIONS, update_every=UPDATE_EVERY, eval_every=EVAL_EVERY,
+            cores=search_workers, vocabulary=vocabulary_future, prepared_dictionary=prepared_dictionary_future,
+            backend=search_backend, lda_workers=search_lda_workers
+        )
+        best_configs = optimizer.best(SEARCH_TOP)
+        random_combinations = [config + (phase,) for config in best_configs for phase in phases]
+        undrawn_combinations = []
+        update_run_metadata(RUN_METADATA_FILE, bayesian_search={
+            'metric': SEARCH_METRIC, 'in_flight': search_in_flight, 'minutes': round((time() - search_started) / 60, 2),
+            'best': [list(config) for config in best_configs], 'trials': search_history,
+        })
+        print(f"Bayesian search evaluated {len(search_history)} configurations; the best {len(best_configs)} go to full training.")
+
+    run_ledger.save_plan(random_combinations)
+
     print(f"The random sample combinations contain {len(random_combinations)}. This leaves {len(undrawn_combinations)} undrawn combinations.\n")
     #for record in random_combinations:
     #    print("This is the random combination", record)
@@ -571,10 +866,24 @@ if __name__=="__main__":
     # Initialize combined visualization lists outside the loop
     completed_pylda_vis = []
     completed_pcoa_vis = []
-    train_models_dict = {}
+    train_models_dict = run_ledger.load_models() if RESUME else {}
+    consensus_summaries = []
+    model_sizes = []  # Serialized sizes of the trained models, reported in the run metadata
     completed_train_futures, completed_validation_futures, completed_test_futures = [], [], []
+
+    # Consecutive combinations of the same phase are fused into groups of up to FUSE_WIDTH; each group is
+    # submitted as one task per batch (see train_models_fused). With FUSE_WIDTH 1 every group is a single combination.
+    combination_groups = []
+    for combination in sorted_combinations:
+        if combination_groups and len(combination_groups[-1]) < FUSE_WIDTH and combination_groups[-1][0][3] == combination[3]:
+            combination_groups[-1].append(combination)
+        else:
+            combination_groups.append([combination])
+
     # Process sorted combinations by train, validation, and test phases
-    for i, (n_topics, alpha_value, beta_value, train_eval_type) in enumerate(sorted_combinations):
+    for i, combination_group in enumerate(combination_groups):
+        n_topics, alpha_value, beta_value, train_eval_type = combination_group[0]
+        fused_configs = [combination[:3] for combination in combination_group]
 
         # Adaptive throttling
         logging.info("Evaluating if adaptive throttling is necessary...")
@@ -599,30 +908,99 @@ if __name__=="__main__":
 
         # Train Phase
         train_scattered_data = []
+        group_train_futures = []
         if train_eval_type == "train":
+            # Idle worker threads go to LdaMulticore when fewer training tasks than threads are queued (see --lda_backend)
+            worker_threads = [worker["nthreads"] for worker in client.scheduler_info()["workers"].values()]
+            lda_backend, lda_workers = select_lda_backend(LDA_BACKEND, len(scattered_train_data_futures), worker_threads)
             try:
                 dir = os.path.join(LOG_DIR, "TRAIN")
                 os.makedirs(dir, exist_ok=True)
                 performance_log = os.path.join(dir, "TRAIN_LOG", f"train_perf_{pd.to_datetime('now').strftime('%Y%m%d%H%M%S%f')}.html")
                 with performance_report(filename=performance_log):
                     #print(f"Total training batches scattered to Dask: {len(scattered_train_data_futures)}")
-                    for scattered_data in scattered_train_data_futures:
+                    # --data_parallel: one model per configuration is trained over the whole training split
+                    # (see distributed_em.py); the per-batch tasks below then only score it
+                    # --resume: tasks the ledger marks complete are skipped, unless the model of their configuration is missing
+                    completed_tasks = {task for task in run_ledger.completed_tasks("train") if task[1:] in train_models_dict} if RESUME else set()
+                    batch_configs = {
+                        batch_id: run_ledger.pending_configs("train", batch_id, fused_configs, completed_tasks)
+                        for batch_id in range(len(scattered_train_data_futures))
+                    }
+                    pending_configs = [config for config in fused_configs if any(config in configs for configs in batch_configs.values())]
+                    skipped_tasks = len(fused_configs) * len(scattered_train_data_futures) - sum(len(configs) for configs in batch_configs.values())
+
+                    distributed_models, distributed_traces = {}, {}
+                    if DATA_PARALLEL:
+                        for config in pending_configs:
+                            model, trace = train_distributed_lda(client, scattered_train_data_futures, prepared_dictionary, *config, RANDOM_STATE,
+                                                                 PASSES, ITERATIONS, vocabulary=vocabulary_future,
+                                                                 prepared_dictionary_future=prepared_dictionary_future, early_stopping=EARLY_STOPPING)
+                            distributed_models[config] = client.scatter([model], broadcast=True, hash=False)[0]
+                            distributed_traces[config] = trace
+                    submitted_tasks = []
+                    for batch_id, scattered_data in enumerate(scattered_train_data_futures):
+                        configs = batch_configs[batch_id]
+                        if not configs:
+                            continue
                         batch_info['data'] = "N/A"
                         none_type_scatter = client.scatter(batch_info['data'])
-                        future = client.submit(
-                            train_model_v2, n_topics, alpha_value, beta_value, scattered_data, none_type_scatter, "train",
-                            RANDOM_STATE, PASSES, ITERATIONS, UPDATE_EVERY, EVAL_EVERY, num_workers, PER_WORD_TOPICS
-                        )
+                        if len(configs) > 1:
+                            future = client.submit(
+                                train_models_fused, configs, scattered_data, none_type_scatter, "train",
+                                RANDOM_STATE, PASSES, ITERATIONS, UPDATE_EVERY, EVAL_EVERY, num_workers, PER_WORD_TOPICS,
+                                vocabulary=vocabulary_future, prepared_dictionary=prepared_dictionary_future, compact_model=COMPACT_MODELS, trace_memory=TRACE_MEMORY, coherence_backend=COHERENCE_BACKEND,
+                                backend=lda_backend, lda_workers=lda_workers, early_stopping=EARLY_STOPPING,
+                                ldamodels=[distributed_models[config] for config in configs] if DATA_PARALLEL else None,
+                                training_traces=[distributed_traces[config] for config in configs] if DATA_PARALLEL else None
+                            )
+                        else:
+                            future = client.submit(
+                                train_model_v2, *configs[0], scattered_data, none_type_scatter, "train",
+                                RANDOM_STATE, PASSES, ITERATIONS, UPDATE_EVERY, EVAL_EVERY, num_workers, PER_WORD_TOPICS,
+                                vocabulary=vocabulary_future, prepared_dictionary=prepared_dictionary_future, compact_model=COMPACT_MODELS, trace_memory=TRACE_MEMORY, coherence_backend=COHERENCE_BACKEND,
+                                backend=lda_backend, lda_workers=lda_workers, early_stopping=EARLY_STOPPING,
+                                ldamodel=distributed_models.get(configs[0]), training_trace=distributed_traces.get(configs[0])
+                            )
                         train_futures.append(future)
+                        group_train_futures.append(future)
                         train_scattered_data.append(scattered_data)
+                        submitted_tasks.append((future, batch_id, configs))
 
                     #print(f"Total training tasks submitted to Dask: {len(train_futures)}")
                     done_train, _ = wait(train_futures, timeout=None)
-                    completed_train_futures = [done.result() for done in done_train]
+                    completed_train_futures = gather_task_results(done_train)
 
                     for train_result in completed_train_futures:
-                        model_key = (train_result['topics'], str(train_result['alpha_str'][0]), str(train_result['beta_str'][0]))
+                        model_key = trained_model_key(train_result['topics'], train_result['alpha_str'][0], train_result['beta_str'][0])
                         train_models_dict[model_key] = train_result['lda_model']
+                        model_sizes.append(train_result['model_size_bytes'])
+                    if model_sizes:
+                        update_run_metadata(RUN_METADATA_FILE, model_serialization={
+                            'compact': COMPACT_MODELS, 'models': len(model_sizes), 'total_bytes': int(np.sum(model_sizes)),
+                            'mean_bytes': float(np.mean(model_sizes)), 'max_bytes': int(np.max(model_sizes)),
+                        })
+
+                    # --consensus: the per-batch models of each configuration are aligned and averaged on a worker
+                    # (see model_consensus.py); the consensus model replaces them for validation and test
+                    if CONSENSUS:
+                        consensus_futures = {
+                            config: client.submit(merge_batch_models, config, *group_train_futures, pure=False)
+                            for config in pending_configs
+                        }
+                        for config, consensus_future in consensus_futures.items():
+                            try:
+                                consensus_model, consensus_summary = consensus_future.result()
+                                train_models_dict[trained_model_key(*config)] = serialize_lda_model(consensus_model, COMPACT_MODELS)
+                                consensus_summaries.append(consensus_summary)
+                            except Exception as e:
+                                logging.error(f"Could not merge the batch models of {config}: {e}")
+                        update_run_metadata(RUN_METADATA_FILE, consensus=consensus_summaries)
+
+                    # Models are saved before their tasks are marked complete, so a resumed run always finds them
+                    for config in pending_configs:
+                        if trained_model_key(*config) in train_models_dict:
+                            run_ledger.save_model(config, train_models_dict[trained_model_key(*config)])
 
                 PERFORMANCE_TRAIN_LOG = os.path.join(IMAGE_DIR, "TRAIN_LOG", f"vis_perf_train_{pd.to_datetime('now').strftime('%Y%m%d%H%M%S%f')}.html")
                 train_pylda_vis, train_pcoa_vis = process_visualizations(
@@ -645,9 +1023,10 @@ if __name__=="__main__":
                         len(completed_train_futures),
                         num_workers, BATCH_SIZE, TEXTS_ZIP_DIR, vis_pylda=completed_pylda_vis, vis_pcoa=completed_pcoa_vis
                     )
+                record_completed_tasks(run_ledger, "train", submitted_tasks)
             except Exception as e:
                 logging.error(f"Error processing TRAIN completed futures: {e}")
-            progress_bar.update(len(done_train))
+            progress_bar.update(len(completed_train_futures) + skipped_tasks)
 
         # Validation Phase
         if train_eval_type == "validation":
@@ -656,18 +1035,33 @@ if __name__=="__main__":
                 os.makedirs(dir, exist_ok=True)
                 performance_log = os.path.join(dir, "VALIDATION_LOG", f"validation_perf_{pd.to_datetime('now').strftime('%Y%m%d%H%M%S%f')}.html")
                 with performance_report(filename=performance_log):
-                    for scattered_data in scattered_validation_data_futures:
-                        model_key = (n_topics, alpha_value, beta_value)
-                        if model_key in train_models_dict:
-                            ldamodel = pickle.loads(train_models_dict[model_key])
+                    trained_configs = [config for config in fused_configs if trained_model_key(*config) in train_models_dict]
+                    completed_tasks = run_ledger.completed_tasks("validation") if RESUME else set()
+                    submitted_tasks, skipped_tasks = [], 0
+                    for batch_id, scattered_data in enumerate(scattered_validation_data_futures):
+                        configs = run_ledger.pending_configs("validation", batch_id, trained_configs, completed_tasks)
+                        skipped_tasks += len(trained_configs) - len(configs)
+                        if len(configs) > 1:
+                            future = client.submit(
+                                train_models_fused, configs, train_scattered_data, scattered_data, "validation",
+                                RANDOM_STATE, PASSES, ITERATIONS, UPDATE_EVERY, EVAL_EVERY, num_workers, PER_WORD_TOPICS,
+                                ldamodels=[deserialize_lda_model(train_models_dict[trained_model_key(*config)]) for config in configs],
+                                vocabulary=vocabulary_future, prepared_dictionary=prepared_dictionary_future, compact_model=COMPACT_MODELS, trace_memory=TRACE_MEMORY, coherence_backend=COHERENCE_BACKEND
+                            )
+                        elif configs:
+                            ldamodel = deserialize_lda_model(train_models_dict[trained_model_key(*configs[0])])
                             future = client.submit(
-                                train_model_v2, n_topics, alpha_value, beta_value, train_scattered_data, scattered_data, "validation",
-                                RANDOM_STATE, PASSES, ITERATIONS, UPDATE_EVERY, EVAL_EVERY, num_workers, PER_WORD_TOPICS, ldamodel=ldamodel
+                                train_model_v2, *configs[0], train_scattered_data, scattered_data, "validation",
+                                RANDOM_STATE, PASSES, ITERATIONS, UPDATE_EVERY, EVAL_EVERY, num_workers, PER_WORD_TOPICS, ldamodel=ldamodel,
+                                vocabulary=vocabulary_future, prepared_dictionary=prepared_dictionary_future, compact_model=COMPACT_MODELS, trace_memory=TRACE_MEMORY, coherence_backend=COHERENCE_BACKEND
                             )
-                            validation_futures.append(future)
+                        else:
+                            continue
+                        validation_futures.append(future)
+                        submitted_tasks.append((future, batch_id, configs))
 
                     done_validation, _ = wait(validation_futures, timeout=None)
-                    completed_validation_futures = [done.result() for done in done_validation]
+                    completed_validation_futures = gather_task_results(done_validation)
 
                 PERFORMANCE_VALIDATION_LOG = os.path.join(IMAGE_DIR, "VALIDATION_LOG",  f"vis_perf_validation_{pd.to_datetime('now').strftime('%Y%m%d%H%M%S%f')}.html")
                 validation_pylda_vis, validation_pcoa_vis = process_visualizations(
@@ -689,9 +1083,10 @@ if __name__=="__main__":
                         len(completed_validation_futures),
                         num_workers, BATCH_SIZE, TEXTS_ZIP_DIR, vis_pylda=completed_pylda_vis, vis_pcoa=completed_pcoa_vis
                     )
+                record_completed_tasks(run_ledger, "validation", submitted_tasks)
             except Exception as e:
                 logging.error(f"Error processing VALIDATION completed futures: {e}")
-            progress_bar.update(len(done_validation))
+            progress_bar.update(len(completed_validation_futures) + skipped_tasks)
 
         # Test Phase
         if train_eval_type == "test":
@@ -700,18 +1095,33 @@ if __name__=="__main__":
                 os.makedirs(dir, exist_ok=True)
                 performance_log = os.path.join(dir, "TEST_LOG", f"test_perf_{pd.to_datetime('now').strftime('%Y%m%d%H%M%S%f')}.html")
                 with performance_report(filename=performance_log):
-                    for scattered_data in scattered_test_data_futures:
-                        model_key = (n_topics, alpha_value, beta_value)
-                        if model_key in train_models_dict:
-                            ldamodel = pickle.loads(train_models_dict[model_key])
+                    trained_configs = [config for config in fused_configs if trained_model_key(*config) in train_models_dict]
+                    completed_tasks = run_ledger.completed_tasks("test") if RESUME else set()
+                    submitted_tasks, skipped_tasks = [], 0
+                    for batch_id, scattered_data in enumerate(scattered_test_data_futures):
+                        configs = run_ledger.pending_configs("test", batch_id, trained_configs, completed_tasks)
+                        skipped_tasks += len(trained_configs) - len(configs)
+                        if len(configs) > 1:
                             future = client.submit(
-                                train_model_v2, n_topics, alpha_value, beta_value, train_scattered_data, scattered_data, "test",
-                                RANDOM_STATE, PASSES, ITERATIONS, UPDATE_EVERY, EVAL_EVERY, num_workers, PER_WORD_TOPICS, ldamodel=ldamodel
+                                train_models_fused, configs, train_scattered_data, scattered_data, "test",
+                                RANDOM_STATE, PASSES, ITERATIONS, UPDATE_EVERY, EVAL_EVERY, num_workers, PER_WORD_TOPICS,
+                                ldamodels=[deserialize_lda_model(train_models_dict[trained_model_key(*config)]) for config in configs],
+                                vocabulary=vocabulary_future, prepared_dictionary=prepared_dictionary_future, compact_model=COMPACT_MODELS, trace_memory=TRACE_MEMORY, coherence_backend=COHERENCE_BACKEND
                             )
-                            test_futures.append(future)
+                        elif configs:
+                            ldamodel = deserialize_lda_model(train_models_dict[trained_model_key(*configs[0])])
+                            future = client.submit(
+                                train_model_v2, *configs[0], train_scattered_data, scattered_data, "test",
+                                RANDOM_STATE, PASSES, ITERATIONS, UPDATE_EVERY, EVAL_EVERY, num_workers, PER_WORD_TOPICS, ldamodel=ldamodel,
+                                vocabulary=vocabulary_future, prepared_dictionary=prepared_dictionary_future, compact_model=COMPACT_MODELS, trace_memory=TRACE_MEMORY, coherence_backend=COHERENCE_BACKEND
+                            )
+                        else:
+                            continue
+                        test_futures.append(future)
+                        submitted_tasks.append((future, batch_id, configs))
 
                     done_test, _ = wait(test_futures, timeout=None)
-                    completed_test_futures = [done.result() for done in done_test]
+                    completed_test_futures = gather_task_results(done_test)
 
                 PERFORMANCE_TEST_LOG = os.path.join(IMAGE_DIR, "TEST_LOG" f"vis_perf_test_{pd.to_datetime('now').strftime('%Y%m%d%H%M%S%f')}.html")
                 test_pylda_vis, test_pcoa_vis = process_visualizations(
@@ -734,9 +1144,10 @@ if __name__=="__main__":
                         len(completed_test_futures),
                         num_workers, BATCH_SIZE, TEXTS_ZIP_DIR, vis_pylda=completed_pylda_vis, vis_pcoa=completed_pcoa_vis
                     )
+                record_completed_tasks(run_ledger, "test", submitted_tasks)
             except Exception as e:
                 logging.error(f"Error processing TEST completed futures: {e}")
-            progress_bar.update(len(done_test))
+            progress_bar.update(len(completed_test_futures) + skipped_tasks)
 
         # Log the processing time
         elapsed_time = round(((time() - started) / 60), 2)
@@ -750,6 +1161,14 @@ if __name__=="__main__":
         train_futures.clear()
         client.rebalance()
 
+    if BOW_CACHE_BYTES > 0:
+        bow_cache_summary = log_bow_cache_stats(client, "final")
+        print(f"BoW cache hits: {sum(stats['hits'] for stats in bow_cache_summary.values() if stats)}, "
+              f"misses: {sum(stats['misses'] for stats in bow_cache_summary.values() if stats)}")
+
+    update_run_metadata(RUN_METADATA_FILE, run_ledger={'path': LEDGER_PATH, 'resumed': RESUME, 'completed': run_ledger.summary()})
+    run_ledger.close()
+
     progress_bar.close()        
     client.close()
     cluster.close()
\ No newline at end of file